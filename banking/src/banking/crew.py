@@ -1,88 +1,132 @@
-from crewai import Agent, Crew, Process, Task
-from crewai.project import CrewBase, agent, crew, task
-
-
-from banking.tools.fetch_acc_data import RequestDetailsTool
-from banking.tools.data_extraction_tool import DocumentExtractionTool
-from crewai.knowledge.source.pdf_knowledge_source import PDFKnowledgeSource
-#from banking.tools.data_update import AccountNumberInsertTool
-
-
-
-# Create a PDF knowledge source
-pdf_source = PDFKnowledgeSource(file_paths=["/AOM.pdf"])
-@CrewBase
-class Banking:
-    """Banking crew for KYC Verification & Onboarding"""
-
-    agents_config = 'config/agents.yaml'
-    tasks_config = 'config/tasks.yaml'
-
-    @agent
-    def kyc_verification_agent(self) -> Agent:
-        return Agent(
-            config=self.agents_config['kyc_verification_agent'],
-            verbose=True
-        )
-
-    @agent
-    def document_check__agent(self) -> Agent:
-        return Agent(
-            config=self.agents_config['document_check__agent'],
-            max_itr= 1,
-			verbose=True, pdf_knowledge_source=[pdf_source]
-		)
-    
-    @agent
-    def onboarding_agent(self) -> Agent:
-        """Final Onboarding Agent to update customer details after verification."""
-        return Agent(
-            config=self.agents_config['onboarding_agent'],
-            verbose=True,
-            #tools=AccountNumberInsertTool
-        )
-  
-    
-    @task
-    def fetch_acc_details_task(self) -> Task:
-        return Task(
-            config=self.tasks_config['fetch_acc_details_task'],
-            tools=[RequestDetailsTool()],
-            agent=self.kyc_verification_agent()
-        )
-
-    @task
-    def kyc_verification_task(self) -> Task:
-        return Task(
-            config=self.tasks_config['kyc_verification_task'],
-            tools=[DocumentExtractionTool()],  # Extracting data from documents
-            agent=self.kyc_verification_agent(),
-            context=[self.fetch_acc_details_task()]
-        )
-
-    @task
-    def document_check_task(self) -> Task:
-        return Task(
-            config=self.tasks_config['document_check_task'],
-            context=[self.kyc_verification_task()]  # Ensures onboarding happens after verification
-            
-        )
-    @task
-    def onboarding_task(self) -> Task:
-        return Task(
-			config=self.tasks_config['onboarding_task'],
-			output_file='report.md'
-		)
-
-
-    @crew
-    def crew(self) -> Crew:
-        """Creates the Banking crew for KYC verification and onboarding"""
-
-        return Crew(
-            agents=self.agents,
-            tasks=self.tasks,
-            process=Process.sequential,
-			pdf_knowledge_source=[pdf_source],
-			verbose=True,
-        )
+from functools import lru_cache
+from typing import Dict, Literal, Optional
+
+from crewai import Agent, Crew, Process, Task
+from crewai.project import CrewBase, agent, crew, task
+from pydantic import BaseModel, Field
+
+
+from banking.tools.fetch_acc_data import RequestDetailsTool
+from banking.tools.data_extraction_tool import DocumentExtractionTool
+from banking.tools.kyc_match_tool import KycMatchTool
+from banking.utils.knowledge_index import load_knowledge
+from banking.utils.llm_cache import CachedLLM
+from banking.report import LLM_REPORTS
+#from banking.tools.data_update import AccountNumberInsertTool
+
+
+
+class FieldVerdict(BaseModel):
+    """One field as kyc_match_tool scored it."""
+    status: Literal["match", "mismatch", "ambiguous", "missing"]
+    expected: str = Field("", description="Value on the stored application")
+    found: str = Field("", description="Value extracted from the document")
+    score: float = 0.0
+
+
+class KycVerdict(BaseModel):
+    """Structured result of kyc_verification_task; the batch runner opens the account and picks the letter from it."""
+    status: Literal["verified", "failed", "ambiguous"] = Field(
+        ..., description="verified only if every field matches (or was judged a match after review)")
+    reason: Optional[str] = Field(None, description="Why verification failed or is ambiguous")
+    fields: Dict[str, FieldVerdict] = Field(
+        default_factory=dict, description="Per-field results for first_name, last_name, aadhaar_number and address")
+
+
+@lru_cache(maxsize=1)
+def aom_knowledge():
+    """Account Opening Manual, served from the prebuilt index (see `build_knowledge_index`); loaded on first crew build."""
+    return load_knowledge()
+
+
+def agent_llm():
+    """The model configured for the crew (MODEL / OPENAI_MODEL_NAME, API_BASE, ...), answering from the LLM cache when it can."""
+    from crewai.utilities.llm_utils import create_llm
+
+    return CachedLLM.wrap(create_llm())
+
+
+@CrewBase
+class Banking:
+    """Banking crew for KYC Verification & Onboarding"""
+
+    agents_config = 'config/agents.yaml'
+    tasks_config = 'config/tasks.yaml'
+
+    @agent
+    def kyc_verification_agent(self) -> Agent:
+        return Agent(
+            config=self.agents_config['kyc_verification_agent'],
+            llm=agent_llm(),
+            verbose=True
+        )
+
+    @agent
+    def document_check__agent(self) -> Agent:
+        return Agent(
+            config=self.agents_config['document_check__agent'],
+            llm=agent_llm(),
+            max_itr= 1,
+			verbose=True, knowledge=aom_knowledge()
+		)
+    
+    @agent
+    def onboarding_agent(self) -> Agent:
+        """Final Onboarding Agent to update customer details after verification."""
+        return Agent(
+            config=self.agents_config['onboarding_agent'],
+            llm=agent_llm(),
+            verbose=True,
+            #tools=AccountNumberInsertTool
+        )
+  
+    
+    @task
+    def fetch_acc_details_task(self) -> Task:
+        return Task(
+            config=self.tasks_config['fetch_acc_details_task'],
+            tools=[RequestDetailsTool()],
+            agent=self.kyc_verification_agent()
+        )
+
+    @task
+    def kyc_verification_task(self) -> Task:
+        return Task(
+            config=self.tasks_config['kyc_verification_task'],
+            tools=[DocumentExtractionTool(), KycMatchTool()],  # Extracting data from documents, then scoring it
+            agent=self.kyc_verification_agent(),
+            context=[self.fetch_acc_details_task()],
+            output_pydantic=KycVerdict,
+        )
+
+    @task
+    def document_check_task(self) -> Task:
+        return Task(
+            config=self.tasks_config['document_check_task'],
+            context=[self.kyc_verification_task()]  # Ensures onboarding happens after verification
+            
+        )
+    @task
+    def onboarding_task(self) -> Task:
+        return Task(
+			config=self.tasks_config['onboarding_task'],
+			output_file='output/reports/{request_id}.md'
+		)
+
+
+    @crew
+    def crew(self) -> Crew:
+        """Creates the Banking crew for KYC verification and onboarding"""
+
+        tasks = self.tasks
+        if not LLM_REPORTS:
+            # Letters are rendered from templates (banking.report), so skip the LLM letter-writing task
+            tasks = [task for task in tasks if task.name != "onboarding_task"]
+
+        return Crew(
+            agents=[agent for agent in self.agents if any(task.agent is agent for task in tasks)],
+            tasks=tasks,
+            process=Process.sequential,
+			knowledge=aom_knowledge(),
+			verbose=True,
+        )
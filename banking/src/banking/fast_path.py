@@ -0,0 +1,93 @@
+import os
+from typing import Any, Dict
+
+from banking.utils.indexes import RECORD_PROJECTION
+from banking.utils.intake import INTAKE_TIMESTAMP_FIELD
+from banking.utils.kyc_matching import match_kyc
+from banking.utils.mongo import get_collection
+from banking.utils.work_queue import utcnow
+from banking.utils.write_behind import get_write_buffer
+
+FAST_PATH_ENABLED = os.getenv("FAST_PATH", "true").lower() not in ("0", "false", "no")
+
+# Details the Aadhaar must yield before an application counts as complete (AOM identity + address proof)
+REQUIRED_DOCUMENT_FIELDS = [
+    field.strip()
+    for field in os.getenv("REQUIRED_DOCUMENT_FIELDS", "NAME,AADHAAR NUMBER,ADDRESS,DATE OF BIRTH").split(",")
+    if field.strip()
+]
+
+database_name = os.getenv("DB")
+collection_name = os.getenv("COLLECTION1")
+record_collection = "test_account_data"
+
+
+def missing_document_fields(extracted: Dict[str, Any]) -> list:
+    """Returns the required document details that extraction could not find."""
+    return [field for field in REQUIRED_DOCUMENT_FIELDS if not extracted.get(field)]
+
+
+def fetch_customer(request_id: str) -> Dict[str, Any]:
+    """The stored applicant record (matched fields and account type), or {} if there is none."""
+    return get_collection(record_collection, "banking_ai_agent").find_one(
+        {"request_id": request_id}, {**RECORD_PROJECTION, "customer_account_type": 1}) or {}
+
+
+def customer_summary(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Name and account type as the letters address the customer."""
+    return {
+        "name": " ".join(filter(None, [record.get("customer_first_name"), record.get("customer_last_name")])),
+        "account_type": record.get("customer_account_type"),
+    }
+
+
+def open_account(request_id: str) -> Dict[str, Any]:
+    """
+    Inserts the account number for a verified request and takes it off the pending list.
+    Returns the account number tool's result ({"account_no": ...} or {"error": ...}).
+    """
+    # The tools pull in crewai, so they are imported on first use rather than with this module
+    from banking.tools.data_update import AccountNumberInsertTool
+
+    inserted = AccountNumberInsertTool()._run(request_id)
+    if "error" not in inserted:
+        # Take the request off the pending list the batch runner scans (buffered like the account number)
+        get_write_buffer(collection_name, database_name).set(
+            request_id, {"status_flag": True, "account_id": inserted["account_no"], INTAKE_TIMESTAMP_FIELD: utcnow()})
+    return inserted
+
+
+def run_fast_path(request_id: str) -> Dict[str, Any]:
+    """
+    Verify a request without the LLM agents and settle it when the outcome is clear-cut.
+    Returns status "onboarded" for a verified request, "exception" (with the reason for the letter) for a failed
+    match, missing documents or no stored record, and "review" with the reason when the full crew is needed:
+    an ambiguous match or a document that could not be extracted.
+    """
+    from banking.tools.data_extraction_tool import DocumentExtractionTool
+
+    record = fetch_customer(request_id)
+    if not record:
+        return {"request_id": request_id, "status": "exception", "reason": "no stored record"}
+    customer = customer_summary(record)
+
+    extracted = DocumentExtractionTool().extract(request_id)
+    if "error" in extracted:
+        return {"request_id": request_id, "status": "review", "reason": extracted["error"], "customer": customer}
+
+    missing = missing_document_fields(extracted)
+    if missing:
+        return {"request_id": request_id, "status": "exception", "reason": "Missing/Pending KYC Documents",
+                "missing": missing, "customer": customer}
+
+    match = match_kyc(record, extracted)
+    if match["status"] != "verified":
+        return {"request_id": request_id, "status": "review" if match["status"] == "ambiguous" else "exception",
+                "reason": f"KYC verification {match['status']}", "match": match, "customer": customer}
+
+    inserted = open_account(request_id)
+    if "error" in inserted:
+        # A verified applicant gets no pending letter; the request fails and is retried
+        raise RuntimeError(inserted["error"])
+    return {"request_id": request_id, "status": "onboarded", "account_no": inserted["account_no"],
+            "match": match, "customer": customer}
@@ -1,78 +1,481 @@
-#!/usr/bin/env python
-import sys
-import warnings
-from datetime import datetime
-from banking.crew import Banking
-from typing import Type
-from pymongo import MongoClient
-from langchain.tools import BaseTool
-from pydantic import BaseModel, Field
-import json
-import os
-
-
-import warnings
-warnings.filterwarnings("ignore", category=SyntaxWarning, module="pysbd")
-
-mongo_connection_string=os.getenv("URL")
-database_name=os.getenv("DB")
-collection_name=os.getenv("COLLECTION1")
-# openai_api_key = os.getenv("OPENAI_API_KEY")
-
-def run():
-    """
-    Run the crew.
-    """
-    client = MongoClient(mongo_connection_string)
-    db = client[database_name]
-    coll = db[collection_name]
-
-    for doc in coll.find({"status_flag": False, "account_id": None}, {"_id": 0}):
-        request_id = doc.get("request_id")  
-        #print(f"Request ID: {request_id}")
-    
-    inputs = {
-        'request_id': request_id
-    }
-
-    Banking().crew().kickoff(inputs=inputs)
-
-def train():
-    """
-    Train the crew for a given number of iterations.
-    """
-    inputs = {
-        "topic": "AI LLMs"
-    }
-    try:
-        Banking().crew().train(n_iterations=int(sys.argv[1]), filename=sys.argv[2], inputs=inputs)
-
-    except Exception as e:
-        raise Exception(f"An error occurred while training the crew: {e}")
-
-def replay():
-    """
-    Replay the crew execution from a specific task.
-    """
-    try:
-        Banking().crew().replay(task_id=sys.argv[1])
-
-    except Exception as e:
-        raise Exception(f"An error occurred while replaying the crew: {e}")
-
-def test():
-    """
-    Test the crew execution and returns the results.
-    """
-    inputs = {
-        "topic": "AI LLMs"
-    }
-    try:
-        Banking().crew().test(n_iterations=int(sys.argv[1]), openai_model_name=sys.argv[2], inputs=inputs)
-
-    except Exception as e:
-        raise Exception(f"An error occurred while replaying the crew: {e}")
-    
-
-
-
+#!/usr/bin/env python
+import asyncio
+import logging
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from banking.fast_path import FAST_PATH_ENABLED, customer_summary, fetch_customer, open_account, run_fast_path
+from banking.report import LLM_REPORTS, render_letter, write_report
+from banking.utils.mongo import get_collection, pool_stats
+from banking.utils.preprocess import preprocess_stats
+from banking.utils.rate_limit import rate_limit_stats
+from banking.utils.write_behind import WRITE_BEHIND_MAX_SECONDS, write_behind_stats, write_failures
+import os
+
+
+import warnings
+warnings.filterwarnings("ignore", category=SyntaxWarning, module="pysbd")
+
+mongo_connection_string=os.getenv("URL")
+database_name=os.getenv("DB")
+collection_name=os.getenv("COLLECTION1")
+batch_concurrency=int(os.getenv("BATCH_CONCURRENCY", "4"))
+# Cold-start budget checked by `benchmark_startup`
+startup_budget_seconds=float(os.getenv("STARTUP_BUDGET_SECONDS", "1.0"))
+# openai_api_key = os.getenv("OPENAI_API_KEY")
+
+logger = logging.getLogger(__name__)
+
+_crew = None
+_crew_lock = threading.Lock()
+
+def fetch_pending_request_ids():
+    """
+    Fetch the request_id of every application still waiting for KYC verification.
+    """
+    coll = get_collection(collection_name, database_name, mongo_connection_string)
+
+    request_ids = []
+    for doc in coll.find({"status_flag": False, "account_id": None}, {"_id": 0, "request_id": 1}):
+        request_id = doc.get("request_id")
+        if request_id:
+            request_ids.append(request_id)
+    return request_ids
+
+def get_crew():
+    """
+    Build the Banking crew once per process and return it as a template.
+    The template itself is never kicked off; every request runs on a copy of it.
+    """
+    global _crew
+    with _crew_lock:
+        if _crew is None:
+            # crewai and the tools take seconds to import, so they load with the first crew, not with this module
+            from banking.crew import Banking
+            _crew = Banking().crew()
+    return _crew
+
+def crew_verdict(output):
+    """The structured KYC verdict from kyc_verification_task, or None if the model's answer did not parse."""
+    for task_output in output.tasks_output:
+        if task_output.name == "kyc_verification_task" and task_output.pydantic is not None:
+            return task_output.pydantic.model_dump()
+    return None
+
+def verdict_stands(verdict, match=None):
+    """
+    Whether a crew verdict may open the account. The crew's judgement only settles fields the matching engine
+    marked ambiguous: an engine failure or mismatch is final, and every other field must be an engine match.
+    Without an engine result (fast path off), every field in the verdict itself must be a match.
+    """
+    if not verdict or verdict["status"] != "verified":
+        return False
+    judged = verdict.get("fields") or {}
+    if match is None:
+        return bool(judged) and all(field["status"] == "match" for field in judged.values())
+    if match["status"] == "failed":
+        return False
+    for name, field in match["fields"].items():
+        if field["status"] == "ambiguous" and (judged.get(name) or {}).get("status") == "match":
+            continue
+        if field["status"] != "match":
+            return False
+    return True
+
+def crew_outcome(request_id, output, fast=None):
+    """
+    The structured result of a crew run, as the letters are rendered from it.
+    A verified verdict the engine's results allow opens the account; anything else is an exception
+    with the crew's reason and field results.
+    """
+    fast = fast or {}
+    customer = fast.get("customer") or customer_summary(fetch_customer(request_id))
+    verdict = crew_verdict(output)
+    if verdict_stands(verdict, fast.get("match")):
+        inserted = open_account(request_id)
+        if "error" in inserted:
+            raise RuntimeError(inserted["error"])
+        return {"request_id": request_id, "status": "onboarded", "account_no": inserted["account_no"],
+                "match": verdict, "customer": customer}
+
+    result = {"request_id": request_id, "status": "exception", "customer": customer,
+              "reason": fast.get("reason") or "KYC verification could not be completed"}
+    if verdict:
+        result["match"] = verdict
+        result["reason"] = verdict.get("reason") or f"KYC verification {verdict['status']}"
+        if verdict["status"] == "verified":
+            # Overruled: the letter lists the engine's findings, not the crew's
+            result["reason"] = "KYC verification not confirmed by the matching engine"
+            result["match"] = fast.get("match") or verdict
+    return result
+
+def process_request(request_id):
+    """
+    Run the crew for a single request and report how it went.
+    """
+    started = time.perf_counter()
+    try:
+        # Clear-cut applications (verified, failed or missing documents) are settled without the LLM agents;
+        # only ambiguous matches and documents that could not be extracted reach the crew
+        fast = None
+        if FAST_PATH_ENABLED:
+            fast = run_fast_path(request_id)
+            if fast["status"] != "review":
+                report = write_report(request_id, render_letter(fast), fast["status"])
+                return {"request_id": request_id, "status": "success", "path": "fast", "outcome": fast["status"],
+                        "seconds": time.perf_counter() - started, "output": fast, "report": report}
+            logger.info("%s needs the full crew: %s", request_id, fast["reason"])
+
+        output = get_crew().copy().kickoff(inputs={'request_id': request_id})
+        outcome = crew_outcome(request_id, output, fast)
+
+        # Without the LLM letter, render the letter from the crew's verdict, with its findings for pending ones
+        report = None
+        if not LLM_REPORTS:
+            notes = output.raw if outcome["status"] != "onboarded" else None
+            report = write_report(request_id, render_letter(outcome, notes=notes), outcome["status"])
+        return {"request_id": request_id, "status": "success", "path": "crew", "outcome": outcome["status"],
+                "seconds": time.perf_counter() - started, "output": str(output), "report": report}
+    except Exception as e:
+        return {"request_id": request_id, "status": "failed",
+                "seconds": time.perf_counter() - started, "error": str(e)}
+
+def print_result(result):
+    if result["status"] == "success":
+        print(f"✅ {result['request_id']} completed ({result['path']} path) in {result['seconds']:.1f}s")
+    else:
+        print(f"❌ {result['request_id']} failed after {result['seconds']:.1f}s: {result['error']}")
+
+def check_writes(results):
+    """
+    Flush the write-behind buffers and turn successful results whose buffered writes did not reach Mongo into failures.
+    """
+    failures = write_failures([result["request_id"] for result in results if result["status"] == "success"])
+    for result in results:
+        if result["status"] == "success" and result["request_id"] in failures:
+            result.update(status="failed", error=failures[result["request_id"]])
+            print_result(result)
+
+def settle_leases(finished):
+    """
+    Mark processed requests done once their buffered writes are durable; the others are released for a retry.
+    """
+    check_writes([result for _, result in finished])
+    for lease, result in finished:
+        if result["status"] == "success":
+            lease.complete()
+            print_result(result)
+        else:
+            lease.fail(result["error"])
+    finished.clear()
+
+def drain_queue(queue):
+    """
+    Claim and process requests until the queue has nothing left; one of these runs per worker thread.
+    Processed requests keep their leases until their buffered writes are durable. They are settled together
+    once the oldest has waited WRITE_BEHIND_MAX_SECONDS, by when the buffers have usually flushed on their own,
+    and when the queue runs dry.
+    """
+    results = []
+    finished = []
+    settle_at = None
+    try:
+        while True:
+            lease = queue.claim()
+            if lease is None:
+                return results
+            try:
+                result = process_request(lease.request_id)
+            except BaseException as e:
+                lease.fail(str(e) or type(e).__name__)
+                raise
+            result["attempt"] = lease.attempts
+            results.append(result)
+            if result["status"] == "success":
+                finished.append((lease, result))
+                settle_at = settle_at or time.monotonic() + WRITE_BEHIND_MAX_SECONDS
+            else:
+                lease.fail(result["error"])
+                print_result(result)
+            if finished and time.monotonic() >= settle_at:
+                settle_leases(finished)
+                settle_at = None
+    finally:
+        if finished:
+            settle_leases(finished)
+
+def run_batch(request_ids=None, concurrency=None):
+    """
+    Run the crew for every pending request on a bounded worker pool.
+    Without explicit request_ids, requests are claimed from the lease-based work queue, so batches started
+    on several nodes share the pending requests instead of processing each one twice.
+    """
+    if concurrency is None:
+        concurrency = batch_concurrency
+    started = time.perf_counter()
+    results = []
+
+    if request_ids is None:
+        from banking.utils.work_queue import get_work_queue
+
+        queue = get_work_queue()
+        concurrency = max(1, int(concurrency))
+        print(f"Processing pending requests from the work queue with {concurrency} workers")
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for worker_results in executor.map(lambda _: drain_queue(queue), range(concurrency)):
+                results.extend(worker_results)
+    else:
+        concurrency = max(1, min(int(concurrency), len(request_ids) or 1))
+        print(f"Processing {len(request_ids)} pending requests with {concurrency} workers")
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = [executor.submit(process_request, request_id) for request_id in request_ids]
+            for future in as_completed(futures):
+                result = future.result()
+                results.append(result)
+                print_result(result)
+        check_writes(results)
+
+    from banking.utils.llm_cache import llm_cache_stats
+
+    elapsed = time.perf_counter() - started
+    succeeded = sum(1 for result in results if result["status"] == "success")
+    summary = {
+        "total": len(results),
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded,
+        "fast_path": sum(1 for result in results if result.get("path") == "fast"),
+        "seconds": elapsed,
+        "requests_per_minute": len(results) * 60 / elapsed if elapsed else 0.0,
+        "results": results,
+        "mongo_pool": pool_stats(),
+        "preprocessing": preprocess_stats(),
+        "llm_cache": llm_cache_stats(),
+        "rate_limits": rate_limit_stats(),
+        "write_behind": write_behind_stats(),
+    }
+    print(f"Batch finished: {summary['succeeded']} succeeded ({summary['fast_path']} via fast path), {summary['failed']} failed "
+          f"in {elapsed:.1f}s ({summary['requests_per_minute']:.1f} requests/min)")
+    return summary
+
+async def run_async(request_ids=None, concurrency=None):
+    """
+    Fan request_ids through the shared crew with kickoff_async, at most `concurrency` at a time.
+    """
+    if request_ids is None:
+        request_ids = await asyncio.to_thread(fetch_pending_request_ids)
+    semaphore = asyncio.Semaphore(max(1, int(concurrency or batch_concurrency)))
+    crew = get_crew()
+
+    async def kickoff(request_id):
+        async with semaphore:
+            return await crew.copy().kickoff_async(inputs={'request_id': request_id})
+
+    outputs = dict(zip(request_ids, await asyncio.gather(*(kickoff(request_id) for request_id in request_ids),
+                                                         return_exceptions=True)))
+    # A run whose buffered writes did not reach Mongo is reported as failed, like one that raised
+    completed = [request_id for request_id, output in outputs.items() if not isinstance(output, BaseException)]
+    for request_id, error in (await asyncio.to_thread(write_failures, completed)).items():
+        print(f"❌ {request_id} failed: {error}")
+        outputs[request_id] = RuntimeError(error)
+    return outputs
+
+def kickoff_for_each(request_ids):
+    """
+    Run the shared crew sequentially over many request_ids with kickoff_for_each.
+    """
+    return get_crew().kickoff_for_each(inputs=[{'request_id': request_id} for request_id in request_ids])
+
+def run():
+    """
+    Run the crew for every pending request.
+    """
+    if any(arg in ("-h", "--help") for arg in sys.argv[1:]):
+        print("usage: banking [concurrency]\n\n"
+              "Run KYC verification for every pending request.\n"
+              f"  concurrency  number of requests processed at once (default: BATCH_CONCURRENCY={batch_concurrency})")
+        return
+    concurrency = int(sys.argv[1]) if len(sys.argv) > 1 else batch_concurrency
+    run_batch(concurrency=concurrency)
+
+def run_intake(concurrency=None):
+    """
+    Long-running intake: workers sweep the backlog, then sleep until the change stream (or timestamp tail)
+    reports a new or updated pending request and claim it from the work queue straight away.
+    """
+    if any(arg in ("-h", "--help") for arg in sys.argv[1:]):
+        print("usage: intake [concurrency]\n\n"
+              "Process pending requests as they arrive, until interrupted.\n"
+              f"  concurrency  number of requests processed at once (default: BATCH_CONCURRENCY={batch_concurrency})")
+        return
+    if concurrency is None:
+        concurrency = int(sys.argv[1]) if len(sys.argv) > 1 else batch_concurrency
+    from banking.utils.intake import INTAKE_IDLE_CLAIM_SECONDS, RequestIntake
+    from banking.utils.work_queue import MongoWorkQueue
+
+    queue = MongoWorkQueue()
+    stop = threading.Event()
+    # One permit per reported request: each wakes one idle worker
+    wake = threading.Semaphore(0)
+
+    def worker():
+        while not stop.is_set():
+            drain_queue(queue)
+            # Also wakes periodically for retries whose delay has passed, which produce no change event
+            wake.acquire(timeout=INTAKE_IDLE_CLAIM_SECONDS)
+
+    workers = [threading.Thread(target=worker, name=f"intake-worker-{n}", daemon=True)
+               for n in range(max(1, int(concurrency)))]
+    for thread in workers:
+        thread.start()
+    intake = RequestIntake(queue, on_pending=lambda request_id: wake.release())
+    print(f"Intake running with {len(workers)} workers; Ctrl+C to stop")
+    try:
+        intake.run(stop)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        for _ in workers:
+            wake.release()
+        for thread in workers:
+            thread.join()
+        queue.shutdown()
+        print(f"Intake stopped: {intake.stats()} queue={queue.stats()}")
+
+def ensure_indexes():
+    """
+    Create the indexes the KYC collections need; with --check, also verify every query the tools issue uses them.
+    """
+    if any(arg in ("-h", "--help") for arg in sys.argv[1:]):
+        print("usage: ensure_indexes [--check]\n\n"
+              "Create missing indexes on the KYC collections (existing ones are left alone).\n"
+              "  --check  explain every tool query and exit non-zero if one scans the collection")
+        return
+    from banking.utils.indexes import check_query_plans, ensure_indexes as create_indexes
+
+    failed = False
+    for entry in create_indexes():
+        mark = {"created": "✅", "exists": "✅", "failed": "❌"}[entry["status"]]
+        print(f"{mark} {entry['collection']} {entry['index']}: {entry['status']} {entry.get('error', '')}".rstrip())
+        failed = failed or entry["status"] == "failed"
+    if "--check" in sys.argv[1:]:
+        for plan in check_query_plans():
+            mark = "✅" if plan["ok"] else "❌"
+            print(f"{mark} {plan['name']} on {plan['collection']}: {' <- '.join(plan['stages'])} "
+                  f"(index {plan['index']}, covered={plan['covered']})")
+            failed = failed or not plan["ok"]
+    if failed:
+        sys.exit(1)
+
+def ingest_applications():
+    """
+    Load an applications CSV (the upstream feed) into test_account_data with chunked bulk upserts.
+    """
+    if len(sys.argv) < 2 or any(arg in ("-h", "--help") for arg in sys.argv[1:]):
+        print("usage: ingest_applications <csv> [collection]\n\n"
+              "Validate, coerce and upsert every row by request_id; rejected rows go to <csv>.rejects.jsonl.\n"
+              "  collection  target collection (default: INGEST_COLLECTION=test_account_data)")
+        return
+    from banking.utils.ingest import ingest_csv
+    from banking.utils.mongo import DEFAULT_DATABASE
+
+    collection = get_collection(sys.argv[2], DEFAULT_DATABASE) if len(sys.argv) > 2 else None
+    summary = ingest_csv(sys.argv[1], collection)
+    if summary["rejected"]:
+        print(f"⚠️ {summary['rejected']} rows rejected; see {summary['rejects_path']}")
+
+def build_knowledge_index():
+    """
+    Build (or refresh) the on-disk vector index of the Account Opening Manual.
+    """
+    from banking.utils.knowledge_index import AOM_PDF_PATH, build_index
+
+    pdf_path = sys.argv[1] if len(sys.argv) > 1 else AOM_PDF_PATH
+    try:
+        index_path = build_index(pdf_path, force="--force" in sys.argv)
+        print(f"Knowledge index ready at: {index_path}")
+    except Exception as e:
+        raise Exception(f"An error occurred while building the knowledge index: {e}")
+
+def train():
+    """
+    Train the crew for a given number of iterations.
+    """
+    inputs = {
+        "topic": "AI LLMs"
+    }
+    try:
+        from banking.crew import Banking
+        Banking().crew().train(n_iterations=int(sys.argv[1]), filename=sys.argv[2], inputs=inputs)
+
+    except Exception as e:
+        raise Exception(f"An error occurred while training the crew: {e}")
+
+def replay():
+    """
+    Replay the crew execution from a specific task.
+    """
+    if len(sys.argv) < 2 or any(arg in ("-h", "--help") for arg in sys.argv[1:]):
+        print("usage: replay <task_id>\n\n"
+              "Replay the crew from a task of the last kickoff (task ids: `crewai log-tasks-outputs`).")
+        return
+    try:
+        # crewai takes seconds to import, so it loads once there is a task to replay, not when the worker starts
+        from banking.crew import Banking
+        Banking().crew().replay(task_id=sys.argv[1])
+
+    except Exception as e:
+        raise Exception(f"An error occurred while replaying the crew: {e}")
+
+def test():
+    """
+    Test the crew execution and returns the results.
+    """
+    inputs = {
+        "topic": "AI LLMs"
+    }
+    try:
+        from banking.crew import Banking
+        Banking().crew().test(n_iterations=int(sys.argv[1]), openai_model_name=sys.argv[2], inputs=inputs)
+
+    except Exception as e:
+        raise Exception(f"An error occurred while replaying the crew: {e}")
+
+# What each startup benchmark measures, run in a fresh interpreter so nothing is already imported
+STARTUP_TARGETS = {
+    "cli --help": "import sys; sys.argv = ['banking', '--help']; from banking.main import run; run()",
+    "import banking.main": "import banking.main",
+    "replay --help": "import sys; sys.argv = ['replay', '--help']; from banking.main import replay; replay()",
+}
+# Tracked but not held to the budget: building a crew imports crewAI, which alone takes seconds
+STARTUP_TRACKED = {
+    "crew build (crewAI import)": "from banking.crew import Banking",
+}
+
+def benchmark_startup():
+    """
+    Time cold starts of the CLI entry points (`banking --help`, `replay --help`, importing banking.main) and
+    compare them with STARTUP_BUDGET_SECONDS; the crew build (crewAI import) is timed alongside for tracking only.
+    """
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    results = {}
+    for name, code in {**STARTUP_TARGETS, **STARTUP_TRACKED}.items():
+        timings = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            subprocess.run([sys.executable, "-c", code], check=True, stdout=subprocess.DEVNULL)
+            timings.append(time.perf_counter() - started)
+        budgeted = name in STARTUP_TARGETS
+        results[name] = {"median": statistics.median(timings), "min": min(timings), "max": max(timings),
+                         "within_budget": statistics.median(timings) <= startup_budget_seconds if budgeted else None}
+        mark = "ℹ️" if not budgeted else "✅" if results[name]["within_budget"] else "❌"
+        print(f"{mark} {name}: median {results[name]['median']:.2f}s "
+              f"(min {results[name]['min']:.2f}s, max {results[name]['max']:.2f}s) over {runs} runs")
+    return results
+
+
+
@@ -0,0 +1,114 @@
+import os
+import re
+import json
+import threading
+from datetime import datetime, timezone
+from string import Template
+from typing import Any, Dict, Optional
+
+# "markdown" writes one letter per request_id; "jsonl" appends every letter to a single ndjson stream
+REPORT_FORMAT = os.getenv("REPORT_FORMAT", "markdown").lower()
+REPORT_DIR = os.getenv("REPORT_DIR", os.path.join("output", "reports"))
+REPORT_JSONL_FILE = "reports.jsonl"
+
+# When false, letters come from the templates below and the crew skips its letter-writing task
+LLM_REPORTS = os.getenv("LLM_REPORTS", "false").lower() in ("1", "true", "yes")
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(__file__), "templates")
+
+FIELD_LABELS = {
+    "first_name": "First name",
+    "last_name": "Last name",
+    "aadhaar_number": "Aadhaar number",
+    "address": "Address",
+}
+DOCUMENT_FIELD_LABELS = {
+    "NAME": "your name",
+    "AADHAAR NUMBER": "your Aadhaar number",
+    "ADDRESS": "your address",
+    "DATE OF BIRTH": "your date of birth",
+}
+
+_templates: Dict[str, Template] = {}
+_write_lock = threading.Lock()
+
+
+def load_template(name: str) -> Template:
+    """Loads (once) a letter template from the templates folder."""
+    if name not in _templates:
+        with open(os.path.join(TEMPLATE_DIR, f"{name}.md"), encoding="utf-8") as f:
+            _templates[name] = Template(f.read())
+    return _templates[name]
+
+
+def _display(field: str, value: str) -> str:
+    if field == "aadhaar_number":
+        return f"XXXX XXXX {value[-4:]}" if value else ""
+    return value.title()
+
+
+def list_issues(result: Dict[str, Any]) -> str:
+    """Turns a structured verification result into the bullet list of what the customer must fix."""
+    issues = []
+    for field in result.get("missing", []):
+        label = DOCUMENT_FIELD_LABELS.get(field, field.lower())
+        issues.append(f"- A clear copy of your Aadhaar card on which {label} is readable.")
+
+    for field, check in result.get("match", {}).get("fields", {}).items():
+        label = FIELD_LABELS.get(field, field)
+        expected, found = _display(field, check["expected"]), _display(field, check["found"])
+        if check["status"] == "mismatch":
+            issues.append(f'- {label}: your application says "{expected}" but your document shows "{found}". '
+                          f"Please resubmit a document that matches your application, or correct the application.")
+        elif check["status"] == "ambiguous":
+            issues.append(f'- {label}: "{expected}" could not be confirmed from your document and is under manual review.')
+        elif check["status"] == "missing":
+            issues.append(f"- {label}: we could not read this from your document. Please resubmit a clearer copy.")
+
+    if not issues:
+        issues.append("- Your application is under manual review; we will contact you if anything else is needed.")
+    return "\n".join(issues)
+
+
+def render_letter(result: Dict[str, Any], notes: Optional[str] = None) -> str:
+    """Builds the onboarding or missing-documents letter from a structured verification result."""
+    customer = result.get("customer", {})
+    values = {
+        "customer_name": customer.get("name") or "Customer",
+        "account_type": customer.get("account_type") or "new",
+        "request_id": result.get("request_id", ""),
+    }
+    if result.get("status") == "onboarded":
+        return load_template("onboarding_letter").safe_substitute(values, account_no=result.get("account_no", ""))
+
+    return load_template("pending_letter").safe_substitute(
+        values,
+        issues=list_issues(result),
+        reason=result.get("reason", "Missing/Pending KYC Documents"),
+        notes=f"\nReviewer notes:\n{notes.strip()}\n" if notes else "",
+    )
+
+
+def write_report(request_id: str, letter: str, status: Optional[str] = None) -> str:
+    """Writes a letter to its own per-request file, or appends it to the JSONL stream."""
+    os.makedirs(REPORT_DIR, exist_ok=True)
+
+    if REPORT_FORMAT == "jsonl":
+        path = os.path.join(REPORT_DIR, REPORT_JSONL_FILE)
+        line = json.dumps({
+            "request_id": request_id,
+            "status": status,
+            "written_at": datetime.now(timezone.utc).isoformat(),
+            "letter": letter,
+        }, ensure_ascii=False)
+        # One write per record, so concurrent workers never interleave lines
+        with _write_lock, open(path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+        return path
+
+    path = os.path.join(REPORT_DIR, f"{re.sub(r'[^A-Za-z0-9_.-]', '_', request_id)}.md")
+    scratch = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(scratch, "w", encoding="utf-8") as f:
+        f.write(letter)
+    os.replace(scratch, path)
+    return path
@@ -1,105 +1,340 @@
-# import boto3
-# import os
-# from typing import Any
-# from crewai.tools import BaseTool
-# from dotenv import load_dotenv
-
-# # Load environment variables
-# load_dotenv()
-
-# # AWS credentials (from environment variables)
-# aws_access_key_id = os.getenv("AWS_ACCESS_KEY_ID")
-# aws_secret_access_key = os.getenv("AWS_SECRET_ACCESS_KEY")
-# aws_bucket_name = os.getenv("BUCKET_NAME")
-# aws_region_name = os.getenv("AWS_REGION_NAME")
-
-# # S3 parent folder and local paths
-# parent_folder = "Dhanya"
-# local_id_path = r"C:\Users\DHANYA MANOJ\Downloads\banking_crew_working\banking\local_id_path"
-
-# class S3DownloadTool(BaseTool):
-#     name: str = "S3 Download Tool"
-#     description: str = "Downloads the id proofs from the S3 bucket and saves them locally."
-#     arguments: str = {
-#         'local_id_path': {'description': "Input local ID path", 'type': 'str'},
-#     }
-
-#     def connect_to_s3(self):
-#         """Establish an S3 client connection using environment variables."""
-#         try:
-#             s3_client = boto3.client(
-#                 's3',
-#                 aws_access_key_id=aws_access_key_id,
-#                 aws_secret_access_key=aws_secret_access_key,
-#                 region_name=aws_region_name
-#             )
-#             print("Connected to S3")
-#             return s3_client
-#         except Exception as e:
-#             print(f"Failed to connect to S3: {str(e)}")
-#             return None
-
-#     def download_file(self, s3, bucket_name: str, file_key: str, destination_path: str):
-#         """Download a file from S3 to a local destination."""
-#         try:
-#             os.makedirs(os.path.dirname(destination_path), exist_ok=True)  # Ensure folder exists
-#             s3.download_file(bucket_name, file_key, destination_path)
-#             print(f"Downloaded: {file_key} -> {destination_path}")
-#         except Exception as e:
-#             print(f"Failed to download {file_key}: {str(e)}")
-
-#     def download_files_from_s3(self, s3, bucket_name: str, s3_folder: str, local_folder: str, file_extensions: list):
-#         """Download files from an S3 folder to a local folder."""
-#         try:
-#             response = s3.list_objects_v2(Bucket=bucket_name, Prefix=s3_folder)
-
-#             if 'Contents' not in response:
-#                 print(f"No files found in {s3_folder}")
-#                 return
-            
-#             for item in response['Contents']:
-#                 file_key = item['Key']
-#                 file_name = os.path.basename(file_key)
-
-#                 # Skip folders (empty file names)
-#                 if not file_name:
-#                     continue
-
-#                 # Filter by file extension
-#                 if file_extensions and not any(file_name.lower().endswith(ext) for ext in file_extensions):
-#                     continue
-
-#                 destination_path = os.path.join(local_folder, file_name)
-                
-#                 # Ensure proper permissions before writing
-#                 try:
-#                     if os.path.exists(destination_path):
-#                         print(f"File already exists: {destination_path}, skipping download.")
-#                         continue
-
-#                     self.download_file(s3, bucket_name, file_key, destination_path)
-#                 except PermissionError:
-#                     print(f"Permission error: Unable to save file to {destination_path}. Try running as Administrator.")
-                    
-#         except Exception as e:
-#             print(f"Error downloading files from {s3_folder}: {str(e)}")
-
-#     def _run(self) -> str:
-#         """Run the S3 download process for ID proofs."""
-#         try:
-#             s3 = self.connect_to_s3()
-#             if not s3:
-#                 return "S3 connection failed."
-
-#             # Define S3 source path for ID proofs
-#             id_proofs_s3_path = f"{parent_folder}/id_proof/"
-
-#             # Ensure local path exists
-#             os.makedirs(local_id_path, exist_ok=True)
-
-#             # Download ID proofs (.jpg)
-#             self.download_files_from_s3(s3, aws_bucket_name, id_proofs_s3_path, local_id_path, file_extensions=['.jpg','.pdf'])
-
-#             return f"Download completed successfully. Files saved to {local_id_path}"
-#         except Exception as e:
-#             return f"An error occurred: {str(e)}"
\ No newline at end of file
+# import boto3
+# import os
+# from typing import Any
+# from crewai.tools import BaseTool
+# from dotenv import load_dotenv
+
+# # Load environment variables
+# load_dotenv()
+
+# # AWS credentials (from environment variables)
+# aws_access_key_id = os.getenv("AWS_ACCESS_KEY_ID")
+# aws_secret_access_key = os.getenv("AWS_SECRET_ACCESS_KEY")
+# aws_bucket_name = os.getenv("BUCKET_NAME")
+# aws_region_name = os.getenv("AWS_REGION_NAME")
+
+# # S3 parent folder and local paths
+# parent_folder = "Dhanya"
+# local_id_path = r"C:\Users\DHANYA MANOJ\Downloads\banking_crew_working\banking\local_id_path"
+
+# class S3DownloadTool(BaseTool):
+#     name: str = "S3 Download Tool"
+#     description: str = "Downloads the id proofs from the S3 bucket and saves them locally."
+#     arguments: str = {
+#         'local_id_path': {'description': "Input local ID path", 'type': 'str'},
+#     }
+
+#     def connect_to_s3(self):
+#         """Establish an S3 client connection using environment variables."""
+#         try:
+#             s3_client = boto3.client(
+#                 's3',
+#                 aws_access_key_id=aws_access_key_id,
+#                 aws_secret_access_key=aws_secret_access_key,
+#                 region_name=aws_region_name
+#             )
+#             print("Connected to S3")
+#             return s3_client
+#         except Exception as e:
+#             print(f"Failed to connect to S3: {str(e)}")
+#             return None
+
+#     def download_file(self, s3, bucket_name: str, file_key: str, destination_path: str):
+#         """Download a file from S3 to a local destination."""
+#         try:
+#             os.makedirs(os.path.dirname(destination_path), exist_ok=True)  # Ensure folder exists
+#             s3.download_file(bucket_name, file_key, destination_path)
+#             print(f"Downloaded: {file_key} -> {destination_path}")
+#         except Exception as e:
+#             print(f"Failed to download {file_key}: {str(e)}")
+
+#     def download_files_from_s3(self, s3, bucket_name: str, s3_folder: str, local_folder: str, file_extensions: list):
+#         """Download files from an S3 folder to a local folder."""
+#         try:
+#             response = s3.list_objects_v2(Bucket=bucket_name, Prefix=s3_folder)
+
+#             if 'Contents' not in response:
+#                 print(f"No files found in {s3_folder}")
+#                 return
+            
+#             for item in response['Contents']:
+#                 file_key = item['Key']
+#                 file_name = os.path.basename(file_key)
+
+#                 # Skip folders (empty file names)
+#                 if not file_name:
+#                     continue
+
+#                 # Filter by file extension
+#                 if file_extensions and not any(file_name.lower().endswith(ext) for ext in file_extensions):
+#                     continue
+
+#                 destination_path = os.path.join(local_folder, file_name)
+                
+#                 # Ensure proper permissions before writing
+#                 try:
+#                     if os.path.exists(destination_path):
+#                         print(f"File already exists: {destination_path}, skipping download.")
+#                         continue
+
+#                     self.download_file(s3, bucket_name, file_key, destination_path)
+#                 except PermissionError:
+#                     print(f"Permission error: Unable to save file to {destination_path}. Try running as Administrator.")
+                    
+#         except Exception as e:
+#             print(f"Error downloading files from {s3_folder}: {str(e)}")
+
+#     def _run(self) -> str:
+#         """Run the S3 download process for ID proofs."""
+#         try:
+#             s3 = self.connect_to_s3()
+#             if not s3:
+#                 return "S3 connection failed."
+
+#             # Define S3 source path for ID proofs
+#             id_proofs_s3_path = f"{parent_folder}/id_proof/"
+
+#             # Ensure local path exists
+#             os.makedirs(local_id_path, exist_ok=True)
+
+#             # Download ID proofs (.jpg)
+#             self.download_files_from_s3(s3, aws_bucket_name, id_proofs_s3_path, local_id_path, file_extensions=['.jpg','.pdf'])
+
+#             return f"Download completed successfully. Files saved to {local_id_path}"
+#         except Exception as e:
+#             return f"An error occurred: {str(e)}"
+
+
+import os
+import json
+import base64
+import threading
+from typing import List, Optional, Type
+from crewai.tools import BaseTool
+from PyPDF2 import PdfReader
+from pydantic import BaseModel, Field
+from banking.utils.preprocess import prepare_image
+
+# Azure OpenAI deployment used for ID extraction
+AZURE_DEPLOYMENT = os.getenv("AZURE_OPENAI_DEPLOYMENT", "gpt-4o")
+AZURE_API_VERSION = os.getenv("AZURE_OPENAI_API_VERSION", "2024-02-15-preview")
+
+# "structured": one schema-constrained call per applicant; "two_step": free-text vision call, then a parse call
+ID_EXTRACTION_MODE = os.getenv("ID_EXTRACTION_MODE", "structured").lower()
+# "json_schema" is stricter but needs api_version 2024-08-01-preview or later; function calling works on older ones
+AZURE_STRUCTURED_OUTPUT_METHOD = os.getenv("AZURE_STRUCTURED_OUTPUT_METHOD", "function_calling")
+
+_llm = None
+_llm_lock = threading.Lock()
+
+
+def get_llm():
+    """Returns the shared Azure chat model, creating it on first use (reads AZURE_OPENAI_API_KEY / AZURE_OPENAI_ENDPOINT)."""
+    global _llm
+    with _llm_lock:
+        if _llm is None:
+            from langchain_openai import AzureChatOpenAI
+            from banking.utils.llm_cache import LangchainLlmCache
+
+            _llm = AzureChatOpenAI(
+                azure_deployment=AZURE_DEPLOYMENT,
+                api_version=AZURE_API_VERSION,
+                temperature=0,
+                # Retries, backoff and concurrency are handled by the shared "llm" limiter (see invoke_llm)
+                max_retries=0,
+                # Same documents, same answers at temperature 0: re-runs and replays are served from the local cache
+                cache=LangchainLlmCache(AZURE_DEPLOYMENT, os.getenv("AZURE_OPENAI_ENDPOINT")),
+            )
+    return _llm
+
+
+def __getattr__(name):
+    # Keeps `custom_tool.llm` working without building the client at import time
+    if name == "llm":
+        return get_llm()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def invoke_llm(model, messages):
+    """Calls the model (or a structured-output runnable) through the shared LLM rate limiter."""
+    from banking.utils.rate_limit import get_limiter
+
+    return get_limiter("llm", AZURE_DEPLOYMENT).call(model.invoke, messages)
+
+
+def image_mime_type(base64_image):
+    """Pre-processed images are JPEG; originals kept because they were already smaller may be PNG."""
+    return "image/jpeg" if base64_image.startswith("/9j/") else "image/png"
+
+
+class IdDetails(BaseModel):
+    """ID fields read from one KYC document."""
+    document_type: Optional[str] = Field(None, description="Type of document, e.g. Aadhaar, PAN, passport, voter ID, driving licence.")
+    name: Optional[str] = Field(None, description="Full name of the holder exactly as printed, in English.")
+    father_name: Optional[str] = Field(None, description="Father's or guardian's name, if printed.")
+    date_of_birth: Optional[str] = Field(None, description="Date of birth as DD/MM/YYYY.")
+    gender: Optional[str] = Field(None, description="Gender as printed.")
+    id_number: Optional[str] = Field(None, description="Document number (Aadhaar number, PAN, passport number, ...).")
+    address: Optional[str] = Field(None, description="Full address on one line, if printed.")
+
+
+class IdDetailsBatch(BaseModel):
+    """Details for every document sent in one request, in the order they were given."""
+    documents: List[IdDetails] = Field(..., description="One entry per document, in the order the documents were given.")
+
+
+class IdExtractionInput(BaseModel):
+    """Input schema for IdExtractionTool."""
+    file_paths: Optional[List[str]] = Field(None, description="Paths of one applicant's ID documents (images or PDFs).")
+
+
+STRUCTURED_PROMPT = (
+    "You are given {count} KYC identity document(s) belonging to one applicant. "
+    "For each document, in order, extract the ID details exactly as printed. "
+    "Use null for anything that is not on the document; do not guess."
+)
+
+
+class IdExtractionTool(BaseTool):
+    name: str = "IdExtractionTool"
+    description: str = "Extracts ID details from images or PDFs."
+    args_schema: Type[BaseModel] = IdExtractionInput
+
+    # **Hardcoded file path**
+    file_pathid: str = os.getenv("ID_FILE_PATH", r"C:/Users/DHANYA MANOJ/Downloads/banking_crew_working/banking/kyc_path/Adhar Card.jpg") # Change to the actual file path
+    # IdExtractionTool(use_cache=False) always asks the model, e.g. for audit runs
+    use_cache: bool = True
+
+    def extract_text_from_pdf(self, file_pathid):
+        """Extracts text from a PDF file."""
+        text = ''
+        try:
+            with open(file_pathid, 'rb') as file:
+                pdf_reader = PdfReader(file)
+                for page in pdf_reader.pages:
+                    text += page.extract_text() or ''
+            print(f"Extracted Text from PDF: {text}")  # Debug print
+        except Exception as e:
+            print(f"Error extracting text from PDF: {e}")
+        return text
+
+    def encode_image(self, file_pathid):
+        """Encodes an image file as base64, after the shared pre-processing stage shrinks it."""
+        try:
+            with open(file_pathid, "rb") as image_file:
+                encoded = base64.b64encode(prepare_image(image_file.read(), file_pathid)).decode("utf-8")
+            print(f"Encoded image successfully: {file_pathid}")  # Debug print
+            return encoded
+        except Exception as e:
+            print(f"Error encoding image: {e}")
+            return None
+
+    def extract_text_from_image(self, file_pathid):
+        """Extracts text from an image using Azure LLM."""
+        base64_image = self.encode_image(file_pathid)
+        if not base64_image:
+            return "Failed to encode image."
+
+        messages = [
+            {"role": "user", "content": [
+                {"type": "text", "text": "Extract all data in the image"},
+                {"type": "image_url", "image_url": {"url": f"data:{image_mime_type(base64_image)};base64,{base64_image}"}}
+            ]}
+        ]
+
+        try:
+            ai_message = invoke_llm(get_llm(), messages)
+            print(f"AI Response for Image Extraction: {ai_message.content}")  # Debug print
+            return ai_message.content
+        except Exception as e:
+            print(f"Error extracting text from image: {e}")
+            return "Failed to extract text from image."
+
+    def extract_id_details(self, file_pathid):
+        """Determines file type and extracts text accordingly."""
+        print(f"Processing file: {file_pathid}")  # Debug print
+        if file_pathid.endswith('.pdf'):
+            return self.extract_text_from_pdf(file_pathid)
+        elif file_pathid.lower().endswith(('.jpg', '.jpeg', '.png')):
+            return self.extract_text_from_image(file_pathid)
+        else:
+            raise ValueError("Unsupported file type. Provide a PDF or image file.")
+
+    def parse_id_details(self, extracted_text):
+        """Processes extracted text using LLM for structured ID details."""
+        from langchain_core.messages import HumanMessage
+
+        messages = [HumanMessage(content=f"Extract structured ID details from text: {extracted_text}")]
+
+        try:
+            response = invoke_llm(get_llm(), messages)
+            print(f"Parsed ID Details: {response.content}")  # Debug print
+            return response.content
+        except Exception as e:
+            print(f"Error parsing ID details: {e}")
+            return "Failed to parse ID details."
+
+    def document_content(self, number, file_pathid):
+        """Message parts presenting one document: its text for PDFs, the pre-processed image otherwise."""
+        label = f"Document {number} ({os.path.basename(file_pathid)}):"
+        if file_pathid.lower().endswith('.pdf'):
+            return [{"type": "text", "text": f"{label}\n{self.extract_text_from_pdf(file_pathid)}"}]
+        if file_pathid.lower().endswith(('.jpg', '.jpeg', '.png')):
+            base64_image = self.encode_image(file_pathid)
+            if not base64_image:
+                raise ValueError(f"Failed to encode image: {file_pathid}")
+            return [
+                {"type": "text", "text": label},
+                {"type": "image_url", "image_url": {"url": f"data:{image_mime_type(base64_image)};base64,{base64_image}"}},
+            ]
+        raise ValueError("Unsupported file type. Provide a PDF or image file.")
+
+    def extract_structured(self, file_paths):
+        """Reads every document of one applicant in a single schema-constrained call, validated by IdDetailsBatch."""
+        from langchain_core.messages import HumanMessage
+
+        content = [{"type": "text", "text": STRUCTURED_PROMPT.format(count=len(file_paths))}]
+        for number, file_pathid in enumerate(file_paths, 1):
+            content.extend(self.document_content(number, file_pathid))
+
+        model = get_llm().with_structured_output(IdDetailsBatch, method=AZURE_STRUCTURED_OUTPUT_METHOD)
+        batch = invoke_llm(model, [HumanMessage(content=content)])
+        if len(batch.documents) != len(file_paths):
+            raise ValueError(f"Expected details for {len(file_paths)} documents, got {len(batch.documents)}")
+        return batch.documents
+
+    def _run(self, file_paths: Optional[List[str]] = None):
+        """Runs the ID extraction tool on the given files (default: the hardcoded file path)."""
+        if not self.use_cache:
+            from banking.utils.llm_cache import llm_cache_disabled
+
+            with llm_cache_disabled():
+                return self.extract(file_paths)
+        return self.extract(file_paths)
+
+    def extract(self, file_paths: Optional[List[str]] = None):
+        """Extracts and parses the ID details of the given files."""
+        file_paths = file_paths or [self.file_pathid]
+        print(f"Starting ID extraction process for: {', '.join(file_paths)}")  # Debug print
+
+        for file_pathid in file_paths:
+            if not os.path.exists(file_pathid):
+                print(f"File does not exist: {file_pathid}")  # Debug print
+                return "Error: File not found."
+
+        if ID_EXTRACTION_MODE == "two_step":
+            parsed = []
+            for file_pathid in file_paths:
+                extracted_text = self.extract_id_details(file_pathid)
+                parsed.append(self.parse_id_details(extracted_text))
+            parsed_details = "\n\n".join(parsed)
+        else:
+            try:
+                documents = self.extract_structured(file_paths)
+                parsed_details = json.dumps({"documents": [document.model_dump() for document in documents]}, indent=4)
+            except Exception as e:
+                print(f"Error extracting structured ID details: {e}")
+                return "Failed to parse ID details."
+
+        print(f"Final Parsed Output: {parsed_details}")  # Debug print
+        return parsed_details
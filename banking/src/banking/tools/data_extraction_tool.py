@@ -1,237 +1,413 @@
-import os
-import json
-import io
-import boto3
-import pytesseract
-import re
-from pdf2image import convert_from_path
-from PyPDF2 import PdfReader
-from dotenv import load_dotenv
-import trp.trp2 as t2
-from PIL import Image
-from crewai.tools import BaseTool
-from typing import Type
-from pydantic import BaseModel, Field
-from pymongo import MongoClient
-
-# Load environment variables
-load_dotenv()
-
-# MongoDB connection
-mongo_client = MongoClient(os.getenv("URL"))
-db = mongo_client["banking_ai_agent"]
-collection = db["test_enquiry_documents"]  # Collection storing document paths
-
-# S3 Configuration
-s3_client = boto3.client(
-    "s3",
-    aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
-    aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
-)
-s3_bucket = os.getenv("BUCKET_NAME")
-
-# AWS Textract Region
-region_name = os.getenv("AWS_REGION_NAME")
-
-# Paths for processing
-POPPLER_PATH = os.getenv("POPPLER_PATH")
-TESSERACT_PATH = os.getenv("TESSERACT_PATH")
-
-# Configure Tesseract
-pytesseract.pytesseract.tesseract_cmd = TESSERACT_PATH
-
-
-class DocumentExtractionInput(BaseModel):
-    """Input schema for AadhaarExtractionTool."""
-    request_id: str = Field(..., description="Request ID to fetch document path from MongoDB.")
-    output_path: str = Field(..., description="Path where extracted data JSON should be saved.")
-
-
-class DocumentExtractionTool(BaseTool):
-    """Tool for extracting Aadhaar details from documents using AWS Textract & OCR."""
-
-    name: str = "Aadhaar Extraction Tool"
-    description: str = (
-        "Fetches Aadhaar documents from MongoDB based on request_id, downloads them from S3, "
-        "and extracts Aadhaar details using AWS Textract and OCR."
-    )
-    args_schema: Type[BaseModel] = DocumentExtractionInput
-
-    def _run(self, request_id: str, output_path: str = None) -> str:
-        """Fetch document path from MongoDB, download from S3, extract Aadhaar details, and save back to MongoDB."""
-        file_path = self.fetch_document_from_mongo(request_id)
-        if not file_path:
-            return json.dumps({"error": f"No document found for request_id: {request_id}"})
-
-        # Download from S3
-        local_file_path = self.download_from_s3(file_path)
-        if not local_file_path:
-            return json.dumps({"error": "Failed to download file from S3"})
-
-        # Process document
-        extracted_data = self.process_document(local_file_path)
-
-        # Save extracted data to MongoDB
-        self.save_to_mongo(request_id, extracted_data)
-
-        return json.dumps({"message": "Extracted details saved to MongoDB", "request_id": request_id}, indent=4)
-
-    
-
-        
-
-    def fetch_document_from_mongo(self, request_id: str) -> str:
-        """Fetches the document path from MongoDB based on request_id."""
-        document = collection.find_one({"request_id": request_id}, {"Document_Path": 1})
-        if document and "Document_Path" in document:
-            return document["Document_Path"]
-        return ""
-
-    def download_from_s3(self, s3_full_path: str) -> str:
-        """Downloads the file from S3 to a temporary directory."""
-        try:
-            s3_key = s3_full_path.replace(f"s3://{s3_bucket}/", "", 1)
-            temp_file_path = os.path.join(os.getcwd(), os.path.basename(s3_key))
-            s3_client.download_file(s3_bucket, s3_key, temp_file_path)
-            return temp_file_path
-        except Exception as e:
-            print(f"Error downloading file from S3: {e}")
-            return ""
-
-    def process_document(self, file_path: str) -> dict:
-        """Extracts Aadhaar details from the document."""
-        img_bytes = self.read_img_pdf(file_path)
-        if not img_bytes:
-            return {"error": "Invalid file format or unable to process"}
-
-        queries = self.aadhaar_queries()
-        extracted_info = self.analyze_document(img_bytes, queries["query_list"], queries["quest_dict"])
-
-        if not extracted_info.get("DATE OF BIRTH") or not extracted_info.get("ADDRESS"):
-            ocr_data = self.extract_with_ocr(img_bytes)
-            extracted_info.update({k: v for k, v in ocr_data.items() if v})
-
-        return extracted_info
-
-    def read_img_pdf(self, filepath):
-        """Extracts image bytes from a PDF or image file."""
-        try:
-            if filepath.endswith(".pdf"):
-                images = convert_from_path(filepath, dpi=200, poppler_path=POPPLER_PATH)
-                if images:
-                    with io.BytesIO() as output:
-                        images[0].save(output, format="JPEG")
-                        return output.getvalue()
-            elif filepath.endswith((".png", ".jpg", ".jpeg")):
-                with open(filepath, "rb") as img_file:
-                    return img_file.read()
-        except Exception as e:
-            print(f"Error processing {filepath}: {str(e)}")
-            return None
-        return None
-
-    def analyze_document(self, image_bytes, query_list, quest_dict):
-        """Uses AWS Textract for extraction with OCR fallback."""
-        textract_client = boto3.client(
-            "textract",
-            region_name=region_name,
-            aws_access_key_id=os.getenv("ACCESS_KEY"),
-            aws_secret_access_key=os.getenv("SECRET_ACCESS_KEY"),
-        )
-
-        try:
-            response = textract_client.analyze_document(
-                Document={"Bytes": image_bytes},
-                FeatureTypes=["QUERIES"],
-                QueriesConfig={"Queries": query_list},
-            )
-
-            return self.extract_query_info(response, quest_dict)
-        except Exception as e:
-            print(f"Error analyzing document: {str(e)}")
-            return {"error": "AWS Textract failed"}
-
-    def extract_query_info(self, response, quest_dict):
-        """Extracts key-value pairs from Textract response."""
-        query_dict = {}
-        try:
-            doc = t2.TDocumentSchema().load(response)
-            page = doc.pages[0]
-            query_answers = doc.get_query_answers(page=page)
-
-            for answers in query_answers:
-                key_ = quest_dict.get(answers[0], answers[0])
-                query_dict[key_] = answers[-1]
-        except Exception as e:
-            print(f"Error extracting query info: {str(e)}")
-            return {"error": "Failed to extract query info"}
-        return query_dict
-
-    def extract_with_ocr(self, image_bytes):
-        """Fallback OCR extraction using Tesseract."""
-        try:
-            image = Image.open(io.BytesIO(image_bytes))
-            text = pytesseract.image_to_string(image)
-
-            dob_pattern = r"\b(\d{2}/\d{2}/\d{4})\b"
-            dob_match = re.search(dob_pattern, text)
-            dob = dob_match.group(1) if dob_match else None
-
-            address_start = text.find("Address")
-            address = text[address_start:].split("\n", 1)[-1].strip() if address_start != -1 else None
-
-            return {"DATE OF BIRTH": dob, "ADDRESS": address}
-        except Exception as e:
-            print(f"Error extracting OCR data: {str(e)}")
-            return {"error": "OCR extraction failed"}
-        
-    def save_to_mongo(self, request_id, extracted_data):
-        """Saves extracted Aadhaar details back to MongoDB under 'Extracted_Details'."""
-        try:
-            result = collection.update_one(
-                {"request_id": request_id},  # Find the document by request_id
-                {"$set": {"Extracted_Details": extracted_data}} ,
-                 upsert=True 
-            )
-
-            if result.modified_count > 0:
-                print(f"✅ Successfully updated MongoDB for request_id: {request_id}")
-            else:
-                print(f"⚠️ No document updated. Check if request_id '{request_id}' exists.")
-        
-        except Exception as e:
-            print(f"❌ Error saving extracted data to MongoDB: {str(e)}")
-
-
-    def aadhaar_queries(self):
-        """Defines queries for extracting Aadhaar details."""
-        query_list = [
-            {"Text": "What is the Aadhaar number?"},
-            {"Text": "What is the name of the Aadhaar cardholder?"},
-            {"Text": "What is the date of birth?"},
-            {"Text": "What is the gender?"},
-            {"Text": "What is full address?"}
-        ]
-        quest_dict = {
-            "What is the Aadhaar number?": "AADHAAR NUMBER",
-            "What is the name of the Aadhaar cardholder?": "NAME",
-            "What is the date of birth?": "DATE OF BIRTH",
-            "What is the gender?": "GENDER",
-            "What is full address?": "ADDRESS"
-        }
-        return {"query_list": query_list, "quest_dict": quest_dict}
-
-
-
-# test_input = AadhaarExtractionInput(
-#     request_id="REQ000008"  # Replace with an actual request_id from MongoDB
-# )
-
-# # Instantiate the tool
-# aadhaar_tool = AadhaarExtractionTool()
-
-# # Run the tool with test input
-# result_json = aadhaar_tool._run(test_input.request_id)
-
-# # Print output
+import os
+import json
+import io
+import boto3
+import hashlib
+import logging
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from crewai.tools import BaseTool
+from typing import Type
+from pydantic import BaseModel, Field
+from banking.utils.indexes import DOCUMENT_PROJECTION
+from banking.utils.mongo import get_collection
+from banking.utils.document_types import QUERY_SETS, classify_by_filename, classify_document, queries_for
+from banking.utils.preprocess import prepare_image
+from banking.utils.rasterize import dpi_for, page_count, render_page, render_pages
+from banking.utils.ocr import get_ocr_engine
+from banking.utils.rate_limit import aws_client_config, limiter_for
+from banking.utils.textract_cache import cache_key, textract_cache
+from banking.utils.textract_jobs import get_job_scheduler
+from banking.utils.textract_queries import answer_values, merge_answers, query_answers
+from banking.utils.write_behind import get_write_buffer
+
+logger = logging.getLogger(__name__)
+
+# MongoDB collection storing document paths (on the shared client)
+collection_name = "test_enquiry_documents"
+
+# S3 Configuration
+s3_bucket = os.getenv("BUCKET_NAME")
+
+# Objects larger than this are spooled to a temp file instead of held in memory
+S3_SPOOL_MAX_BYTES = int(float(os.getenv("S3_SPOOL_MAX_MB", "10")) * 1024 * 1024)
+
+# AWS Textract Region
+region_name = os.getenv("AWS_REGION_NAME")
+
+# Multi-page PDFs: how many pages to extract, concurrently, and when to hand the whole bundle to async Textract
+MULTIPAGE_MAX_PAGES = int(os.getenv("MULTIPAGE_MAX_PAGES", "4"))
+MULTIPAGE_WORKERS = int(os.getenv("MULTIPAGE_WORKERS", "4"))
+TEXTRACT_ASYNC_MIN_PAGES = int(os.getenv("TEXTRACT_ASYNC_MIN_PAGES", "0"))  # 0 disables StartDocumentAnalysis
+
+# Page 1 of async bundles is rendered this small, just for the document-type router
+ROUTER_THUMBNAIL_DPI = int(os.getenv("ROUTER_THUMBNAIL_DPI", "50"))
+
+# AWS clients are created on first use and shared by every tool instance (boto3 clients are thread-safe)
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_s3_client():
+    """Returns the shared S3 client, creating it on first use."""
+    with _clients_lock:
+        if "s3" not in _clients:
+            _clients["s3"] = boto3.client(
+                "s3",
+                aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
+                aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
+                config=aws_client_config(),
+            )
+        return _clients["s3"]
+
+
+def get_textract_client():
+    """Returns the shared Textract client, creating it on first use."""
+    with _clients_lock:
+        if "textract" not in _clients:
+            _clients["textract"] = boto3.client(
+                "textract",
+                region_name=region_name,
+                aws_access_key_id=os.getenv("ACCESS_KEY"),
+                aws_secret_access_key=os.getenv("SECRET_ACCESS_KEY"),
+                config=aws_client_config(),
+            )
+        return _clients["textract"]
+
+
+
+class DocumentExtractionInput(BaseModel):
+    """Input schema for AadhaarExtractionTool."""
+    request_id: str = Field(..., description="Request ID to fetch document path from MongoDB.")
+    output_path: str = Field(..., description="Path where extracted data JSON should be saved.")
+
+
+class DocumentExtractionTool(BaseTool):
+    """Tool for extracting Aadhaar details from documents using AWS Textract & OCR."""
+
+    name: str = "Aadhaar Extraction Tool"
+    description: str = (
+        "Fetches Aadhaar documents from MongoDB based on request_id, downloads them from S3, "
+        "and extracts Aadhaar details using AWS Textract and OCR."
+    )
+    args_schema: Type[BaseModel] = DocumentExtractionInput
+
+    def _run(self, request_id: str, output_path: str = None) -> str:
+        """Fetch document path from MongoDB, download from S3, extract Aadhaar details, and save back to MongoDB."""
+        extracted_data = self.extract(request_id)
+        if "error" in extracted_data and len(extracted_data) == 1:
+            return json.dumps(extracted_data)
+
+        return json.dumps({"message": "Extracted details saved to MongoDB", "request_id": request_id}, indent=4)
+
+    
+
+        
+
+    def extract(self, request_id: str) -> dict:
+        """Runs the extraction for a request, saves it to MongoDB and returns the extracted details."""
+        record = self.fetch_document_record(request_id)
+        file_path = record.get("Document_Path", "")
+        if not file_path:
+            return {"error": f"No document found for request_id: {request_id}"}
+
+        # Details already extracted from this same document are kept; only the fields still missing are queried
+        known = {}
+        if record.get("Extracted_From") == file_path and isinstance(record.get("Extracted_Details"), dict):
+            known = {k: v for k, v in record["Extracted_Details"].items() if v and k != "error"}
+            document_type = record.get("Document_Type")
+            if document_type and not queries_for(document_type, known)["query_list"]:
+                return record["Extracted_Details"]
+
+        # Stream from S3 into memory (or a temp file for large objects)
+        document = self.download_from_s3(file_path)
+        if document is None:
+            return {"error": "Failed to download file from S3"}
+
+        # Process document
+        try:
+            with document:
+                extracted_data, document_type = self.extract_details(
+                    os.path.basename(file_path), document, self.s3_key(file_path), known)
+        finally:
+            self.remove_spool(document)
+
+        # Save extracted data to MongoDB
+        self.save_to_mongo(request_id, extracted_data, file_path, document_type)
+        return extracted_data
+
+    def fetch_document_record(self, request_id: str) -> dict:
+        """Fetches the document path, and any earlier extraction of it, from MongoDB based on request_id."""
+        document = get_collection(collection_name).find_one(
+            {"request_id": request_id}, DOCUMENT_PROJECTION)
+        # Results saved moments ago may still be waiting in the write-behind buffer
+        return get_write_buffer(collection_name).overlay(request_id, document) or {}
+
+    def fetch_document_from_mongo(self, request_id: str) -> str:
+        """Fetches the document path from MongoDB based on request_id."""
+        return self.fetch_document_record(request_id).get("Document_Path", "")
+
+    def s3_key(self, s3_full_path: str) -> str:
+        """Strips the s3://bucket/ prefix from a stored document path."""
+        return s3_full_path.replace(f"s3://{s3_bucket}/", "", 1)
+
+    def download_from_s3(self, s3_full_path: str):
+        """Streams the file from S3 into memory, spilling to a unique temp file only above S3_SPOOL_MAX_BYTES."""
+        try:
+            s3_key = self.s3_key(s3_full_path)
+            s3 = get_s3_client()
+            s3_object = limiter_for(s3).call(s3.get_object, Bucket=s3_bucket, Key=s3_key)
+
+            if s3_object.get("ContentLength", 0) > S3_SPOOL_MAX_BYTES:
+                # Not deleted on close: Windows cannot reopen a delete-on-close file by name. The name is unique
+                # per download, and the caller removes it with remove_spool()
+                document = tempfile.NamedTemporaryFile(suffix=os.path.splitext(s3_key)[1], delete=False)
+            else:
+                document = io.BytesIO()
+
+            try:
+                for chunk in s3_object["Body"].iter_chunks(chunk_size=1024 * 1024):
+                    document.write(chunk)
+            except Exception:
+                document.close()
+                self.remove_spool(document)
+                raise
+            document.seek(0)
+            return document
+        except Exception as e:
+            print(f"Error downloading file from S3: {e}")
+            return None
+
+    @staticmethod
+    def remove_spool(document):
+        """Deletes the temp file a large download was spooled to; in-memory downloads have nothing to remove."""
+        path = getattr(document, "name", None)
+        if isinstance(path, str):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def process_document(self, file_path: str, document=None, s3_key: str = None, known: dict = None) -> dict:
+        """Extracts KYC details from the document, reading every page of multi-page PDFs."""
+        return self.extract_details(file_path, document, s3_key, known)[0]
+
+    def extract_details(self, file_path: str, document=None, s3_key: str = None, known: dict = None):
+        """
+        Classifies the document locally, then queries only its fields missing from `known`.
+        Returns (extracted details, document type).
+        """
+        known = known or {}
+        source = document if document is not None else file_path
+        pages = self.count_pages(file_path, document)
+        use_async = bool(pages > 1 and TEXTRACT_ASYNC_MIN_PAGES and pages >= TEXTRACT_ASYNC_MIN_PAGES
+                         and s3_key and document is not None)
+
+        # Page 1 drives classification: a low-resolution render for async bundles, the real page otherwise.
+        # Until the router has run, PDFs render at the resolution for the type the filename suggests
+        hint = classify_by_filename(file_path)
+        images = []
+        if use_async:
+            img_bytes = None
+            first_page = render_page(source, dpi=ROUTER_THUMBNAIL_DPI) or None
+        elif pages > 1 and MULTIPAGE_MAX_PAGES > 1:
+            images = [image for image in render_pages(source, range(1, min(pages, MULTIPAGE_MAX_PAGES) + 1), hint)
+                      if image]
+            img_bytes = first_page = images[0] if images else None
+        else:
+            img_bytes = first_page = self.read_img_pdf(file_path, document, hint)
+            images = [img_bytes] if img_bytes else []
+        if not first_page:
+            return {"error": "Invalid file format or unable to process"}, None
+
+        document_type = classify_document(first_page, file_path)
+        if images and file_path.lower().endswith(".pdf") and dpi_for(document_type) != dpi_for(hint):
+            # The router picked a type with another render resolution; Textract reads pages rendered for it
+            images = [image for image in render_pages(source, range(1, len(images) + 1), document_type) if image]
+            img_bytes = first_page = images[0] if images else None
+            if not first_page:
+                return {"error": "Invalid file format or unable to process"}, None
+        queries = queries_for(document_type, known)
+        logger.debug("Document %s classified as %s; querying %d fields", file_path, document_type,
+                     len(queries["query_list"]))
+
+        # Classification needed the colour original; Textract and OCR get the smaller normalised scans
+        images = self.prepare_pages(images, file_path)
+        img_bytes = images[0] if images else img_bytes
+
+        answers = {}
+        if queries["query_list"]:
+            answers = None
+            if use_async:
+                answers = self.analyze_async(s3_key, document, queries["query_list"], queries["quest_dict"])
+                if answers is None:
+                    images = self.prepare_pages(
+                        [image for image in render_pages(source, range(1, min(pages, MULTIPAGE_MAX_PAGES) + 1),
+                                                         document_type) if image],
+                        file_path)
+            if answers is None:
+                answers = self.analyze_pages(images, queries["query_list"], queries["quest_dict"])
+
+        if answers is None:
+            extracted_info = {**known, "error": "AWS Textract failed"}
+        else:
+            extracted_info = {**known, **{k: v for k, v in answer_values(answers).items() if v or k not in known}}
+
+        # OCR only the fields Textract missed, cropped to where they sit on the page
+        ocr_fields = [field for field in ("DATE OF BIRTH", "ADDRESS")
+                      if field in QUERY_SETS.get(document_type, {}) and not extracted_info.get(field)]
+        if ocr_fields:
+            textract_response = None
+            if img_bytes is None:
+                img_bytes = prepare_image(self.read_img_pdf(file_path, document, document_type), file_path)
+            elif queries["query_list"]:
+                # Page 1 was analysed synchronously, so its LINE geometry is in the cache
+                textract_response = textract_cache.get(cache_key(img_bytes, queries["query_list"]))
+            if img_bytes:
+                ocr_data = self.extract_with_ocr(img_bytes, ocr_fields, document_type, textract_response)
+                extracted_info.update({k: v for k, v in ocr_data.items() if v and k in ocr_fields})
+
+        return extracted_info, document_type
+
+    def prepare_pages(self, images, file_path: str) -> list:
+        """Runs every page image through the shared pre-processing stage (greyscale, deskew, crop, downscale)."""
+        if len(images) == 1:
+            return [prepare_image(images[0], file_path)]
+        return [prepare_image(image, f"{file_path} page {number}") for number, image in enumerate(images, 1)]
+
+    def count_pages(self, file_path: str, document=None) -> int:
+        """Returns the page count of a PDF (1 for images or unreadable files)."""
+        if not file_path.lower().endswith(".pdf"):
+            return 1
+        try:
+            return page_count(document if document is not None else file_path)
+        except Exception as e:
+            print(f"Error reading page count of {file_path}: {str(e)}")
+            return 1
+
+    def read_img_pdf(self, filepath, document=None, document_type=None):
+        """
+        Extracts image bytes from a PDF or image, given as a local path or an already open file object.
+        PDFs are rendered at the resolution configured for `document_type`.
+        """
+        try:
+            name = filepath.lower()
+            if name.endswith(".pdf"):
+                # Only the first page is rendered, straight to JPEG, within the render memory ceiling
+                return render_page(document if document is not None else filepath, document_type=document_type) or None
+            elif name.endswith((".png", ".jpg", ".jpeg")):
+                if document is not None:
+                    return document.read()
+                with open(filepath, "rb") as img_file:
+                    return img_file.read()
+        except Exception as e:
+            print(f"Error processing {filepath}: {str(e)}")
+            return None
+        return None
+
+    def analyze_document(self, image_bytes, query_list, quest_dict):
+        """Uses AWS Textract for extraction with OCR fallback."""
+        answers = self.analyze_answers(image_bytes, query_list, quest_dict)
+        if answers is None:
+            return {"error": "AWS Textract failed"}
+        return answer_values(answers)
+
+    def analyze_answers(self, image_bytes, query_list, quest_dict):
+        """Runs Textract queries on one page image and returns {field: (answer, confidence)}, or None on failure."""
+        try:
+            # Identical scans with the same queries are answered from the cache
+            response = textract_cache.get_or_compute(
+                image_bytes,
+                query_list,
+                lambda: limiter_for(get_textract_client()).call(
+                    get_textract_client().analyze_document,
+                    Document={"Bytes": image_bytes},
+                    FeatureTypes=["QUERIES"],
+                    QueriesConfig={"Queries": query_list},
+                ),
+            )
+            return query_answers(response, quest_dict)
+        except Exception as e:
+            print(f"Error analyzing document: {str(e)}")
+            return None
+
+    def analyze_pages(self, images, query_list, quest_dict):
+        """Queries every page image concurrently and merges the answers by confidence."""
+        if not images:
+            return None
+        with ThreadPoolExecutor(max_workers=max(1, min(len(images), MULTIPAGE_WORKERS))) as executor:
+            per_page = [answers for answers in executor.map(
+                lambda image: self.analyze_answers(image, query_list, quest_dict), images) if answers is not None]
+        return merge_answers(per_page) if per_page else None
+
+    def analyze_async(self, s3_key, document, query_list, quest_dict):
+        """Analyses a whole multi-page S3 document with StartDocumentAnalysis, polled by the shared scheduler."""
+        try:
+            # Cache on the document's content hash, streamed so large bundles are not read into memory at once
+            digest = hashlib.sha256()
+            document.seek(0)
+            for chunk in iter(lambda: document.read(1024 * 1024), b""):
+                digest.update(chunk)
+            document.seek(0)
+
+            response = textract_cache.get_or_compute(
+                digest.digest(),
+                query_list,
+                lambda: get_job_scheduler(get_textract_client).analyze(s3_bucket, s3_key, query_list),
+            )
+            return query_answers(response, quest_dict)
+        except Exception as e:
+            print(f"Error analyzing document asynchronously: {str(e)}")
+            return None
+
+    def extract_query_info(self, response, quest_dict):
+        """Extracts key-value pairs from Textract response, keeping the most confident answer across all pages."""
+        try:
+            return answer_values(query_answers(response, quest_dict))
+        except Exception as e:
+            print(f"Error extracting query info: {str(e)}")
+            return {"error": "Failed to extract query info"}
+
+    def extract_with_ocr(self, image_bytes, fields=("DATE OF BIRTH", "ADDRESS"), document_type="aadhaar",
+                         textract_response=None):
+        """Fallback OCR extraction using Tesseract, on the pooled workers and only over the fields' regions."""
+        try:
+            return get_ocr_engine().extract_fields(image_bytes, fields, document_type, textract_response)
+        except Exception as e:
+            print(f"Error extracting OCR data: {str(e)}")
+            return {"error": "OCR extraction failed"}
+        
+    def save_to_mongo(self, request_id, extracted_data, source=None, document_type=None):
+        """Saves extracted details back to MongoDB under 'Extracted_Details', with the document they came from."""
+        try:
+            update = {"Extracted_Details": extracted_data}
+            if source:
+                update["Extracted_From"] = source
+            if document_type:
+                update["Document_Type"] = document_type
+            # Batched with other requests' results into one bulk write, flushed by size or age
+            get_write_buffer(collection_name).set(request_id, update, upsert=True)
+        
+        except Exception as e:
+            print(f"❌ Error saving extracted data to MongoDB: {str(e)}")
+
+
+    def aadhaar_queries(self):
+        """Defines queries for extracting Aadhaar details."""
+        return queries_for("aadhaar")
+
+
+
+# test_input = AadhaarExtractionInput(
+#     request_id="REQ000008"  # Replace with an actual request_id from MongoDB
+# )
+
+# # Instantiate the tool
+# aadhaar_tool = AadhaarExtractionTool()
+
+# # Run the tool with test input
+# result_json = aadhaar_tool._run(test_input.request_id)
+
+# # Print output
 # print("MongoDB Update Status:\n", json.loads(result_json))
\ No newline at end of file
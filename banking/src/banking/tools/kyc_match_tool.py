@@ -0,0 +1,45 @@
+from crewai.tools import BaseTool
+from typing import Type, Dict, Any
+from pydantic import BaseModel, Field
+from banking.utils.indexes import RECORD_PROJECTION
+from banking.utils.kyc_matching import match_kyc
+from banking.utils.mongo import get_database
+from banking.utils.write_behind import get_write_buffer
+
+class KycMatchInput(BaseModel):
+    """Input schema for KycMatchTool."""
+    request_id: str = Field(..., description="The request ID whose stored details should be compared with the extracted document details.")
+
+class KycMatchTool(BaseTool):
+    name: str = "kyc_match_tool"
+    description: str = (
+        "Compares the applicant record in 'test_account_data' with the 'Extracted_Details' of their document "
+        "and returns a score and status (match, mismatch, ambiguous or missing) for first name, last name, "
+        "Aadhaar number and address, plus an overall status of verified, failed or ambiguous."
+    )
+
+    args_schema: Type[BaseModel] = KycMatchInput
+
+    record_collection: str = "test_account_data"  # Applicant details as submitted
+    document_collection: str = "test_enquiry_documents"  # Details extracted from the documents
+
+    def _run(self, request_id: str) -> Dict[str, Any]:
+        try:
+            db = get_database("banking_ai_agent")
+
+            record = db[self.record_collection].find_one({"request_id": request_id}, RECORD_PROJECTION)
+            if not record:
+                return {"error": f"No document found for request_id '{request_id}' in '{self.record_collection}'."}
+
+            document = db[self.document_collection].find_one({"request_id": request_id}, {"_id": 0, "Extracted_Details": 1})
+            # The extraction tool's write may still be buffered
+            document = get_write_buffer(self.document_collection, "banking_ai_agent").overlay(request_id, document)
+            if not document or not document.get("Extracted_Details"):
+                return {"error": f"No extracted details found for request_id '{request_id}' in '{self.document_collection}'."}
+
+            result = match_kyc(record, document["Extracted_Details"])
+            result["request_id"] = request_id
+            return result
+
+        except Exception as e:
+            return {"error": f"Error matching KYC details: {e}"}
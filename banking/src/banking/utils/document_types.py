@@ -0,0 +1,161 @@
+import io
+import os
+import re
+import logging
+from typing import Any, Dict, Iterable, Optional
+
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DOCUMENT_TYPE = os.getenv("DEFAULT_DOCUMENT_TYPE", "aadhaar")
+TESSERACT_PATH = os.getenv("TESSERACT_PATH")
+# Read keywords off a small greyscale thumbnail when filename and colour cues are inconclusive
+DOCUMENT_ROUTER_OCR = os.getenv("DOCUMENT_ROUTER_OCR", "true").lower() in ("1", "true", "yes")
+THUMBNAIL_PX = 128
+OCR_THUMBNAIL_PX = 900
+
+# One Textract question per field, so nothing is asked (or billed) twice
+QUERY_SETS: Dict[str, Dict[str, str]] = {
+    "aadhaar": {
+        "AADHAAR NUMBER": "What is the Aadhaar number?",
+        "NAME": "What is the name of the Aadhaar cardholder?",
+        "DATE OF BIRTH": "What is the date of birth?",
+        "GENDER": "What is the gender?",
+        "ADDRESS": "What is full address?",
+    },
+    "pan": {
+        "PAN NUMBER": "What is the Permanent Account Number?",
+        "NAME": "What is the name of the cardholder?",
+        "FATHER NAME": "What is the father's name?",
+        "DATE OF BIRTH": "What is the date of birth?",
+    },
+    "passport": {
+        "PASSPORT NUMBER": "What is the passport number?",
+        "NAME": "What is the full name of the passport holder?",
+        "DATE OF BIRTH": "What is the date of birth?",
+        "GENDER": "What is the sex?",
+        "DATE OF EXPIRY": "What is the date of expiry?",
+        "ADDRESS": "What is the address?",
+    },
+    "voter_id": {
+        "EPIC NUMBER": "What is the voter ID (EPIC) number?",
+        "NAME": "What is the elector's name?",
+        "DATE OF BIRTH": "What is the date of birth?",
+        "GENDER": "What is the gender?",
+        "ADDRESS": "What is the address?",
+    },
+    "driving_licence": {
+        "LICENCE NUMBER": "What is the driving licence number?",
+        "NAME": "What is the name of the licence holder?",
+        "DATE OF BIRTH": "What is the date of birth?",
+        "ADDRESS": "What is the address?",
+        "DATE OF EXPIRY": "What is the validity date?",
+    },
+}
+
+FILENAME_HINTS = [
+    ("pan", re.compile(r"(^|[^a-z])pan([^a-z]|card|$)")),
+    ("aadhaar", re.compile(r"aadh?aa?r|adhar|uidai")),
+    ("passport", re.compile(r"passport")),
+    ("voter_id", re.compile(r"voter|epic|election")),
+    ("driving_licence", re.compile(r"driving|licen[cs]e|(^|[^a-z])dl([^a-z]|$)")),
+]
+
+TEXT_HINTS = [
+    ("pan", re.compile(r"(?i:income\s*tax|permanent\s*account)|\b[A-Z]{5}\d{4}[A-Z]\b")),
+    ("aadhaar", re.compile(r"aadhaar|unique\s*identification|uidai|\b\d{4}\s\d{4}\s\d{4}\b", re.IGNORECASE)),
+    ("passport", re.compile(r"passport|republic\s*of\s*india|P<IND", re.IGNORECASE)),
+    ("voter_id", re.compile(r"election\s*commission|elector", re.IGNORECASE)),
+    ("driving_licence", re.compile(r"driving\s*licen[cs]e|transport", re.IGNORECASE)),
+]
+
+
+def classify_by_filename(filename: Optional[str]) -> Optional[str]:
+    """Returns the document type named in the upload's filename, if any."""
+    name = os.path.basename(filename or "").lower()
+    for document_type, pattern in FILENAME_HINTS:
+        if pattern.search(name):
+            return document_type
+    return None
+
+
+def classify_by_colour(image: Image.Image) -> Optional[str]:
+    """Aadhaar prints carry saffron and green bands; PAN cards are printed on a pale blue ground."""
+    pixels = np.asarray(image.convert("RGB"), dtype=np.int16)
+    red, green, blue = pixels[..., 0], pixels[..., 1], pixels[..., 2]
+    white = (red > 235) & (green > 235) & (blue > 235)
+    inked = max(int((~white).sum()), 1)
+
+    saffron = ((red > 200) & (green > 70) & (green < 180) & (blue < 110) & (red - green > 50)).mean()
+    green_band = ((green > 120) & (green - red > 40) & (green - blue > 30)).mean()
+    blue_ground = ((blue > 170) & (blue - red > 12) & ~white).sum() / inked
+
+    if saffron > 0.01 and green_band > 0.01:
+        return "aadhaar"
+    if blue_ground > 0.4:
+        return "pan"
+    return None
+
+
+def classify_by_text(image_bytes: bytes) -> Optional[str]:
+    """Looks for issuer keywords in a quick Tesseract pass over a greyscale thumbnail."""
+    try:
+        import pytesseract
+
+        if TESSERACT_PATH:
+            pytesseract.pytesseract.tesseract_cmd = TESSERACT_PATH
+        thumbnail = Image.open(io.BytesIO(image_bytes))
+        thumbnail.draft("L", (OCR_THUMBNAIL_PX, OCR_THUMBNAIL_PX))
+        thumbnail = thumbnail.convert("L")
+        thumbnail.thumbnail((OCR_THUMBNAIL_PX, OCR_THUMBNAIL_PX))
+        text = pytesseract.image_to_string(thumbnail)
+    except Exception as e:
+        logger.debug("Document router OCR unavailable: %s", e)
+        return None
+
+    for document_type, pattern in TEXT_HINTS:
+        if pattern.search(text):
+            return document_type
+    return None
+
+
+def classify_document(image_bytes: bytes, filename: Optional[str] = None) -> str:
+    """Cheap local guess at the KYC document type, made before any Textract call."""
+    document_type = classify_by_filename(filename)
+    if document_type:
+        return document_type
+
+    try:
+        image = Image.open(io.BytesIO(image_bytes))
+        # JPEG draft mode decodes at reduced scale, so the full-size scan is never expanded in memory
+        image.draft("RGB", (THUMBNAIL_PX * 2, THUMBNAIL_PX * 2))
+        thumbnail = image.convert("RGB")
+        thumbnail.thumbnail((THUMBNAIL_PX, THUMBNAIL_PX))
+    except Exception as e:
+        logger.warning("Error reading document for classification: %s", e)
+        return DEFAULT_DOCUMENT_TYPE
+
+    document_type = classify_by_colour(thumbnail)
+    if document_type is None and DOCUMENT_ROUTER_OCR:
+        document_type = classify_by_text(image_bytes)
+    return document_type or DEFAULT_DOCUMENT_TYPE
+
+
+def queries_for(document_type: str, known: Optional[Dict[str, Any]] = None,
+                fields: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """
+    Builds the Textract query list for a document type, asking only for fields not already in `known`
+    (optionally restricted to `fields`). Returns {"query_list", "quest_dict"} as the extractors expect.
+    """
+    query_set = QUERY_SETS.get(document_type, QUERY_SETS[DEFAULT_DOCUMENT_TYPE])
+    wanted = set(fields) if fields is not None else set(query_set)
+    known = known or {}
+
+    query_list, quest_dict = [], {}
+    for field, question in query_set.items():
+        if field in wanted and not known.get(field):
+            query_list.append({"Text": question})
+            quest_dict[question] = field
+    return {"query_list": query_list, "quest_dict": quest_dict}
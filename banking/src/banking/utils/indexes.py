@@ -0,0 +1,134 @@
+import os
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from pymongo import ASCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+from banking.utils.kyc_matching import RECORD_FIELDS
+from banking.utils.mongo import DEFAULT_DATABASE, get_collection
+from banking.utils.work_queue import CLAIM_INDEX, MongoWorkQueue, utcnow
+
+database_name = os.getenv("DB")
+collection_name = os.getenv("COLLECTION1")
+
+# Every tool looks requests up by request_id; unique also makes the tools' upserts safe against races
+REQUEST_ID_INDEX = IndexModel([("request_id", ASCENDING)], name="request_id_unique", unique=True)
+
+# Projections: only the fields each reader uses travel over the wire
+RECORD_PROJECTION = {"_id": 0, **{field: 1 for field in RECORD_FIELDS.values()}}
+APPLICANT_PROJECTION = {
+    **RECORD_PROJECTION,
+    "request_id": 1,
+    "customer_pan_number": 1,
+    "customer_residence_state": 1,
+    "customer_contact_number": 1,
+    "customer_email_address": 1,
+    "customer_account_type": 1,
+    "status_flag": 1,
+    "account_id": 1,
+}
+DOCUMENT_PROJECTION = {"_id": 0, "Document_Path": 1, "Extracted_Details": 1, "Extracted_From": 1, "Document_Type": 1}
+# Served from the request_id index alone, without reading the document
+EXISTS_PROJECTION = {"_id": 0, "request_id": 1}
+ACCOUNT_PROJECTION = {"_id": 0, "account_no": 1}
+
+
+def required_indexes() -> Dict[Tuple[str, str], List[IndexModel]]:
+    """The indexes every KYC collection needs, keyed by (database, collection)."""
+    indexes = {
+        (DEFAULT_DATABASE, "test_account_data"): [REQUEST_ID_INDEX],
+        (DEFAULT_DATABASE, "test_enquiry_documents"): [REQUEST_ID_INDEX],
+        (DEFAULT_DATABASE, "test_account_final"): [REQUEST_ID_INDEX],
+    }
+    if collection_name:
+        requests = (database_name or DEFAULT_DATABASE, collection_name)
+        indexes[requests] = indexes.get(requests, [REQUEST_ID_INDEX]) + [CLAIM_INDEX]
+    return indexes
+
+
+def ensure_indexes(uri: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Creates any missing index; existing ones are left alone, so this is safe to run on every deploy.
+    Returns one entry per index with status created, exists or failed (e.g. duplicate request_ids).
+    """
+    report = []
+    for (database, name), models in required_indexes().items():
+        collection = get_collection(name, database, uri)
+        existing = set(collection.index_information())
+        for model in models:
+            index = model.document["name"]
+            entry = {"collection": f"{database}.{name}", "index": index, "status": "exists"}
+            if index not in existing:
+                try:
+                    collection.create_indexes([model])
+                    entry["status"] = "created"
+                except OperationFailure as e:
+                    entry.update(status="failed", error=str(e))
+            report.append(entry)
+    return report
+
+
+def _stages(plan: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    yield plan
+    if "inputStage" in plan:
+        yield from _stages(plan["inputStage"])
+    for child in plan.get("inputStages", []):
+        yield from _stages(child)
+
+
+def explain_query(collection, filter: Dict[str, Any], projection: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Summarises the winning plan of a find: the index used, whether it scans the collection and whether it is covered."""
+    plan = collection.find(filter, projection).limit(1).explain()
+    winning = plan["queryPlanner"]["winningPlan"]
+    # Slot-based engine (MongoDB 7+) nests the classic tree under queryPlan
+    stages = list(_stages(winning.get("queryPlan", winning)))
+    names = [stage["stage"] for stage in stages]
+    stats = plan.get("executionStats", {})
+    return {
+        "stages": names,
+        "index": next((stage["indexName"] for stage in stages if "indexName" in stage), None),
+        "collscan": "COLLSCAN" in names,
+        "covered": "COLLSCAN" not in names and "FETCH" not in names,
+        "keys_examined": stats.get("totalKeysExamined"),
+        "docs_examined": stats.get("totalDocsExamined"),
+    }
+
+
+def query_shapes() -> List[Dict[str, Any]]:
+    """The queries the tools and the batch runner issue, with the plan each must get."""
+    sample = "REQ000000"
+    shapes = [
+        {"name": "fetch applicant", "collection": (DEFAULT_DATABASE, "test_account_data"),
+         "filter": {"request_id": sample}, "projection": APPLICANT_PROJECTION},
+        {"name": "applicant exists", "collection": (DEFAULT_DATABASE, "test_account_data"),
+         "filter": {"request_id": sample}, "projection": EXISTS_PROJECTION, "covered": True},
+        {"name": "kyc match record", "collection": (DEFAULT_DATABASE, "test_account_data"),
+         "filter": {"request_id": sample}, "projection": RECORD_PROJECTION},
+        {"name": "extracted details", "collection": (DEFAULT_DATABASE, "test_enquiry_documents"),
+         "filter": {"request_id": sample}, "projection": DOCUMENT_PROJECTION},
+        {"name": "account number", "collection": (DEFAULT_DATABASE, "test_account_final"),
+         "filter": {"request_id": sample}, "projection": ACCOUNT_PROJECTION},
+    ]
+    if collection_name:
+        requests = (database_name or DEFAULT_DATABASE, collection_name)
+        shapes += [
+            {"name": "pending requests", "collection": requests,
+             "filter": {"status_flag": False, "account_id": None}, "projection": EXISTS_PROJECTION},
+            {"name": "work queue claim", "collection": requests,
+             "filter": MongoWorkQueue.pending_filter(utcnow()), "projection": EXISTS_PROJECTION},
+        ]
+    return shapes
+
+
+def check_query_plans(uri: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Explains every query shape against the live database. A shape fails if it uses no index, or is expected
+    to be covered but fetches documents. Run it against a local mongod after ensure_indexes.
+    """
+    results = []
+    for shape in query_shapes():
+        database, name = shape["collection"]
+        plan = explain_query(get_collection(name, database, uri), shape["filter"], shape["projection"])
+        ok = plan["index"] is not None and not plan["collscan"] and (plan["covered"] or not shape.get("covered"))
+        results.append({"name": shape["name"], "collection": f"{database}.{name}", "ok": ok, **plan})
+    return results
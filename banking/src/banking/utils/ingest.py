@@ -0,0 +1,235 @@
+import os
+import re
+import csv
+import json
+import time
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from banking.utils.indexes import REQUEST_ID_INDEX
+from banking.utils.intake import INTAKE_TIMESTAMP_FIELD
+from banking.utils.mongo import DEFAULT_DATABASE, get_collection
+from banking.utils.work_queue import utcnow
+
+logger = logging.getLogger(__name__)
+
+# Rows per bulk_write, and how many bulk_writes run at once; memory holds at most workers + 1 chunks
+INGEST_CHUNK_ROWS = int(os.getenv("INGEST_CHUNK_ROWS", "5000"))
+INGEST_WRITE_WORKERS = int(os.getenv("INGEST_WRITE_WORKERS", "4"))
+INGEST_COLLECTION = os.getenv("INGEST_COLLECTION", "test_account_data")
+
+# Upstream feed column -> stored field
+RENAMED_COLUMNS = {"bank_request_id": "request_id"}
+NULL_TOKENS = {"", "none", "null", "nan", "n/a", "na", "-"}
+TRUE_TOKENS = {"true", "yes", "y", "1", "approved", "completed", "onboarded"}
+FALSE_TOKENS = {"false", "no", "n", "0", "pending", "rejected"}
+# Owned by the pipeline once a request exists: a re-sent feed row must not reopen an onboarded request
+INSERT_ONLY_FIELDS = {"status_flag", "account_id"}
+
+AADHAAR_PATTERN = re.compile(r"^\d{12}$")
+PAN_PATTERN = re.compile(r"^[A-Z]{5}\d{4}[A-Z]$")
+
+
+def to_text(value: str) -> str:
+    return value
+
+
+def to_date(value: str) -> datetime:
+    for fmt in ("%d-%m-%Y", "%Y-%m-%d", "%d/%m/%Y"):
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    raise ValueError(f"unrecognised date {value!r}")
+
+
+def to_time(value: str) -> str:
+    return datetime.strptime(value, "%H:%M:%S").strftime("%H:%M:%S")
+
+
+def to_amount(value: str) -> float:
+    return float(value.replace(",", ""))
+
+
+def to_int(value: str) -> int:
+    return int(float(value.replace(",", "")))
+
+
+def to_bool(value: str) -> bool:
+    token = value.lower()
+    if token in TRUE_TOKENS:
+        return True
+    if token in FALSE_TOKENS:
+        return False
+    raise ValueError(f"not a yes/no value: {value!r}")
+
+
+def to_aadhaar(value: str) -> str:
+    digits = re.sub(r"[\s-]", "", value)
+    if not AADHAAR_PATTERN.match(digits):
+        raise ValueError("Aadhaar number must be 12 digits")
+    return digits
+
+
+def to_pan(value: str) -> str:
+    pan = value.upper()
+    if not PAN_PATTERN.match(pan):
+        raise ValueError("PAN must look like ABCDE1234F")
+    return pan
+
+
+# Stored field -> coercion; anything not listed is kept as stripped text. Identifiers stay strings (leading zeros).
+FIELD_TYPES: Dict[str, Callable[[str], Any]] = {
+    "request_submission_date": to_date,
+    "request_submission_time": to_time,
+    "customer_pan_number": to_pan,
+    "customer_aadhar_number": to_aadhaar,
+    "customer_initial_deposit": to_amount,
+    "customer_annual_income": to_amount,
+    "customer_credit_score": to_int,
+    "has_previous_loan_history": to_bool,
+    "risk_score": to_int,
+    "status_flag": to_bool,
+    "tenure_of_account": to_int,
+}
+
+
+def coerce_row(row: Dict[str, Optional[str]]) -> Dict[str, Any]:
+    """One CSV row as a stored document; raises ValueError naming the first field that does not parse."""
+    document = {}
+    for column, raw in row.items():
+        if column is None:
+            raise ValueError("more values than header columns")
+        field = RENAMED_COLUMNS.get(column.strip(), column.strip())
+        value = raw.strip() if raw is not None else ""
+        if value.lower() in NULL_TOKENS:
+            document[field] = None
+            continue
+        try:
+            document[field] = FIELD_TYPES.get(field, to_text)(value)
+        except ValueError as e:
+            raise ValueError(f"{field}: {e}") from None
+    if not document.get("request_id"):
+        raise ValueError("request_id: missing")
+    return document
+
+
+def upsert_operations(document: Dict[str, Any], now: datetime) -> List[UpdateOne]:
+    """
+    Idempotent: re-running a feed updates the same documents instead of duplicating them. The first operation
+    updates a request only if a value changed, the second inserts a new one; either stamps INTAKE_TIMESTAMP_FIELD,
+    so the intake tail sees new and changed requests but not a re-sent, unchanged row.
+    """
+    request_id = document["request_id"]
+    fields = {key: value for key, value in document.items() if key not in INSERT_ONLY_FIELDS and key != "request_id"}
+    changed = [{key: {"$ne": value}} for key, value in fields.items()]
+    insert = {key: value for key, value in document.items() if key != "request_id"}
+    return [
+        UpdateOne({"request_id": request_id, "$or": changed}, {"$set": {**fields, INTAKE_TIMESTAMP_FIELD: now}}),
+        UpdateOne({"request_id": request_id}, {"$setOnInsert": {**insert, INTAKE_TIMESTAMP_FIELD: now}}, upsert=True),
+    ]
+
+
+def read_chunks(path: str, chunk_rows: int) -> Iterator[Tuple[int, List[Dict[str, Any]], List[Dict[str, Any]]]]:
+    """Streams (rows, documents, rejects) per chunk; a request_id repeated within a chunk keeps its last row."""
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        documents: Dict[str, Dict[str, Any]] = {}
+        rejects: List[Dict[str, Any]] = []
+        rows = 0
+        reader = csv.DictReader(f)
+        for row in reader:
+            rows += 1
+            try:
+                document = coerce_row(row)
+                documents[document["request_id"]] = document
+            except ValueError as e:
+                request_id = row.get("bank_request_id") or row.get("request_id")
+                rejects.append({"line": reader.line_num, "request_id": request_id, "reason": str(e)})
+            if rows >= chunk_rows:
+                yield rows, list(documents.values()), rejects
+                documents, rejects, rows = {}, [], 0
+        if rows:
+            yield rows, list(documents.values()), rejects
+
+
+def write_chunk(collection, documents: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """One unordered bulk_write: a bad document fails alone and the server applies the rest in parallel."""
+    counts = {"upserted": 0, "modified": 0, "unchanged": 0, "rejects": []}
+    if not documents:
+        return counts
+    now = utcnow()
+    operations = [operation for document in documents for operation in upsert_operations(document, now)]
+    try:
+        result = collection.bulk_write(operations, ordered=False)
+        details = result.bulk_api_result
+    except BulkWriteError as e:
+        details = e.details
+        rejected = set()
+        for error in details.get("writeErrors", []):
+            # Two operations per document
+            index = error["index"] // 2
+            if index not in rejected:
+                rejected.add(index)
+                counts["rejects"].append({"request_id": documents[index]["request_id"], "reason": error.get("errmsg")})
+    counts["upserted"] = details.get("nUpserted", 0)
+    # Only the conditional update modifies, and only when it matches; the insert matches every existing request
+    counts["modified"] = details.get("nModified", 0)
+    counts["unchanged"] = details.get("nMatched", 0) - 2 * counts["modified"]
+    return counts
+
+
+def ingest_csv(path: str, collection=None, chunk_rows: int = INGEST_CHUNK_ROWS, workers: int = INGEST_WRITE_WORKERS,
+               rejects_path: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Loads an applications CSV into `collection` (default INGEST_COLLECTION) in chunks of unordered bulk upserts
+    keyed on request_id, with several chunks in flight. Rows that do not validate are written to
+    `rejects_path` (default <csv>.rejects.jsonl) with the reason. Returns throughput and reject counts.
+    """
+    collection = collection if collection is not None else get_collection(INGEST_COLLECTION, DEFAULT_DATABASE)
+    # Without it every upsert would scan the collection
+    collection.create_indexes([REQUEST_ID_INDEX])
+    rejects_path = rejects_path or os.path.splitext(path)[0] + ".rejects.jsonl"
+
+    started = time.perf_counter()
+    summary = {"rows": 0, "upserted": 0, "modified": 0, "unchanged": 0, "rejected": 0}
+    workers = max(1, int(workers))
+
+    with open(rejects_path, "w", encoding="utf-8") as rejects_file, ThreadPoolExecutor(max_workers=workers) as executor:
+        def record_rejects(rejects):
+            for reject in rejects:
+                rejects_file.write(json.dumps(reject, ensure_ascii=False) + "\n")
+            summary["rejected"] += len(rejects)
+
+        def collect(future):
+            counts = future.result()
+            for key in ("upserted", "modified", "unchanged"):
+                summary[key] += counts[key]
+            record_rejects(counts["rejects"])
+
+        in_flight = deque()
+        for rows, documents, rejects in read_chunks(path, chunk_rows):
+            summary["rows"] += rows
+            record_rejects(rejects)
+            in_flight.append(executor.submit(write_chunk, collection, documents))
+            # Bounded window: reading stays at most `workers` chunks ahead of the writes
+            while len(in_flight) > workers:
+                collect(in_flight.popleft())
+            logger.debug("Ingested %d rows (%d rejected)", summary["rows"], summary["rejected"])
+        while in_flight:
+            collect(in_flight.popleft())
+
+    elapsed = time.perf_counter() - started
+    summary.update(seconds=elapsed, rows_per_second=summary["rows"] / elapsed if elapsed else 0.0,
+                   rejects_path=rejects_path if summary["rejected"] else None)
+    if not summary["rejected"]:
+        os.remove(rejects_path)
+    print(f"✅ Ingested {summary['rows']} rows into {collection.name} in {elapsed:.1f}s "
+          f"({summary['rows_per_second']:.0f} rows/s): {summary['upserted']} new, {summary['modified']} updated, "
+          f"{summary['unchanged']} unchanged, {summary['rejected']} rejected")
+    return summary
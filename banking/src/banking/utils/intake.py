@@ -0,0 +1,162 @@
+import os
+import time
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import OperationFailure, PyMongoError
+
+from banking.utils.work_queue import (
+    ATTEMPTS, LAST_ERROR, LEASE_EXPIRES_AT, LEASE_OWNER, QUEUE_STATUS, MongoWorkQueue, utcnow,
+)
+
+# Fallback when change streams are unavailable (standalone mongod): poll this indexed field for newer requests
+INTAKE_TIMESTAMP_FIELD = os.getenv("INTAKE_TIMESTAMP_FIELD", "updated_at")
+INTAKE_POLL_SECONDS = float(os.getenv("INTAKE_POLL_SECONDS", "0.5"))
+INTAKE_BATCH_SIZE = int(os.getenv("INTAKE_BATCH_SIZE", "100"))
+# Resume position is written at most this often; replaying a few events after a crash only re-wakes workers
+INTAKE_CHECKPOINT_SECONDS = float(os.getenv("INTAKE_CHECKPOINT_SECONDS", "1"))
+INTAKE_STATE_COLLECTION = os.getenv("INTAKE_STATE_COLLECTION", "intake_state")
+# Idle workers also re-check the queue this often, for retries whose delay has passed
+INTAKE_IDLE_CLAIM_SECONDS = float(os.getenv("INTAKE_IDLE_CLAIM_SECONDS", "30"))
+
+# Writes the queue and the extraction tool make themselves; updates touching only these are not new work
+OWN_FIELDS = {LEASE_OWNER, LEASE_EXPIRES_AT, ATTEMPTS, QUEUE_STATUS, LAST_ERROR,
+              "Extracted_Details", "Extracted_From", "Document_Type"}
+CHANGE_STREAM_HISTORY_LOST = 286
+PENDING_PROJECTION = {"request_id": 1, "status_flag": 1, "account_id": 1, QUEUE_STATUS: 1}
+
+
+class RequestIntake:
+    """
+    Watches the requests collection and hands every new or updated pending request to the worker pool as it
+    arrives: a change stream where the deployment supports one, otherwise a tail on INTAKE_TIMESTAMP_FIELD.
+    The resume token (or last timestamp) is persisted, so a restarted intake continues where it stopped.
+    Workers still claim through the lease queue, so several intake nodes never process a request twice.
+    """
+
+    def __init__(self, queue: MongoWorkQueue, on_pending: Callable[[str], None], collection=None,
+                 state_collection=None, timestamp_field: str = INTAKE_TIMESTAMP_FIELD):
+        self.queue = queue
+        self.on_pending = on_pending
+        self.collection = collection if collection is not None else queue.collection
+        self.state = (state_collection if state_collection is not None
+                      else self.collection.database[INTAKE_STATE_COLLECTION])
+        self.state_id = f"{self.collection.database.name}.{self.collection.name}"
+        self.timestamp_field = timestamp_field
+        self.mode: Optional[str] = None
+        self.counts = {"events": 0, "pending": 0, "requeued": 0, "checkpoints": 0}
+        self._checkpointed = 0.0
+
+    # ---- shared --------------------------------------------------------------------------------
+
+    def _load_state(self) -> Dict[str, Any]:
+        return self.state.find_one({"_id": self.state_id}) or {}
+
+    def _checkpoint(self, force: bool = False, **position):
+        now = time.monotonic()
+        if not force and now - self._checkpointed < INTAKE_CHECKPOINT_SECONDS:
+            return
+        self.state.update_one({"_id": self.state_id}, {"$set": {**position, "updated_at": utcnow()}}, upsert=True)
+        self._checkpointed = now
+        self.counts["checkpoints"] += 1
+
+    def _handle(self, doc: Optional[Dict[str, Any]], updated_fields=None):
+        """Wakes a worker for a pending request; a finished request the applicant has since updated is requeued."""
+        self.counts["events"] += 1
+        if not doc or not doc.get("request_id"):
+            return
+        if updated_fields is not None and not {field.split(".")[0] for field in updated_fields} - OWN_FIELDS:
+            # Our own lease, status and extraction writes
+            return
+        if doc.get("status_flag") is not False or doc.get("account_id") is not None:
+            return
+        if doc.get(QUEUE_STATUS) in ("done", "dead"):
+            if updated_fields is None and self.mode == "change_stream":
+                # An insert or replace of an already processed request id; nothing new to verify
+                return
+            self.queue.requeue(doc["request_id"])
+            self.counts["requeued"] += 1
+        self.counts["pending"] += 1
+        self.on_pending(doc["request_id"])
+
+    def run(self, stop: threading.Event):
+        """Blocks until `stop` is set, feeding pending requests to on_pending."""
+        try:
+            self._watch(stop)
+        except (OperationFailure, NotImplementedError) as e:
+            print(f"⚠️ Change streams unavailable ({e}); tailing {self.collection.name}.{self.timestamp_field} instead")
+            self._tail(stop)
+
+    # ---- change stream -------------------------------------------------------------------------
+
+    def _watch(self, stop: threading.Event):
+        pipeline = [{"$match": {"operationType": {"$in": ["insert", "update", "replace"]}}}]
+        token = self._load_state().get("resume_token")
+        while not stop.is_set():
+            try:
+                with self.collection.watch(pipeline, full_document="updateLookup", resume_after=token,
+                                           max_await_time_ms=int(INTAKE_POLL_SECONDS * 1000)) as stream:
+                    if self.mode != "change_stream":
+                        self.mode = "change_stream"
+                        print(f"✅ Intake watching {self.state_id} via change stream")
+                    while not stop.is_set():
+                        change = stream.try_next()
+                        if change is not None:
+                            description = change.get("updateDescription") or {}
+                            updated = [*description.get("updatedFields", {}), *description.get("removedFields", [])]
+                            self._handle(change.get("fullDocument"),
+                                         updated if change["operationType"] == "update" else None)
+                        # The post-batch token advances even when nothing matched
+                        token = stream.resume_token
+                        self._checkpoint(resume_token=token)
+                    self._checkpoint(force=True, resume_token=token)
+            except OperationFailure as e:
+                if e.code != CHANGE_STREAM_HISTORY_LOST or token is None:
+                    raise
+                # The oplog no longer reaches our token: start from now and let the workers sweep the backlog
+                print(f"⚠️ Intake resume token expired; restarting the change stream and sweeping the queue")
+                token = None
+                self.on_pending("")
+
+    # ---- tailing fallback ----------------------------------------------------------------------
+
+    def _tail(self, stop: threading.Event):
+        self.mode = "tail"
+        field = self.timestamp_field
+        # Serves the range scan below, so each poll reads only requests newer than the last one seen
+        self.collection.create_index([(field, ASCENDING), ("_id", ASCENDING)], name=f"intake_{field}")
+
+        state = self._load_state()
+        last_ts, last_id = state.get("last_ts"), state.get("last_id")
+        if last_ts is None:
+            # First start: the workers sweep the existing backlog, the tail follows what arrives from now on
+            newest = self.collection.find_one({field: {"$ne": None}}, {field: 1}, sort=[(field, DESCENDING), ("_id", DESCENDING)])
+            if newest:
+                last_ts, last_id = newest[field], newest["_id"]
+
+        print(f"✅ Intake tailing {self.state_id} on {field} every {INTAKE_POLL_SECONDS}s")
+        while not stop.is_set():
+            query: Dict[str, Any] = {field: {"$ne": None}}
+            if last_ts is not None:
+                query = {"$or": [{field: {"$gt": last_ts}}, {field: last_ts, "_id": {"$gt": last_id}}]}
+            try:
+                docs = list(self.collection.find(query, {**PENDING_PROJECTION, field: 1})
+                            .sort([(field, ASCENDING), ("_id", ASCENDING)]).limit(INTAKE_BATCH_SIZE))
+            except PyMongoError as e:
+                print(f"❌ Intake poll failed: {e}")
+                stop.wait(INTAKE_POLL_SECONDS)
+                continue
+
+            for doc in docs:
+                self._handle(doc)
+                last_ts, last_id = doc[field], doc["_id"]
+            if docs:
+                self._checkpoint(force=len(docs) < INTAKE_BATCH_SIZE, last_ts=last_ts, last_id=last_id)
+            if len(docs) < INTAKE_BATCH_SIZE:
+                stop.wait(INTAKE_POLL_SECONDS)
+        if last_ts is not None:
+            self._checkpoint(force=True, last_ts=last_ts, last_id=last_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"mode": self.mode, **self.counts}
@@ -0,0 +1,166 @@
+import os
+import json
+import shutil
+import hashlib
+import threading
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pdfplumber
+from chromadb.utils.embedding_functions.openai_embedding_function import OpenAIEmbeddingFunction
+from crewai.knowledge.knowledge import Knowledge
+from crewai.knowledge.source.base_knowledge_source import BaseKnowledgeSource
+from crewai.knowledge.storage.knowledge_storage import KnowledgeStorage
+from crewai.utilities import EmbeddingConfigurator
+from crewai.utilities.constants import KNOWLEDGE_DIRECTORY
+
+# The Account Opening Manual and where its prebuilt index lives
+AOM_PDF_PATH = os.getenv("AOM_PDF_PATH", os.path.join(KNOWLEDGE_DIRECTORY, "AOM.pdf"))
+KNOWLEDGE_INDEX_DIR = os.getenv("KNOWLEDGE_INDEX_DIR", os.path.join(KNOWLEDGE_DIRECTORY, "index"))
+
+# Same chunking as crewai's PDFKnowledgeSource
+CHUNK_SIZE = 4000
+CHUNK_OVERLAP = 200
+
+CHUNKS_FILE = "chunks.json"
+EMBEDDINGS_FILE = "embeddings.npy"
+
+
+def file_hash(path: str) -> str:
+    """Returns the SHA-256 of a file's content."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def chunk_pdf(pdf_path: str, chunk_size: int = CHUNK_SIZE, chunk_overlap: int = CHUNK_OVERLAP) -> List[str]:
+    """Extracts the text of a PDF and splits it into overlapping chunks."""
+    text = ""
+    with pdfplumber.open(pdf_path) as pdf:
+        for page in pdf.pages:
+            page_text = page.extract_text()
+            if page_text:
+                text += page_text + "\n"
+    return [text[i:i + chunk_size] for i in range(0, len(text), chunk_size - chunk_overlap)]
+
+
+def default_embedder(embedder_config: Optional[Dict[str, Any]] = None):
+    """Builds the same embedding function crewai's KnowledgeStorage would use."""
+    if embedder_config:
+        return EmbeddingConfigurator().configure_embedder(embedder_config)
+    return OpenAIEmbeddingFunction(api_key=os.getenv("OPENAI_API_KEY"), model_name="text-embedding-3-small")
+
+
+def build_index(pdf_path: str = AOM_PDF_PATH, index_dir: str = KNOWLEDGE_INDEX_DIR,
+                embedder=None, force: bool = False) -> str:
+    """Chunks and embeds a PDF into `index_dir/<content hash>/`, unless that index already exists."""
+    target = os.path.join(index_dir, file_hash(pdf_path))
+    if os.path.isdir(target) and not force:
+        return target
+
+    embedder = embedder or default_embedder()
+    chunks = chunk_pdf(pdf_path)
+    embeddings = np.asarray(embedder(chunks), dtype=np.float32)
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    embeddings = embeddings / np.where(norms == 0, 1, norms)
+
+    # Write to a scratch directory first so readers never see a half-built index
+    scratch = f"{target}.tmp-{os.getpid()}-{threading.get_ident()}"
+    os.makedirs(scratch, exist_ok=True)
+    with open(os.path.join(scratch, CHUNKS_FILE), "w", encoding="utf-8") as f:
+        json.dump({"source": os.path.basename(pdf_path), "chunks": chunks}, f, ensure_ascii=False)
+    np.save(os.path.join(scratch, EMBEDDINGS_FILE), embeddings)
+
+    if os.path.isdir(target):
+        shutil.rmtree(target)
+    os.replace(scratch, target)
+
+    # Indexes of older versions of the manual are no longer needed
+    for entry in os.listdir(index_dir):
+        stale = os.path.join(index_dir, entry)
+        if stale != target and os.path.isdir(stale) and ".tmp-" not in entry:
+            shutil.rmtree(stale, ignore_errors=True)
+
+    print(f"Knowledge index built: {len(chunks)} chunks -> {target}")
+    return target
+
+
+class PrebuiltIndexStorage(KnowledgeStorage):
+    """Knowledge storage that searches a prebuilt, memory-mapped index instead of re-embedding the PDF."""
+
+    def __init__(self, pdf_path: str = AOM_PDF_PATH, index_dir: str = KNOWLEDGE_INDEX_DIR,
+                 embedder: Optional[Dict[str, Any]] = None, collection_name: Optional[str] = None):
+        self.collection_name = collection_name
+        self.pdf_path = pdf_path
+        self.index_dir = index_dir
+        self.embedder_config = embedder
+        self.embedder = None
+        self.chunks: Optional[List[str]] = None
+        self.embeddings: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+
+    def initialize_knowledge_storage(self):
+        """The index is opened on first search, so attaching it to an agent costs nothing."""
+
+    def load(self):
+        """Memory-maps the index for the current manual, rebuilding it only if the manual changed."""
+        with self._lock:
+            if self.embeddings is not None:
+                return
+            if self.embedder is None:
+                self.embedder = default_embedder(self.embedder_config)
+            path = build_index(self.pdf_path, self.index_dir, self.embedder)
+            with open(os.path.join(path, CHUNKS_FILE), encoding="utf-8") as f:
+                self.chunks = json.load(f)["chunks"]
+            self.embeddings = np.load(os.path.join(path, EMBEDDINGS_FILE), mmap_mode="r")
+
+    def search(
+        self,
+        query: List[str],
+        limit: int = 3,
+        filter: Optional[dict] = None,
+        score_threshold: float = 0.35,
+    ) -> List[Dict[str, Any]]:
+        self.load()
+        vector = np.asarray(self.embedder([" ".join(query)])[0], dtype=np.float32)
+        vector = vector / (np.linalg.norm(vector) or 1)
+        scores = self.embeddings @ vector
+
+        results = []
+        for i in np.argsort(scores)[::-1][:limit]:
+            if scores[i] >= score_threshold:
+                results.append({
+                    "id": hashlib.sha256(self.chunks[i].encode("utf-8")).hexdigest(),
+                    "metadata": {"source": os.path.basename(self.pdf_path), "chunk": int(i)},
+                    "context": self.chunks[i],
+                    "score": float(scores[i]),
+                })
+        return results
+
+    def save(self, documents: List[str], metadata: Optional[Any] = None):
+        """The index is written by `build_index`, never from inside a crew run."""
+
+    def reset(self):
+        with self._lock:
+            self.chunks = None
+            self.embeddings = None
+        shutil.rmtree(self.index_dir, ignore_errors=True)
+
+
+class PrebuiltIndexKnowledgeSource(BaseKnowledgeSource):
+    """Placeholder source for a `PrebuiltIndexStorage`; its chunks are already embedded offline."""
+
+    def validate_content(self):
+        pass
+
+    def add(self) -> None:
+        pass
+
+
+def load_knowledge(pdf_path: str = AOM_PDF_PATH, index_dir: str = KNOWLEDGE_INDEX_DIR,
+                   collection_name: str = "aom") -> Knowledge:
+    """Returns a crewai Knowledge backed by the prebuilt index of `pdf_path`."""
+    storage = PrebuiltIndexStorage(pdf_path, index_dir, collection_name=collection_name)
+    return Knowledge(collection_name=collection_name, sources=[PrebuiltIndexKnowledgeSource()], storage=storage)
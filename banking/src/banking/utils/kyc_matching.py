@@ -0,0 +1,330 @@
+import re
+import unicodedata
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Stored applicant record (test_account_data) -> value on the extracted document (Extracted_Details)
+RECORD_FIELDS = {
+    "first_name": "customer_first_name",
+    "last_name": "customer_last_name",
+    "aadhaar_number": "customer_aadhar_number",
+    "street_address": "customer_residence_street_address",
+    "city": "customer_residence_city",
+}
+EXTRACTED_FIELDS = {
+    "name": "NAME",
+    "aadhaar_number": "AADHAAR NUMBER",
+    "address": "ADDRESS",
+}
+
+# Per-field (match, mismatch) thresholds: score >= match is a match, score < mismatch is a mismatch,
+# anything in between is ambiguous and goes to the LLM for review.
+FIELD_THRESHOLDS = {
+    "first_name": (0.90, 0.60),
+    "last_name": (0.90, 0.60),
+    "aadhaar_number": (1.00, 0.90),
+    "address": (0.75, 0.50),
+}
+
+# A masked e-Aadhaar ("XXXX XXXX 2922") hides the first 8 of its 12 digits. Only that exact layout counts as
+# masked; its visible digits must agree position by position, and even then the field stays ambiguous
+MASKED_AADHAAR = re.compile(r"^[xX*•]{8}\d{4}$")
+
+# An address token counts as present on the document if it is at least this similar to one there
+ADDRESS_TOKEN_MATCH = 0.8
+
+# Below this many string pairs a plain Python edit distance beats setting up NumPy arrays
+BATCH_MIN_PAIRS = 64
+BATCH_CHUNK_PAIRS = 4096
+
+_ABBREVIATIONS = {
+    "rd": "road",
+    "st": "street",
+    "nr": "near",
+    "opp": "opposite",
+    "apt": "apartment",
+    "bldg": "building",
+    "soc": "society",
+    "hsg": "housing",
+}
+
+
+def normalize_text(value: Any) -> str:
+    """Lower-cases, strips accents and punctuation, and expands common address abbreviations."""
+    if value is None:
+        return ""
+    text = unicodedata.normalize("NFKD", str(value)).encode("ascii", "ignore").decode("ascii").lower()
+    text = re.sub(r"[^a-z0-9]+", " ", text)
+    return " ".join(_ABBREVIATIONS.get(token, token) for token in text.split())
+
+
+def normalize_digits(value: Any) -> str:
+    """Keeps only the digits of an identifier such as an Aadhaar number."""
+    return re.sub(r"\D", "", str(value)) if value is not None else ""
+
+
+def masked_aadhaar(value: Any) -> Optional[str]:
+    """The number in masked e-Aadhaar layout ("xxxxxxxx2922"), or None if it is not exactly that layout."""
+    if value is None:
+        return None
+    compact = re.sub(r"[\s-]", "", str(value))
+    return compact.lower().replace("*", "x").replace("•", "x") if MASKED_AADHAAR.match(compact) else None
+
+
+def _masked_score(expected: str, masked: str) -> float:
+    """1.0 if every visible digit of a masked number agrees with the stored number in its position, else 0.0."""
+    if len(expected) != len(masked):
+        return 0.0
+    return 1.0 if all(m == "x" or m == e for e, m in zip(expected, masked)) else 0.0
+
+
+def levenshtein(a: str, b: str) -> int:
+    """Edit distance between two strings."""
+    if a == b:
+        return 0
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+
+def levenshtein_batch(a: Sequence[str], b: Sequence[str]) -> np.ndarray:
+    """Edit distances of many string pairs at once, vectorised across pairs."""
+    n = len(a)
+    len_a = np.fromiter((len(s) for s in a), dtype=np.int64, count=n)
+    len_b = np.fromiter((len(s) for s in b), dtype=np.int64, count=n)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    width_a, width_b = max(int(len_a.max()), 1), max(int(len_b.max()), 1)
+    # Distinct padding values so padding never counts as a matching character
+    codes_a = np.full((n, width_a), -1, dtype=np.int64)
+    codes_b = np.full((n, width_b), -2, dtype=np.int64)
+    for row, (s, t) in enumerate(zip(a, b)):
+        codes_a[row, :len(s)] = [ord(c) for c in s]
+        codes_b[row, :len(t)] = [ord(c) for c in t]
+
+    columns = np.arange(width_b + 1)
+    previous = np.tile(columns, (n, 1))
+    distances = len_b.copy()  # pairs where `a` is empty
+    rows = np.arange(n)
+    for i in range(1, width_a + 1):
+        cost = (codes_a[:, i - 1:i] != codes_b).astype(np.int64)
+        candidate = np.empty_like(previous)
+        candidate[:, 0] = i
+        candidate[:, 1:] = np.minimum(previous[:, 1:] + 1, previous[:, :-1] + cost)
+        # Insertions: current[j] = min over k <= j of candidate[k] + (j - k)
+        current = np.minimum.accumulate(candidate - columns, axis=1) + columns
+        finished = len_a == i
+        distances[finished] = current[rows[finished], len_b[finished]]
+        previous = current
+    return distances
+
+
+def similarities(a: Sequence[str], b: Sequence[str]) -> np.ndarray:
+    """Normalised edit similarity (1.0 = identical) for each pair of strings."""
+    n = len(a)
+    len_a = np.fromiter((len(s) for s in a), dtype=np.int64, count=n)
+    len_b = np.fromiter((len(t) for t in b), dtype=np.int64, count=n)
+    if n < BATCH_MIN_PAIRS:
+        distances = np.fromiter((levenshtein(s, t) for s, t in zip(a, b)), dtype=np.int64, count=n)
+    else:
+        # Sort by length and score in chunks so short pairs are not padded to the longest string
+        distances = np.empty(n, dtype=np.int64)
+        order = np.argsort(np.maximum(len_a, len_b), kind="stable")
+        for start in range(0, n, BATCH_CHUNK_PAIRS):
+            chunk = order[start:start + BATCH_CHUNK_PAIRS]
+            distances[chunk] = levenshtein_batch([a[i] for i in chunk], [b[i] for i in chunk])
+    longest = np.maximum(len_a, len_b)
+    return np.where(longest == 0, 1.0, 1.0 - distances / np.maximum(longest, 1))
+
+
+def _token_set_pairs(a: str, b: str) -> List[Tuple[str, str]]:
+    """The three comparisons behind a token-set ratio: shared tokens vs. each side, and side vs. side."""
+    tokens_a, tokens_b = set(a.split()), set(b.split())
+    shared = " ".join(sorted(tokens_a & tokens_b))
+    side_a = f"{shared} {' '.join(sorted(tokens_a - tokens_b))}".strip()
+    side_b = f"{shared} {' '.join(sorted(tokens_b - tokens_a))}".strip()
+    return [(shared, side_a), (shared, side_b), (side_a, side_b)]
+
+
+class _PairBatch:
+    """Collects distinct string pairs from many comparisons so they can be scored in one vectorised call."""
+
+    def __init__(self):
+        self.index: Dict[Tuple[str, str], int] = {}
+        self.a: List[str] = []
+        self.b: List[str] = []
+
+    def add(self, pairs: List[Tuple[str, str]]) -> np.ndarray:
+        positions = []
+        for pair in pairs:
+            position = self.index.get(pair)
+            if position is None:
+                position = self.index[pair] = len(self.a)
+                self.a.append(pair[0])
+                self.b.append(pair[1])
+            positions.append(position)
+        return np.asarray(positions, dtype=np.int64)
+
+    def score(self) -> np.ndarray:
+        return similarities(self.a, self.b) if self.a else np.zeros(0)
+
+
+def _plan_token_set(batch: _PairBatch, a: str, b: str):
+    """Token-set ratio; 1.0 without any edit distance when one side's tokens contain the other's."""
+    if not a or not b:
+        return 0.0
+    tokens_a, tokens_b = set(a.split()), set(b.split())
+    if tokens_a <= tokens_b or tokens_b <= tokens_a:
+        return 1.0
+    return batch.add(_token_set_pairs(a, b))
+
+
+def _plan_alignment(batch: _PairBatch, a: str, b: str, floor: float = 0.0):
+    """Token-by-token similarity matrix of `a` against `b`, computing only the cells that can change
+    a row maximum. Tokens with an exact match need no edit distance,
+    and cells whose length difference alone keeps them below `floor` are left at 0."""
+    tokens_a, tokens_b = a.split(), b.split()
+    if not tokens_a or not tokens_b:
+        return None
+    exact = np.array([[s == t for t in tokens_b] for s in tokens_a], dtype=bool)
+    needed = ~exact & ~exact.any(axis=1)[:, None]
+    if floor:
+        len_a = np.array([len(t) for t in tokens_a])[:, None]
+        len_b = np.array([len(t) for t in tokens_b])[None, :]
+        needed &= 1.0 - np.abs(len_a - len_b) / np.maximum(len_a, len_b) >= floor
+    cells = np.argwhere(needed)
+    positions = batch.add([(tokens_a[i], tokens_b[j]) for i, j in cells])
+    return exact, cells, positions
+
+
+def _token_set_score(scores: np.ndarray, plan) -> float:
+    return plan if isinstance(plan, float) else float(scores[plan].max())
+
+
+def _alignment_matrix(scores: np.ndarray, plan) -> np.ndarray:
+    exact, cells, positions = plan
+    matrix = exact.astype(float)
+    if len(cells):
+        matrix[cells[:, 0], cells[:, 1]] = scores[positions]
+    return matrix
+
+
+def _identifier_score(scores: np.ndarray, plan) -> float:
+    if plan is None:
+        return 0.0
+    return plan if isinstance(plan, float) else float(scores[plan][0])
+
+
+def _name_score(scores: np.ndarray, token_set_plan, alignment_plan) -> float:
+    """Best of token-set ratio and the mean per-token edit similarity of the stored name."""
+    if alignment_plan is None:
+        return 0.0
+    aligned = float(_alignment_matrix(scores, alignment_plan).max(axis=1).mean())
+    return max(_token_set_score(scores, token_set_plan), aligned)
+
+
+def _address_score(scores: np.ndarray, alignment_plan) -> float:
+    """Share of the stored address tokens that appear (allowing small typos) on the document. Extra document
+    tokens (PIN code, state, care-of) cost nothing, but a fragment of the stored address does not match it."""
+    if alignment_plan is None:
+        return 0.0
+    matrix = _alignment_matrix(scores, alignment_plan)
+    return float((matrix.max(axis=1) >= ADDRESS_TOKEN_MATCH).mean())
+
+
+def field_status(field: str, score: float, expected: str, found: str) -> str:
+    """Classifies a field score as match, mismatch, ambiguous or missing."""
+    if not expected or not found:
+        return "missing"
+    match, mismatch = FIELD_THRESHOLDS[field]
+    if score >= match:
+        return "match"
+    if score < mismatch:
+        return "mismatch"
+    return "ambiguous"
+
+
+def overall_status(fields: Dict[str, Dict[str, Any]]) -> str:
+    """verified if every field matches, failed if any field is a clear mismatch, ambiguous otherwise."""
+    statuses = [result["status"] for result in fields.values()]
+    if "mismatch" in statuses:
+        return "failed"
+    if all(status == "match" for status in statuses):
+        return "verified"
+    return "ambiguous"
+
+
+def score_batch(records: Sequence[Dict[str, Any]], extracted: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Scores many (stored record, extracted document) pairs; every edit distance runs in one batch."""
+    batch = _PairBatch()
+    plans = []
+    for record, document in zip(records, extracted):
+        first = normalize_text(record.get(RECORD_FIELDS["first_name"]))
+        last = normalize_text(record.get(RECORD_FIELDS["last_name"]))
+        street = normalize_text(record.get(RECORD_FIELDS["street_address"]))
+        city = normalize_text(record.get(RECORD_FIELDS["city"]))
+        stored_address = street if city in street.split() else f"{street} {city}".strip()
+        name = normalize_text(document.get(EXTRACTED_FIELDS["name"]))
+        # The given name is compared with the leading tokens of the document name only, so a first name
+        # that shows up in the surname position does not count as a match
+        leading = " ".join(name.split()[:len(first.split())])
+        address = normalize_text(document.get(EXTRACTED_FIELDS["address"]))
+        stored_aadhaar = normalize_digits(record.get(RECORD_FIELDS["aadhaar_number"]))
+        masked = masked_aadhaar(document.get(EXTRACTED_FIELDS["aadhaar_number"]))
+        found_aadhaar = masked or normalize_digits(document.get(EXTRACTED_FIELDS["aadhaar_number"]))
+        if masked:
+            aadhaar_plan = _masked_score(stored_aadhaar, masked) if stored_aadhaar else 0.0
+        else:
+            aadhaar_plan = batch.add([(stored_aadhaar, found_aadhaar)]) if stored_aadhaar and found_aadhaar else None
+
+        plans.append({
+            "values": {
+                "first_name": (first, name),
+                "last_name": (last, name),
+                "aadhaar_number": (stored_aadhaar, found_aadhaar),
+                "address": (stored_address, address),
+            },
+            "first_name": (_plan_token_set(batch, first, leading), _plan_alignment(batch, first, leading)),
+            "last_name": (_plan_token_set(batch, last, name), _plan_alignment(batch, last, name)),
+            "aadhaar_number": aadhaar_plan,
+            "address": _plan_alignment(batch, stored_address, address, floor=ADDRESS_TOKEN_MATCH),
+            "masked": {"aadhaar_number"} if masked else set(),
+        })
+
+    scores = batch.score()
+    results = []
+    for plan in plans:
+        field_scores = {
+            "first_name": _name_score(scores, *plan["first_name"]),
+            "last_name": _name_score(scores, *plan["last_name"]),
+            "aadhaar_number": _identifier_score(scores, plan["aadhaar_number"]),
+            "address": _address_score(scores, plan["address"]),
+        }
+        fields = {}
+        for field, score in field_scores.items():
+            expected, found = plan["values"][field]
+            status = field_status(field, score, expected, found)
+            if field in plan["masked"] and status == "match":
+                # Four visible digits cannot verify an identity on their own; only a full number can
+                status = "ambiguous"
+            fields[field] = {
+                "score": round(score, 4),
+                "status": status,
+                "expected": expected,
+                "found": found,
+            }
+        results.append({"status": overall_status(fields), "fields": fields})
+    return results
+
+
+def match_kyc(record: Dict[str, Any], extracted: Dict[str, Any]) -> Dict[str, Any]:
+    """Compares one stored applicant record with the details extracted from their document."""
+    return score_batch([record], [extracted])[0]
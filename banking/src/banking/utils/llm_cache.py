@@ -0,0 +1,268 @@
+import os
+import re
+import json
+import time
+import base64
+import hashlib
+import sqlite3
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from crewai import LLM
+from langchain_core.caches import BaseCache
+from langchain_core.messages import message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, Generation
+
+from banking.utils.rate_limit import get_limiter
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE", "true").lower() not in ("0", "false", "no")
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(".cache", "llm", "responses.sqlite3"))
+LLM_CACHE_MAX_MB = float(os.getenv("LLM_CACHE_MAX_MB", "256"))
+
+# Inline images (base64 data URLs) are keyed by a hash of their bytes, not by megabytes of prompt text
+DATA_URL = re.compile(r"data:(image/[\w.+-]+);base64,([A-Za-z0-9+/=]+)")
+
+_bypass = contextvars.ContextVar("llm_cache_bypass", default=False)
+
+
+@contextmanager
+def llm_cache_disabled():
+    """Audit runs: every LLM call inside this block goes to the model and nothing is read from or written to the cache."""
+    token = _bypass.set(True)
+    try:
+        yield
+    finally:
+        _bypass.reset(token)
+
+
+def cache_enabled() -> bool:
+    return LLM_CACHE_ENABLED and not _bypass.get()
+
+
+def _hash_image(match: "re.Match") -> str:
+    try:
+        content = base64.b64decode(match.group(2))
+    except ValueError:
+        content = match.group(2).encode("ascii")
+    return f"image:{hashlib.sha256(content).hexdigest()}"
+
+
+def normalise_prompt(prompt: Any) -> str:
+    """Serialises a prompt (text or chat messages) with every inline image replaced by the sha256 of its bytes."""
+    text = prompt if isinstance(prompt, str) else json.dumps(prompt, sort_keys=True, default=str)
+    return DATA_URL.sub(_hash_image, text)
+
+
+def cache_key(model: str, deployment: Optional[str], prompt: Any, params: Optional[Dict[str, Any]] = None) -> str:
+    """Content address of an LLM request: model, deployment, prompt text, image hashes and call parameters."""
+    payload = json.dumps({
+        "model": model,
+        "deployment": deployment,
+        "prompt": normalise_prompt(prompt),
+        "params": params or {},
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LlmResponseCache:
+    """SQLite cache of LLM responses with size-based LRU eviction and hit-rate metrics."""
+
+    def __init__(self, path: str = LLM_CACHE_PATH, max_bytes: Optional[int] = None):
+        self.path = path
+        self.max_bytes = int(max_bytes if max_bytes is not None else LLM_CACHE_MAX_MB * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.seconds_saved = 0.0
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._size: Optional[int] = None
+
+    def _db(self) -> sqlite3.Connection:
+        # Callers hold self._lock; one connection is shared by every thread
+        if self._conn is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+            # WAL lets several batch processes read while one writes
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, model TEXT, response TEXT NOT NULL, bytes INTEGER NOT NULL, "
+                "seconds REAL NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+            self._size = self._conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM responses").fetchone()[0]
+        return self._conn
+
+    def get(self, key: str) -> Optional[Any]:
+        """Returns the cached response for `key`, or None if it is missing; counted as a hit or a miss."""
+        with self._lock:
+            db = self._db()
+            row = db.execute("SELECT response, seconds FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            # Touch the entry so eviction treats it as recently used
+            db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (time.time(), key))
+            self.hits += 1
+            self.seconds_saved += row[1]
+        return json.loads(row[0])
+
+    def count_bypass(self):
+        with self._lock:
+            self.bypassed += 1
+
+    def put(self, key: str, response: Any, model: Optional[str] = None, seconds: float = 0.0):
+        """Stores a response and evicts least recently used entries beyond the size limit."""
+        payload = json.dumps(response, default=str)
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            previous = db.execute("SELECT bytes FROM responses WHERE key = ?", (key,)).fetchone()
+            db.execute(
+                "INSERT OR REPLACE INTO responses (key, model, response, bytes, seconds, created, accessed) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, model, payload, len(payload), seconds, now, now),
+            )
+            self._size += len(payload) - (previous[0] if previous else 0)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """Deletes the least recently used entries until the cache is back under 90% of its limit."""
+        db = self._db()
+        target = self.max_bytes * 0.9
+        total = self._size
+        doomed = []
+        for key, size in db.execute("SELECT key, bytes FROM responses ORDER BY accessed"):
+            if total <= target:
+                break
+            doomed.append((key,))
+            total -= size
+        db.executemany("DELETE FROM responses WHERE key = ?", doomed)
+        self._size = total
+
+    def get_or_call(self, key: str, call: Callable[[], Any], model: Optional[str] = None) -> Any:
+        """Returns the cached response for `key`, calling the model only on a miss (or always, when disabled)."""
+        if not cache_enabled():
+            self.count_bypass()
+            return call()
+
+        response = self.get(key)
+        if response is not None:
+            return response
+
+        started = time.perf_counter()
+        response = call()
+        if response is not None:
+            self.put(key, response, model, time.perf_counter() - started)
+        return response
+
+    def clear(self):
+        with self._lock:
+            self._db().execute("DELETE FROM responses")
+            self._size = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = self._db().execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            size = self._size
+            hits, misses, bypassed, seconds_saved = self.hits, self.misses, self.bypassed, self.seconds_saved
+        total = hits + misses
+        return {
+            "enabled": LLM_CACHE_ENABLED,
+            "hits": hits,
+            "misses": misses,
+            "bypassed": bypassed,
+            "hit_rate": hits / total if total else 0.0,
+            "seconds_saved": round(seconds_saved, 3),
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+        }
+
+
+# Shared by the Azure client in custom_tool and the crew agents
+llm_cache = LlmResponseCache()
+
+
+class LangchainLlmCache(BaseCache):
+    """Plugs the response cache into a LangChain chat model (`cache=`), e.g. the AzureChatOpenAI in custom_tool."""
+
+    def __init__(self, model: str, deployment: Optional[str] = None, cache: LlmResponseCache = llm_cache):
+        self.model = model
+        self.deployment = deployment
+        self.cache = cache
+        # Miss -> update is the model call; its duration is recorded as the time a later hit saves
+        self._started: Dict[str, float] = {}
+
+    def _key(self, prompt: str, llm_string: str) -> str:
+        # llm_string carries temperature, bound tools and the structured-output schema
+        return cache_key(self.model, self.deployment, prompt, {"llm": llm_string})
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Generation]]:
+        if not cache_enabled():
+            self.cache.count_bypass()
+            return None
+        key = self._key(prompt, llm_string)
+        stored = self.cache.get(key)
+        if stored is None:
+            self._started[key] = time.perf_counter()
+            return None
+        return [ChatGeneration(message=message) for message in messages_from_dict(stored)]
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Generation]):
+        if not cache_enabled():
+            return
+        stored = [message_to_dict(generation.message) for generation in return_val
+                  if isinstance(generation, ChatGeneration)]
+        key = self._key(prompt, llm_string)
+        started = self._started.pop(key, None)
+        if stored:
+            self.cache.put(key, stored, self.model, time.perf_counter() - started if started else 0.0)
+
+    def clear(self, **kwargs: Any):
+        self.cache.clear()
+
+
+class CachedLLM(LLM):
+    """
+    crewAI LLM whose completions go through the response cache. That includes every ReAct step of an agent:
+    crewAI parses and runs the tools itself, so a cached step only replays the model's text, keyed on the whole
+    conversation so far (earlier tool results included). Native function calls (`available_functions`) bypass it.
+    """
+
+    cache: LlmResponseCache = llm_cache
+
+    @classmethod
+    def wrap(cls, llm: LLM) -> "CachedLLM":
+        """Returns a cached copy of an already configured crewAI LLM (model, endpoint, callbacks and all)."""
+        cached = cls.__new__(cls)
+        cached.__dict__.update(llm.__dict__)
+        return cached
+
+    def call(self, messages: Any, tools: Optional[List[dict]] = None, callbacks: Optional[List[Any]] = None,
+             available_functions: Optional[Dict[str, Any]] = None) -> str:
+        # Model calls share the "llm" limiter, so a throttled batch slows down instead of failing agents
+        limiter = get_limiter("llm", self.model)
+        if available_functions:
+            # The result would come from executing a tool, not from the model
+            return limiter.call(super().call, messages, tools, callbacks, available_functions)
+
+        params = {
+            "temperature": self.temperature,
+            "stop": self.stop,
+            "tools": tools,
+            "response_format": self.response_format,
+            "api_version": self.api_version,
+        }
+        key = cache_key(self.model, self.api_base or self.base_url, messages, params)
+        return self.cache.get_or_call(key, lambda: limiter.call(super(CachedLLM, self).call, messages, tools, callbacks),
+                                      model=self.model)
+
+
+def llm_cache_stats() -> Dict[str, Any]:
+    return llm_cache.stats()
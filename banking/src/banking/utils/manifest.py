@@ -0,0 +1,90 @@
+import os
+import json
+import hashlib
+import threading
+from typing import Any, Dict, Optional
+
+HASH_CHUNK_BYTES = 1024 * 1024
+
+
+def file_sha256(path: str) -> str:
+    """Streams a file through sha256 without holding it in memory."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class FileManifest:
+    """
+    Append-only JSONL record of processed files (size, mtime, sha256 and status), written as each file
+    finishes so an interrupted run resumes where it stopped. The last line for a file wins.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._file = None
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A torn last line from a crash mid-write; that file is simply processed again
+                        continue
+                    self.entries[entry["file"]] = entry
+        except FileNotFoundError:
+            pass
+
+    def is_current(self, name: str, stat: os.stat_result) -> bool:
+        """True when the file was processed successfully and its size and mtime have not changed since."""
+        entry = self.entries.get(name)
+        return bool(entry and entry.get("ok") and entry.get("size") == stat.st_size
+                    and entry.get("mtime") == stat.st_mtime_ns)
+
+    def known_sha256(self, name: str) -> Optional[str]:
+        """The hash of the last successful run, to recognise files that were touched but not changed."""
+        entry = self.entries.get(name)
+        return entry.get("sha256") if entry and entry.get("ok") else None
+
+    def record(self, name: str, stat: os.stat_result, sha256: Optional[str], ok: bool = True,
+               error: Optional[str] = None):
+        """Checkpoints one file; flushed immediately so a crash loses at most the files in flight."""
+        entry = {"file": name, "size": stat.st_size, "mtime": stat.st_mtime_ns, "sha256": sha256, "ok": ok}
+        if error:
+            entry["error"] = error
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with self._lock:
+            if self._file is None:
+                if os.path.dirname(self.path):
+                    os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                self._file = open(self.path, "a", encoding="utf-8")
+            self._file.write(line)
+            self._file.flush()
+            self.entries[name] = entry
+
+    def compact(self, keep=None):
+        """Rewrites the manifest with one line per file (optionally only those in `keep`), replacing it atomically."""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            if keep is not None:
+                self.entries = {name: entry for name, entry in self.entries.items() if name in keep}
+            scratch = f"{self.path}.{os.getpid()}.tmp"
+            with open(scratch, "w", encoding="utf-8") as f:
+                for entry in self.entries.values():
+                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            os.replace(scratch, self.path)
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
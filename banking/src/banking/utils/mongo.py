@@ -0,0 +1,135 @@
+import os
+import threading
+from typing import Dict, Optional
+
+from pymongo import MongoClient, monitoring
+
+# Connection pool sizing and timeouts, shared by every tool in the process
+MONGO_URL = os.getenv("URL")
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "50"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "300000"))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000"))
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "30000"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "10000"))
+
+DEFAULT_DATABASE = "banking_ai_agent"
+
+
+class PoolStatsListener(monitoring.ConnectionPoolListener):
+    """Counts connection pool events so the pool can be sized from real traffic."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stats = {
+            "connections_created": 0,
+            "connections_closed": 0,
+            "checkouts": 0,
+            "checkout_failures": 0,
+            "checked_out": 0,
+            "peak_checked_out": 0,
+            "pool_cleared": 0,
+        }
+
+    def _bump(self, key, amount=1):
+        with self._lock:
+            self.stats[key] += amount
+            if key == "checked_out":
+                self.stats["peak_checked_out"] = max(self.stats["peak_checked_out"], self.stats["checked_out"])
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self._bump("pool_cleared")
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self._bump("connections_created")
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._bump("connections_closed")
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        self._bump("checkout_failures")
+
+    def connection_checked_out(self, event):
+        self._bump("checkouts")
+        self._bump("checked_out")
+
+    def connection_checked_in(self, event):
+        self._bump("checked_out", -1)
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.stats)
+
+
+_clients: Dict[str, MongoClient] = {}
+_listeners: Dict[str, PoolStatsListener] = {}
+_lock = threading.Lock()
+
+
+def get_client(uri: Optional[str] = None) -> MongoClient:
+    """Returns the process-wide pooled MongoClient for `uri` (defaults to the URL env var)."""
+    uri = uri or MONGO_URL
+    client = _clients.get(uri)
+    if client is not None:
+        return client
+
+    with _lock:
+        if uri not in _clients:
+            listener = PoolStatsListener()
+            _clients[uri] = MongoClient(
+                uri,
+                maxPoolSize=MONGO_MAX_POOL_SIZE,
+                minPoolSize=MONGO_MIN_POOL_SIZE,
+                maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+                connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+                socketTimeoutMS=MONGO_SOCKET_TIMEOUT_MS,
+                serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+                waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS,
+                event_listeners=[listener],
+            )
+            _listeners[uri] = listener
+        return _clients[uri]
+
+
+def get_database(name: Optional[str] = None, uri: Optional[str] = None):
+    """Returns a database handle on the shared client."""
+    return get_client(uri)[name or DEFAULT_DATABASE]
+
+
+def get_collection(name: str, database: Optional[str] = None, uri: Optional[str] = None):
+    """Returns a collection handle on the shared client."""
+    return get_database(database, uri)[name]
+
+
+def pool_stats() -> Dict[str, Dict[str, int]]:
+    """Returns connection pool counters for every client created in this process."""
+    stats = {}
+    for uri, listener in _listeners.items():
+        host = uri.rsplit("@", 1)[-1] if uri else "default"
+        stats[host] = {**listener.snapshot(), "max_pool_size": MONGO_MAX_POOL_SIZE}
+    return stats
+
+
+def close_clients():
+    """Closes every shared client, e.g. before a worker process exits."""
+    with _lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
+        _listeners.clear()
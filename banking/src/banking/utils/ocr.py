@@ -0,0 +1,227 @@
+import io
+import os
+import re
+import time
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+TESSERACT_PATH = os.getenv("TESSERACT_PATH")
+# Warm OCR worker processes; 0 runs OCR inline in the calling thread
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", str(os.cpu_count() or 1)))
+# When a region yields nothing, OCR the whole page once for the fields still missing
+OCR_FULL_PAGE_FALLBACK = os.getenv("OCR_FULL_PAGE_FALLBACK", "true").lower() in ("1", "true", "yes")
+
+# Fractional (left, top, right, bottom) boxes where each field usually sits, per document type and orientation
+LAYOUT_TEMPLATES: Dict[Tuple[str, str], Dict[str, Tuple[float, float, float, float]]] = {
+    # e-Aadhaar letter: address block under the UIDAI band, the card with DOB at the bottom
+    ("aadhaar", "portrait"): {"DATE OF BIRTH": (0.25, 0.78, 1.0, 0.90), "ADDRESS": (0.10, 0.27, 0.80, 0.47)},
+    # Aadhaar card: DOB beside the photo on the front; address fills the back
+    ("aadhaar", "landscape"): {"DATE OF BIRTH": (0.25, 0.30, 1.0, 0.70), "ADDRESS": (0.0, 0.15, 1.0, 0.85)},
+    ("pan", "landscape"): {"DATE OF BIRTH": (0.0, 0.50, 0.55, 0.72)},
+    ("pan", "portrait"): {"DATE OF BIRTH": (0.0, 0.48, 0.50, 0.60)},
+}
+
+# Printed labels that sit next to a field, used to find it from Textract's LINE geometry
+FIELD_ANCHORS = {
+    "DATE OF BIRTH": re.compile(r"\bDOB\b|birth|जन्म", re.IGNORECASE),
+    "ADDRESS": re.compile(r"address|पता|^to$", re.IGNORECASE),
+}
+
+# Tesseract page segmentation: a single line for dates, a block for addresses, auto for a full page
+FIELD_PSM = {"DATE OF BIRTH": 7, "ADDRESS": 6}
+FULL_PAGE_PSM = 3
+
+DOB_PATTERN = re.compile(r"\b(\d{2}[/-]\d{2}[/-]\d{4})\b")
+
+
+def parse_field(field: str, text: str, full_page: bool = False) -> Optional[str]:
+    """Pulls one field's value out of OCR text; on a full page the address must follow its "Address" label."""
+    if field == "DATE OF BIRTH":
+        match = DOB_PATTERN.search(text)
+        return match.group(1) if match else None
+    if field == "ADDRESS":
+        address_start = text.find("Address")
+        if address_start != -1:
+            text = text[address_start:].split("\n", 1)[-1]
+        elif full_page:
+            return None
+        address = " ".join(line.strip() for line in text.splitlines() if line.strip())
+        return address or None
+    return text.strip() or None
+
+
+# ---- worker side -------------------------------------------------------------------------------
+
+_engine = None
+
+
+def _init_worker(tesseract_path: Optional[str]):
+    """Runs once per pool process: one OCR thread per process, and a warm engine when tesserocr is installed."""
+    global _engine
+    # Parallelism comes from the pool; stop each tesseract from also spreading over every core
+    os.environ["OMP_THREAD_LIMIT"] = "1"
+    try:
+        from tesserocr import PyTessBaseAPI
+
+        _engine = PyTessBaseAPI()
+    except Exception:
+        import pytesseract
+
+        if tesseract_path:
+            pytesseract.pytesseract.tesseract_cmd = tesseract_path
+        _engine = pytesseract
+
+
+def ocr_region(pixels: np.ndarray, psm: int) -> str:
+    """OCRs one greyscale region (a uint8 array) and returns its text."""
+    if _engine is None:
+        _init_worker(TESSERACT_PATH)
+    image = Image.fromarray(pixels)
+    try:
+        if hasattr(_engine, "SetImage"):
+            _engine.SetPageSegMode(psm)
+            _engine.SetImage(image)
+            return _engine.GetUTF8Text()
+        return _engine.image_to_string(image, config=f"--psm {psm}")
+    except Exception as e:
+        # Some pytesseract errors cannot be pickled back to the parent and would break the whole pool
+        raise RuntimeError(f"{type(e).__name__}: {e}") from None
+
+
+def _warm(_):
+    # Hold each task briefly so the pool has to start a separate worker for the next one
+    time.sleep(0.05)
+    return os.getpid()
+
+
+# ---- caller side -------------------------------------------------------------------------------
+
+def orientation(width: int, height: int) -> str:
+    return "landscape" if width >= height else "portrait"
+
+
+def regions_from_textract(response: Dict[str, Any], fields: Iterable[str],
+                          page: int = 1) -> Dict[str, Tuple[float, float, float, float]]:
+    """Locates fields next to their printed labels using the LINE geometry of a Textract response."""
+    regions = {}
+    for block in response.get("Blocks", []):
+        if block.get("BlockType") != "LINE" or block.get("Page", 1) != page:
+            continue
+        box = block.get("Geometry", {}).get("BoundingBox")
+        if not box:
+            continue
+        for field in fields:
+            if field in regions or not FIELD_ANCHORS.get(field, re.compile("$^")).search(block.get("Text", "")):
+                continue
+            left, top = box["Left"], box["Top"]
+            if field == "ADDRESS":
+                # The address runs below its label for a few lines
+                regions[field] = (max(0.0, left - 0.02), max(0.0, top - 0.01), 1.0, min(1.0, top + box["Height"] * 8))
+            else:
+                # The value shares the label's line
+                pad = box["Height"] * 0.5
+                regions[field] = (max(0.0, left - 0.02), max(0.0, top - pad), 1.0, min(1.0, top + box["Height"] + pad))
+    return regions
+
+
+def field_regions(size: Tuple[int, int], fields: Iterable[str], document_type: str = "aadhaar",
+                  textract_response: Optional[Dict[str, Any]] = None) -> Dict[str, Tuple[float, float, float, float]]:
+    """Picks a crop box per field: Textract geometry when it has one, the layout template otherwise."""
+    fields = list(fields)
+    regions = regions_from_textract(textract_response, fields) if textract_response else {}
+    template = LAYOUT_TEMPLATES.get((document_type, orientation(*size)), {})
+    for field in fields:
+        if field not in regions and field in template:
+            regions[field] = template[field]
+    return regions
+
+
+class OcrEngine:
+    """Region-targeted Tesseract fallback running on a warm pool of worker processes."""
+
+    def __init__(self, workers: int = OCR_WORKERS):
+        self.workers = max(0, workers)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _executor(self) -> Optional[ProcessPoolExecutor]:
+        if not self.workers:
+            return None
+        with self._lock:
+            if self._pool is None:
+                # spawn, not fork: the parent runs crew and client threads that must not be forked mid-flight
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(TESSERACT_PATH,),
+                )
+        return self._pool
+
+    def warm(self) -> List[int]:
+        """Starts every worker ahead of the first document; returns their pids."""
+        executor = self._executor()
+        if executor is None:
+            return []
+        return sorted(set(executor.map(_warm, range(self.workers * 2))))
+
+    def _run(self, jobs: List[Tuple[np.ndarray, int]]) -> List[str]:
+        executor = self._executor()
+        if executor is None:
+            return [ocr_region(pixels, psm) for pixels, psm in jobs]
+        return list(executor.map(ocr_region, *zip(*jobs))) if jobs else []
+
+    def extract_fields(self, image_bytes: bytes, fields: Iterable[str] = ("DATE OF BIRTH", "ADDRESS"),
+                       document_type: str = "aadhaar",
+                       textract_response: Optional[Dict[str, Any]] = None) -> Dict[str, Optional[str]]:
+        """OCRs only the regions holding the requested fields and returns {field: value or None}."""
+        fields = list(fields)
+        if not fields:
+            return {}
+
+        image = Image.open(io.BytesIO(image_bytes)).convert("L")
+        pixels = np.asarray(image)
+        height, width = pixels.shape
+        regions = field_regions((width, height), fields, document_type, textract_response)
+
+        results: Dict[str, Optional[str]] = {field: None for field in fields}
+        jobs, job_fields = [], []
+        for field, (left, top, right, bottom) in regions.items():
+            crop = pixels[int(top * height):int(bottom * height), int(left * width):int(right * width)]
+            if crop.size:
+                jobs.append((np.ascontiguousarray(crop), FIELD_PSM.get(field, 6)))
+                job_fields.append(field)
+
+        for field, text in zip(job_fields, self._run(jobs)):
+            results[field] = parse_field(field, text)
+
+        missing = [field for field in fields if not results[field]]
+        if missing and OCR_FULL_PAGE_FALLBACK:
+            text = self._run([(pixels, FULL_PAGE_PSM)])[0]
+            for field in missing:
+                results[field] = parse_field(field, text, full_page=True)
+        return results
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+
+_ocr_engine: Optional[OcrEngine] = None
+_ocr_engine_lock = threading.Lock()
+
+
+def get_ocr_engine() -> OcrEngine:
+    """Returns the process-wide OCR engine; its worker pool starts on first use."""
+    global _ocr_engine
+    with _ocr_engine_lock:
+        if _ocr_engine is None:
+            _ocr_engine = OcrEngine()
+    return _ocr_engine
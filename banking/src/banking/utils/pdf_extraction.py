@@ -1,180 +1,224 @@
-import os
-import json
-import io
-import boto3
-import pytesseract
-import re
-from pdf2image import convert_from_path
-from PyPDF2 import PdfReader
-from dotenv import load_dotenv
-import trp.trp2 as t2
-from PIL import Image
-
-# Load environment variables
-load_dotenv()
-region_name = os.getenv('AWS_REGION_NAME')
-access_key = os.getenv('ACCESS_KEY')
-secret_key = os.getenv('SECRET_ACCESS_KEY')
-POPPLER_PATH = os.getenv('POPPLER_PATH')
-TESSERACT_PATH = os.getenv('TESSERACT_PATH')
-
-# Configure Tesseract
-pytesseract.pytesseract.tesseract_cmd = TESSERACT_PATH
-
-def read_img_pdf(filepath):
-    """Extracts image bytes from a PDF or image file."""
-    try:
-        if filepath.endswith('.pdf'):
-            images = convert_from_path(filepath, dpi=200, poppler_path=POPPLER_PATH)
-            if images:
-                with io.BytesIO() as output:
-                    images[0].save(output, format="JPEG")
-                    return output.getvalue()
-        elif filepath.endswith(('.png', '.jpg', '.jpeg')):
-            with open(filepath, 'rb') as img_file:
-                return img_file.read()
-    except Exception as e:
-        print(f"Error processing {filepath}: {str(e)}")
-        return None
-    return None
-
-def analyze_document(image_bytes, query_list, quest_dict):
-    """Uses AWS Textract for primary extraction, with OCR fallback for missing values."""
-    textract_client = boto3.client(
-        'textract',
-        region_name=region_name,
-        aws_access_key_id=access_key,
-        aws_secret_access_key=secret_key
-    )
-
-    try:
-        response = textract_client.analyze_document(
-            Document={'Bytes': image_bytes},
-            FeatureTypes=["QUERIES"],
-            QueriesConfig={"Queries": query_list}
-        )
-
-        extracted_info = extract_query_info(response, quest_dict)
-
-        # Fallback to OCR if DOB or Address is missing
-        if not extracted_info.get("DATE OF BIRTH") or not extracted_info.get("ADDRESS"):
-            ocr_data = extract_with_ocr(image_bytes)
-            extracted_info.update({k: v for k, v in ocr_data.items() if v})
-
-        return extracted_info
-    except Exception as e:
-        print(f"Error analyzing document: {str(e)}")
-        return {"error": "AWS Textract failed"}
-
-def extract_query_info(response, quest_dict):
-    """Extracts key-value pairs from Textract response."""
-    query_dict = {}
-    try:
-        doc = t2.TDocumentSchema().load(response)
-        page = doc.pages[0]
-        query_answers = doc.get_query_answers(page=page)
-
-        for answers in query_answers:
-            key_ = quest_dict.get(answers[0], answers[0])  # Default to question text if no match
-            query_dict[key_] = answers[-1]
-    except Exception as e:
-        print(f"Error extracting query info: {str(e)}")
-        return {"error": "Failed to extract query info"}
-
-    return query_dict
-
-def extract_with_ocr(image_bytes):
-    """Fallback OCR extraction using Tesseract"""
-    try:
-        image = Image.open(io.BytesIO(image_bytes))
-        text = pytesseract.image_to_string(image)
-
-        dob = None
-        address = None
-
-        # Regex pattern for DOB (Adjust based on Aadhaar format)
-        dob_pattern = r"\b(\d{2}/\d{2}/\d{4})\b"
-        match = re.search(dob_pattern, text)
-        if match:
-            dob = match.group(1)
-
-        # Extract address by looking for "Address" keyword
-        address_start = text.find("Address")
-        if address_start != -1:
-            address = text[address_start:].split("\n", 1)[-1].strip()
-
-        return {"DATE OF BIRTH": dob, "ADDRESS": address}
-    except Exception as e:
-        print(f"Error extracting OCR data: {str(e)}")
-        return {"error": "OCR extraction failed"}
-    
-def aadhaar_queries():
-    """Defines queries for extracting Aadhaar details."""
-    query_list = [
-        {"Text": "What is the Aadhaar number?"},
-        {"Text": "What is the name of the Aadhaar cardholder?"},
-        {"Text": "What is the date of birth?"},
-        {"Text": "What is the DOB?"},
-        {"Text": "What is the birth date?"},
-        {"Text": "What is the gender?"},
-        {"Text": "What is full address?"}
-    ]
-
-    quest_dict = {
-        "What is the Aadhaar number?": "AADHAAR NUMBER",
-        "What is the name of the Aadhaar cardholder?": "NAME",
-        "What is the date of birth?": "DATE OF BIRTH",
-        "What is the DOB?": "DATE OF BIRTH",
-        "What is the birth date?": "DATE OF BIRTH",
-        "What is the gender?": "GENDER",
-        "What is full address?": "ADDRESS"
-    }
-
-    return {"query_list": query_list, "quest_dict": quest_dict}
-
-def process_folder(folder_path, output_path):
-    """Processes all documents in a folder, extracts Aadhaar details, and saves to JSON."""
-    extracted_data = {}
-    queries = aadhaar_queries()
-    query_list = queries["query_list"]
-    quest_dict = queries["quest_dict"]
-
-    for file_name in os.listdir(folder_path):
-        file_path = os.path.join(folder_path, file_name)
-        if os.path.isfile(file_path) and file_name.lower().endswith(('.pdf', '.png', '.jpg', '.jpeg')):
-            try:
-                img_bytes = read_img_pdf(file_path)
-                if img_bytes:
-                    extracted_info = analyze_document(img_bytes, query_list, quest_dict)
-                    extracted_data[file_name] = extracted_info
-                else:
-                    extracted_data[file_name] = {"error": "Unsupported file format or unable to process"}
-            except Exception as e:
-                extracted_data[file_name] = {"error": str(e)}
-
-    # Save extracted data as JSON
-    save_json(extracted_data, output_path)
-    
-    # Print extracted data in a readable format
-    print(json.dumps(extracted_data, indent=4))
-    return extracted_data
-
-    print(f"Extracted data saved to: {output_path}")
-    return extracted_data
-
-def save_json(data, output_path):
-    """Saves extracted data as JSON in the specified output path."""
-    try:
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        with open(output_path, 'w', encoding='utf-8') as json_file:
-            json.dump(data, json_file, indent=4, ensure_ascii=False)
-        print(f"JSON file successfully saved: {output_path}")
-    except Exception as e:
-        print(f"Error saving JSON file: {str(e)}")
-
-# Define paths
-folder_path = r"C:\Users\DHANYA MANOJ\Downloads\banking_crew_working\banking\local_id_path"
-output_json_path = r"C:\Users\DHANYA MANOJ\Downloads\banking_crew_working\banking\output\extracted_data.json"
-
-# Process documents and save JSON
-process_folder(folder_path, output_json_path)
+import os
+import time
+import boto3
+import threading
+import multiprocessing
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from banking.utils.rasterize import render_page
+from banking.utils.document_types import queries_for
+from banking.utils.manifest import FileManifest, file_sha256
+from banking.utils.ocr import get_ocr_engine
+from banking.utils.rate_limit import aws_client_config, limiter_for
+from banking.utils.results_store import ResultsWriter, export_json
+from banking.utils.preprocess import prepare_image
+from banking.utils.textract_cache import textract_cache
+from banking.utils.textract_queries import answer_values, query_answers
+
+region_name = os.getenv('AWS_REGION_NAME')
+access_key = os.getenv('ACCESS_KEY')
+secret_key = os.getenv('SECRET_ACCESS_KEY')
+# Threads waiting on Textract, and processes hashing, rasterising and pre-processing files, for process_folder
+FOLDER_TEXTRACT_WORKERS = int(os.getenv('FOLDER_TEXTRACT_WORKERS', '8'))
+FOLDER_RASTER_WORKERS = int(os.getenv('FOLDER_RASTER_WORKERS', str(os.cpu_count() or 1)))
+SUPPORTED_EXTENSIONS = ('.pdf', '.png', '.jpg', '.jpeg')
+
+_textract_client = None
+_textract_lock = threading.Lock()
+
+def get_textract_client():
+    """Returns the shared Textract client, creating it on first use."""
+    global _textract_client
+    with _textract_lock:
+        if _textract_client is None:
+            _textract_client = boto3.client(
+                'textract',
+                region_name=region_name,
+                aws_access_key_id=access_key,
+                aws_secret_access_key=secret_key,
+                config=aws_client_config(),
+            )
+    return _textract_client
+
+def read_img_pdf(filepath, document_type="aadhaar"):
+    """Extracts image bytes from a PDF or image file; PDFs render at the resolution for `document_type`."""
+    try:
+        if filepath.endswith('.pdf'):
+            return render_page(filepath, document_type=document_type) or None
+        elif filepath.endswith(('.png', '.jpg', '.jpeg')):
+            with open(filepath, 'rb') as img_file:
+                return img_file.read()
+    except Exception as e:
+        print(f"Error processing {filepath}: {str(e)}")
+        return None
+    return None
+
+def analyze_document(image_bytes, query_list, quest_dict):
+    """Uses AWS Textract for primary extraction, with OCR fallback for missing values."""
+    try:
+        response = textract_cache.get_or_compute(
+            image_bytes,
+            query_list,
+            lambda: limiter_for(get_textract_client()).call(
+                get_textract_client().analyze_document,
+                Document={'Bytes': image_bytes},
+                FeatureTypes=["QUERIES"],
+                QueriesConfig={"Queries": query_list}
+            )
+        )
+
+        extracted_info = extract_query_info(response, quest_dict)
+
+        # Fallback to OCR for whichever of DOB and Address is missing
+        missing = [field for field in ("DATE OF BIRTH", "ADDRESS") if not extracted_info.get(field)]
+        if missing:
+            ocr_data = extract_with_ocr(image_bytes, missing)
+            extracted_info.update({k: v for k, v in ocr_data.items() if v})
+
+        return extracted_info
+    except Exception as e:
+        print(f"Error analyzing document: {str(e)}")
+        return {"error": "AWS Textract failed"}
+
+def extract_query_info(response, quest_dict):
+    """Extracts key-value pairs from Textract response."""
+    try:
+        # Every page is read, and when several questions map to one field the most confident answer wins
+        return answer_values(query_answers(response, quest_dict))
+    except Exception as e:
+        print(f"Error extracting query info: {str(e)}")
+        return {"error": "Failed to extract query info"}
+
+def extract_with_ocr(image_bytes, fields=("DATE OF BIRTH", "ADDRESS")):
+    """Fallback OCR extraction using Tesseract, cropped to the missing fields and run on the shared worker pool"""
+    try:
+        return get_ocr_engine().extract_fields(image_bytes, fields)
+    except Exception as e:
+        print(f"Error extracting OCR data: {str(e)}")
+        return {"error": "OCR extraction failed"}
+    
+def aadhaar_queries():
+    """Defines queries for extracting Aadhaar details (one question per field)."""
+    return queries_for("aadhaar")
+
+def load_document(file_path, known_sha256=None):
+    """Process-pool step: hashes a file and renders and pre-processes it, unless its content is unchanged."""
+    sha256 = file_sha256(file_path)
+    if known_sha256 and sha256 == known_sha256:
+        return sha256, None
+    return sha256, prepare_image(read_img_pdf(file_path), os.path.basename(file_path))
+
+def scan_folder(folder_path):
+    """(file name, path, stat) for every supported document in the folder, using one directory read."""
+    with os.scandir(folder_path) as entries:
+        return sorted(
+            (entry.name, entry.path, entry.stat())
+            for entry in entries
+            if entry.is_file() and entry.name.lower().endswith(SUPPORTED_EXTENSIONS)
+        )
+
+def manifest_path(results_path):
+    return os.path.splitext(results_path)[0] + ".manifest.jsonl"
+
+def process_folder(folder_path, results_path, textract_workers=None, raster_workers=None, incremental=True,
+                   compact=False):
+    """
+    Processes all documents in a folder, extracts Aadhaar details, and appends one JSON line per document to
+    `results_path`. Files are rasterised on a process pool and sent to Textract from a thread pool; each file is
+    checkpointed to a manifest next to the results, so re-runs skip unchanged files and an interrupted run resumes.
+    With `compact`, a Parquet/Arrow copy of the latest results is written at the end (see results_store).
+
+    A `.json` path is still accepted as before: the JSON Lines then go to the `.jsonl` next to it, and the
+    latest result per file is written to the `.json` as one {file_name: details} object at the end.
+
+    Returns counts rather than the extracted data: {"processed", "unchanged", "failed", "skipped", "seconds",
+    "output"}, with "output" the JSON Lines path (and "json" the exported object, for a `.json` path).
+    """
+    started = time.perf_counter()
+    json_path = None
+    if results_path.lower().endswith(".json"):
+        json_path, results_path = results_path, os.path.splitext(results_path)[0] + ".jsonl"
+    queries = aadhaar_queries()
+    query_list = queries["query_list"]
+    quest_dict = queries["quest_dict"]
+    textract_workers = max(1, textract_workers or FOLDER_TEXTRACT_WORKERS)
+    raster_workers = max(1, raster_workers or FOLDER_RASTER_WORKERS)
+
+    manifest = FileManifest(manifest_path(results_path))
+    writer = ResultsWriter(results_path)
+    files = scan_folder(folder_path)
+    # Same size and mtime as the last successful run: not even opened
+    pending = [(name, path, stat) for name, path, stat in files if not (incremental and manifest.is_current(name, stat))]
+    print(f"{len(files)} documents in {folder_path}: {len(files) - len(pending)} unchanged, {len(pending)} to process")
+
+    counts = {"processed": 0, "unchanged": 0, "failed": 0}
+    # Bounded so a 10k-file drop never has every rendered page in memory at once
+    window = textract_workers * 4
+    queue = iter(pending)
+    in_flight = {}
+
+    # spawn, not fork: Textract and OCR client threads must not be forked mid-flight
+    with ProcessPoolExecutor(max_workers=raster_workers, mp_context=multiprocessing.get_context("spawn")) as raster_pool, \
+            ThreadPoolExecutor(max_workers=textract_workers, thread_name_prefix="textract") as textract_pool:
+
+        def fill():
+            for name, path, stat in queue:
+                known = manifest.known_sha256(name) if incremental else None
+                in_flight[raster_pool.submit(load_document, path, known)] = ("load", name, stat, known)
+                if len(in_flight) >= window:
+                    return
+
+        def fail(name, stat, sha256, error):
+            counts["failed"] += 1
+            print(f"Error processing {name}: {error}")
+            writer.write(name, {"error": error}, sha256)
+            manifest.record(name, stat, sha256, ok=False, error=error)
+
+        fill()
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                # The last item is the previous run's hash while loading, the file's own hash once analysing
+                step, name, stat, sha256 = in_flight.pop(future)
+                try:
+                    if step == "load":
+                        known, (sha256, img_bytes) = sha256, future.result()
+                        if img_bytes is None and known and sha256 == known:
+                            # Touched but identical: the earlier result stands, only the mtime is updated
+                            counts["unchanged"] += 1
+                            manifest.record(name, stat, sha256)
+                        elif not img_bytes:
+                            fail(name, stat, sha256, "Unsupported file format or unable to process")
+                        else:
+                            analysis = textract_pool.submit(analyze_document, img_bytes, query_list, quest_dict)
+                            in_flight[analysis] = ("analyze", name, stat, sha256)
+                    else:
+                        extracted_info = future.result()
+                        if "error" in extracted_info:
+                            fail(name, stat, sha256, extracted_info["error"])
+                        else:
+                            counts["processed"] += 1
+                            writer.write(name, extracted_info, sha256)
+                            manifest.record(name, stat, sha256)
+                except Exception as e:
+                    fail(name, stat, sha256, str(e))
+            fill()
+
+    # Files removed from the folder drop out of the manifest
+    manifest.compact(keep={name for name, _, _ in files})
+    writer.close(compact=compact)
+    summary = {**counts, "skipped": len(files) - len(pending), "output": results_path}
+    if json_path:
+        summary["json"] = export_json(results_path, json_path)
+
+    summary["seconds"] = elapsed = time.perf_counter() - started
+    print(f"Folder processed in {elapsed:.1f}s: {counts['processed']} extracted, {counts['unchanged']} touched but unchanged, "
+          f"{counts['failed']} failed, {summary['skipped']} skipped; results in {json_path or results_path}")
+    return summary
+
+if __name__ == "__main__":
+    # Define paths
+    folder_path = r"C:\Users\DHANYA MANOJ\Downloads\banking_crew_working\banking\local_id_path"
+    results_path = r"C:\Users\DHANYA MANOJ\Downloads\banking_crew_working\banking\output\extracted_data.jsonl"
+
+    # Process documents, appending one JSON line per document, and compact the results for analysis
+    process_folder(folder_path, results_path, compact=True)
@@ -0,0 +1,154 @@
+import io
+import os
+import time
+import logging
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+PREPROCESS_ENABLED = os.getenv("PREPROCESS", "true").lower() not in ("0", "false", "no")
+PREPROCESS_MAX_DIMENSION = int(os.getenv("PREPROCESS_MAX_DIMENSION", "2000"))
+PREPROCESS_JPEG_QUALITY = int(os.getenv("PREPROCESS_JPEG_QUALITY", "85"))
+PREPROCESS_DESKEW = os.getenv("PREPROCESS_DESKEW", "true").lower() not in ("0", "false", "no")
+PREPROCESS_CROP = os.getenv("PREPROCESS_CROP", "true").lower() not in ("0", "false", "no")
+
+# Deskew search range and step (degrees); corrections smaller than the minimum are not worth a resample
+MAX_SKEW_DEGREES = 8.0
+SKEW_STEP_DEGREES = 0.25
+MIN_SKEW_DEGREES = 0.5
+SKEW_SAMPLE_PX = 600
+
+# A pixel belongs to the card when it differs from the background by this much (0-255)
+BACKGROUND_DELTA = 30
+# ...and a row or column belongs to the card when this share of its pixels do
+CARD_LINE_SHARE = 0.02
+
+_totals = {"documents": 0, "bytes_in": 0, "bytes_out": 0, "seconds": 0.0}
+_totals_lock = threading.Lock()
+
+
+def estimate_skew(grey: np.ndarray) -> float:
+    """
+    Estimates the text-line angle (degrees) by projection profiles: dark pixels are projected onto the
+    vertical axis at each candidate angle, and the angle giving the sharpest row histogram wins.
+    """
+    step = max(1, max(grey.shape) // SKEW_SAMPLE_PX)
+    sample = grey[::step, ::step].astype(np.float32)
+    ink = sample < min(sample.mean() - sample.std(), 128)
+    ys, xs = np.nonzero(ink)
+    if ys.size < 200:
+        return 0.0
+
+    angles = np.arange(-MAX_SKEW_DEGREES, MAX_SKEW_DEGREES + SKEW_STEP_DEGREES / 2, SKEW_STEP_DEGREES)
+    # Every angle at once: (angles, points) matrix of projected row positions
+    rows = ys[None, :] - xs[None, :] * np.tan(np.radians(angles))[:, None]
+    rows = np.round(rows - rows.min(axis=1, keepdims=True)).astype(np.int64)
+    width = int(rows.max()) + 1
+    offsets = (np.arange(len(angles)) * width)[:, None]
+    histograms = np.bincount((rows + offsets).ravel(), minlength=width * len(angles)).reshape(len(angles), width)
+    scores = (histograms.astype(np.float64) ** 2).sum(axis=1)
+    return float(angles[int(np.argmax(scores))])
+
+
+def card_bounds(grey: np.ndarray) -> Optional[Tuple[int, int, int, int]]:
+    """Returns (top, bottom, left, right) of the card against a plain background, or None if it fills the frame."""
+    border = np.concatenate([grey[0], grey[-1], grey[:, 0], grey[:, -1]])
+    background = np.median(border)
+    foreground = np.abs(grey.astype(np.int16) - background) > BACKGROUND_DELTA
+
+    rows = np.flatnonzero(foreground.mean(axis=1) > CARD_LINE_SHARE)
+    cols = np.flatnonzero(foreground.mean(axis=0) > CARD_LINE_SHARE)
+    if rows.size == 0 or cols.size == 0:
+        return None
+
+    height, width = grey.shape
+    pad_y, pad_x = max(2, height // 100), max(2, width // 100)
+    top, bottom = max(0, rows[0] - pad_y), min(height, rows[-1] + 1 + pad_y)
+    left, right = max(0, cols[0] - pad_x), min(width, cols[-1] + 1 + pad_x)
+
+    # Nothing to gain from a sliver, and a tiny box means the background guess was wrong
+    area = (bottom - top) * (right - left) / float(height * width)
+    if area > 0.95 or area < 0.1:
+        return None
+    return top, bottom, left, right
+
+
+def preprocess_image(image_bytes: bytes, name: Optional[str] = None, max_dimension: Optional[int] = None,
+                     quality: Optional[int] = None) -> Tuple[bytes, Dict[str, Any]]:
+    """
+    Greyscale, deskew, crop to the card and downscale a scan, re-encoded as JPEG.
+    Returns (bytes to upload, stats); the original bytes are kept whenever they are already smaller.
+    """
+    started = time.perf_counter()
+    max_dimension = max_dimension or PREPROCESS_MAX_DIMENSION
+    stats: Dict[str, Any] = {"name": name, "bytes_in": len(image_bytes), "angle": 0.0, "cropped": False}
+
+    image = Image.open(io.BytesIO(image_bytes))
+    # JPEG draft mode decodes straight to greyscale at a reduced scale that is still >= the target size
+    image.draft("L", (max_dimension, max_dimension))
+    image = ImageOps.exif_transpose(image)
+    grey = np.asarray(image.convert("L"))
+
+    if PREPROCESS_DESKEW:
+        angle = estimate_skew(grey)
+        if abs(angle) >= MIN_SKEW_DEGREES:
+            grey = np.asarray(Image.fromarray(grey).rotate(angle, resample=Image.BICUBIC, expand=True, fillcolor=255))
+            stats["angle"] = angle
+
+    if PREPROCESS_CROP:
+        bounds = card_bounds(grey)
+        if bounds:
+            top, bottom, left, right = bounds
+            grey = grey[top:bottom, left:right]
+            stats["cropped"] = True
+
+    output = Image.fromarray(np.ascontiguousarray(grey))
+    if max(output.size) > max_dimension:
+        output.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+
+    with io.BytesIO() as buffer:
+        output.save(buffer, format="JPEG", quality=quality or PREPROCESS_JPEG_QUALITY, optimize=True)
+        processed = buffer.getvalue()
+    if len(processed) >= len(image_bytes):
+        processed = image_bytes
+
+    stats.update({
+        "bytes_out": len(processed),
+        "bytes_saved": len(image_bytes) - len(processed),
+        "size": output.size,
+        "seconds": time.perf_counter() - started,
+    })
+    with _totals_lock:
+        _totals["documents"] += 1
+        _totals["bytes_in"] += stats["bytes_in"]
+        _totals["bytes_out"] += stats["bytes_out"]
+        _totals["seconds"] += stats["seconds"]
+    return processed, stats
+
+
+def prepare_image(image_bytes: bytes, name: Optional[str] = None) -> bytes:
+    """The pre-processing step every extraction path calls; logs the saving (at debug level) and never fails the document."""
+    if not PREPROCESS_ENABLED or not image_bytes:
+        return image_bytes
+    try:
+        processed, stats = preprocess_image(image_bytes, name)
+    except Exception as e:
+        logger.warning("Error preprocessing %s: %s", name or "image", e)
+        return image_bytes
+
+    logger.debug("Preprocessed %s: %.0f KB -> %.0f KB (%.0f KB saved) in %.0f ms", name or "image",
+                 stats["bytes_in"] / 1024, stats["bytes_out"] / 1024, stats["bytes_saved"] / 1024, stats["seconds"] * 1000)
+    return processed
+
+
+def preprocess_stats() -> Dict[str, Any]:
+    """Totals across every document pre-processed in this process."""
+    with _totals_lock:
+        totals = dict(_totals)
+    totals["bytes_saved"] = totals["bytes_in"] - totals["bytes_out"]
+    totals["ms_per_document"] = totals["seconds"] * 1000 / totals["documents"] if totals["documents"] else 0.0
+    return totals
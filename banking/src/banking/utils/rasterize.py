@@ -0,0 +1,141 @@
+import os
+import tempfile
+from typing import Dict, List, Optional, Sequence
+
+from pdf2image import convert_from_path
+from PyPDF2 import PdfReader
+
+POPPLER_PATH = os.getenv("POPPLER_PATH")
+
+
+def _parse_dpi(spec: str) -> Dict[str, int]:
+    """Parses "aadhaar=150,default=200" into a per-document-type resolution table."""
+    table = {}
+    for item in spec.split(","):
+        if "=" in item:
+            doc_type, dpi = item.split("=", 1)
+            table[doc_type.strip().lower()] = int(dpi)
+    return table
+
+
+# Render resolution per document type. Textract needs ~150 dpi for card-sized print; dense forms get more
+RENDER_DPI = {"default": 200, "aadhaar": 150, "pan": 150}
+RENDER_DPI.update(_parse_dpi(os.getenv("PDF_RENDER_DPI", "")))
+MIN_RENDER_DPI = int(os.getenv("PDF_MIN_RENDER_DPI", "100"))
+
+# Hard ceiling on the decoded bitmap of one page (RGB, 3 bytes per pixel); the resolution is lowered to fit
+RENDER_MAX_MB = float(os.getenv("PDF_RENDER_MAX_MB", "64"))
+RENDER_MAX_PIXELS = int(RENDER_MAX_MB * 1024 * 1024 / 3)
+
+# Synchronous Textract limits: 10 MB per document and 10000 px per side
+TEXTRACT_MAX_BYTES = 10 * 1024 * 1024
+TEXTRACT_MAX_SIDE_PX = 10000
+
+JPEG_QUALITY = int(os.getenv("PDF_RENDER_JPEG_QUALITY", "90"))
+
+POINTS_PER_INCH = 72.0
+
+
+def dpi_for(document_type: Optional[str] = None) -> int:
+    """Returns the configured render resolution for a document type."""
+    return RENDER_DPI.get((document_type or "default").lower(), RENDER_DPI["default"])
+
+
+def fit_dpi(width_pt: float, height_pt: float, dpi: int) -> int:
+    """Lowers `dpi` until a page of the given size fits the pixel ceiling and Textract's side limit."""
+    if width_pt <= 0 or height_pt <= 0:
+        return dpi
+    width_in, height_in = width_pt / POINTS_PER_INCH, height_pt / POINTS_PER_INCH
+    by_pixels = (RENDER_MAX_PIXELS / (width_in * height_in)) ** 0.5
+    by_side = TEXTRACT_MAX_SIDE_PX / max(width_in, height_in)
+    return max(1, int(min(dpi, by_pixels, by_side)))
+
+
+def page_count(source) -> int:
+    """Returns the number of pages in a PDF given as a path or an open binary file."""
+    return len(_reader(source).pages)
+
+
+def _reader(source) -> PdfReader:
+    if hasattr(source, "seek"):
+        source.seek(0)
+    return PdfReader(source)
+
+
+def _page_sizes(source, pages: Sequence[int]) -> Dict[int, tuple]:
+    """Reads page sizes (in points) from the PDF's page tree without rendering anything."""
+    reader = _reader(source)
+    sizes = {}
+    for number in pages:
+        if 1 <= number <= len(reader.pages):
+            box = reader.pages[number - 1].mediabox
+            sizes[number] = (float(box.width), float(box.height))
+    return sizes
+
+
+def _render(path: str, number: int, dpi: int) -> bytes:
+    """Has poppler write one page straight to JPEG and returns the file's bytes (no PIL round trip)."""
+    with tempfile.TemporaryDirectory() as output_folder:
+        paths = convert_from_path(
+            path,
+            dpi=dpi,
+            first_page=number,
+            last_page=number,
+            fmt="jpeg",
+            jpegopt={"quality": JPEG_QUALITY, "optimize": True},
+            output_folder=output_folder,
+            paths_only=True,
+            poppler_path=POPPLER_PATH,
+        )
+        if not paths:
+            return b""
+        with open(paths[0], "rb") as f:
+            return f.read()
+
+
+def render_pages(source, pages: Sequence[int] = (1,), document_type: Optional[str] = None,
+                 dpi: Optional[int] = None) -> List[bytes]:
+    """
+    Renders only the requested 1-based `pages` of a PDF to Textract-ready JPEG bytes (b"" for pages it lacks).
+    `source` is a path or an open binary file (BytesIO or a named temp file).
+    """
+    dpi = dpi or dpi_for(document_type)
+    sizes = _page_sizes(source, pages)
+
+    spool = None
+    if isinstance(source, (str, os.PathLike)):
+        path = source
+    elif getattr(source, "name", None) and os.path.exists(source.name):
+        path = source.name
+    else:
+        # poppler reads from disk; spill the in-memory upload once for all requested pages
+        source.seek(0)
+        spool = tempfile.NamedTemporaryFile(suffix=".pdf")
+        for chunk in iter(lambda: source.read(1024 * 1024), b""):
+            spool.write(chunk)
+        spool.flush()
+        path = spool.name
+
+    try:
+        rendered = []
+        for number in pages:
+            if number not in sizes:
+                rendered.append(b"")
+                continue
+            page_dpi = fit_dpi(*sizes[number], dpi)
+            image_bytes = _render(path, number, page_dpi)
+            # Dense scans can still exceed Textract's byte limit; step the resolution down until they fit
+            while len(image_bytes) > TEXTRACT_MAX_BYTES and page_dpi > MIN_RENDER_DPI:
+                page_dpi = max(MIN_RENDER_DPI, int(page_dpi * 0.75))
+                image_bytes = _render(path, number, page_dpi)
+            rendered.append(image_bytes)
+        return rendered
+    finally:
+        if spool is not None:
+            spool.close()
+
+
+def render_page(source, page: int = 1, document_type: Optional[str] = None, dpi: Optional[int] = None) -> bytes:
+    """Renders a single page of a PDF to JPEG bytes; empty bytes if the page does not exist."""
+    rendered = render_pages(source, [page], document_type, dpi)
+    return rendered[0] if rendered else b""
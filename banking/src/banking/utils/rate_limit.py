@@ -0,0 +1,299 @@
+import os
+import time
+import random
+import asyncio
+import inspect
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# Per-service defaults (requests/second, burst, maximum concurrency); override with
+# RATE_LIMIT_<SERVICE>_RPS, RATE_LIMIT_<SERVICE>_BURST and RATE_LIMIT_<SERVICE>_CONCURRENCY
+SERVICE_DEFAULTS = {
+    "textract": (5.0, 5, 10),
+    "s3": (100.0, 50, 64),
+    "llm": (5.0, 5, 8),
+}
+RATE_LIMIT_MAX_ATTEMPTS = int(os.getenv("RATE_LIMIT_MAX_ATTEMPTS", "8"))
+RATE_LIMIT_BASE_DELAY = float(os.getenv("RATE_LIMIT_BASE_DELAY", "0.5"))
+RATE_LIMIT_MAX_DELAY = float(os.getenv("RATE_LIMIT_MAX_DELAY", "20"))
+
+# AIMD: halve on throttling (once per window: calls started before the last cut don't cut again), grow back slowly
+DECREASE_FACTOR = 0.5
+RATE_INCREASE_SHARE = 0.01
+MIN_RATE_SHARE = 0.1
+
+THROTTLE_CODES = {
+    "Throttling", "ThrottlingException", "ThrottledException", "TooManyRequestsException",
+    "ProvisionedThroughputExceededException", "RequestLimitExceeded", "LimitExceededException",
+    "RequestThrottled", "SlowDown", "RateLimitError",
+}
+TRANSIENT_CODES = {"InternalServerError", "InternalError", "ServiceUnavailable", "RequestTimeout"}
+TRANSIENT_ERRORS = {
+    "EndpointConnectionError", "ConnectionClosedError", "ReadTimeoutError", "ConnectTimeoutError",
+    "APIConnectionError", "APITimeoutError", "InternalServerError", "ServiceUnavailableError", "Timeout",
+}
+
+
+def _status_and_code(error: Exception) -> Tuple[Optional[int], Optional[str]]:
+    """HTTP status and error code from botocore ClientErrors, openai/litellm errors, or anything alike."""
+    response = getattr(error, "response", None)
+    if isinstance(response, dict):
+        # botocore ClientError
+        return (response.get("ResponseMetadata", {}).get("HTTPStatusCode"),
+                response.get("Error", {}).get("Code"))
+    status = getattr(error, "status_code", None) or getattr(response, "status_code", None)
+    return status, type(error).__name__
+
+
+def is_throttle(error: Exception) -> bool:
+    status, code = _status_and_code(error)
+    return status == 429 or code in THROTTLE_CODES
+
+
+def is_transient(error: Exception) -> bool:
+    status, code = _status_and_code(error)
+    return status in (500, 502, 503, 504) or code in TRANSIENT_CODES or type(error).__name__ in TRANSIENT_ERRORS
+
+
+def retry_after(error: Exception) -> float:
+    """Seconds the service asked us to wait (Retry-After), or 0."""
+    response = getattr(error, "response", None)
+    if isinstance(response, dict):
+        # botocore ClientError: the parsed response is a dict carrying the HTTP headers in its metadata
+        headers = response.get("ResponseMetadata", {}).get("HTTPHeaders") or {}
+    else:
+        # openai / httpx: the raw HTTP response
+        headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after", 0))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def backoff_delay(attempt: int, base: float = RATE_LIMIT_BASE_DELAY, cap: float = RATE_LIMIT_MAX_DELAY) -> float:
+    """Full-jitter exponential backoff: retries from many workers spread out instead of arriving together."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class TokenBucket:
+    """Requests per second with a burst allowance. Callers reserve a token and then sleep outside the lock."""
+
+    def __init__(self, rate: float, burst: int):
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Takes a token and returns how long to wait before using it."""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def acquire(self):
+        wait = self.reserve()
+        if wait:
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        wait = self.reserve()
+        if wait:
+            await asyncio.sleep(wait)
+
+    def adjust_rate(self, update: Callable[[float], float]):
+        """Sets the rate to update(current rate); tokens earned so far are credited at the old rate first."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self.rate = update(self.rate)
+
+
+class AdaptiveConcurrency:
+    """AIMD concurrency limit: +1 per window of successful calls, halved when the service throttles."""
+
+    def __init__(self, maximum: int, minimum: int = 1, initial: Optional[int] = None):
+        self.maximum = max(1, maximum)
+        self.minimum = max(1, min(minimum, self.maximum))
+        self.limit = float(initial or max(self.minimum, self.maximum // 2))
+        self.in_flight = 0
+        self._last_decrease = float("-inf")
+        self._cond = threading.Condition()
+
+    def _has_room(self) -> bool:
+        return self.in_flight < max(1, int(self.limit))
+
+    def enter(self) -> float:
+        """Takes a slot, waiting for one if needed; returns the start time to pass back to exit."""
+        with self._cond:
+            while not self._has_room():
+                self._cond.wait()
+            self.in_flight += 1
+        return time.monotonic()
+
+    async def enter_async(self) -> float:
+        # Threads and coroutines share one limit, so coroutines poll briefly rather than block the loop
+        delay = 0.005
+        while True:
+            with self._cond:
+                if self._has_room():
+                    self.in_flight += 1
+                    return time.monotonic()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.1)
+
+    def exit(self, started: float, throttled: Optional[bool]) -> bool:
+        """Releases a slot; throttled=None (another failure) leaves the limit alone. Returns True if it decreased."""
+        decreased = False
+        with self._cond:
+            self.in_flight -= 1
+            if throttled:
+                # Calls already in flight at the last cut were sent under the old limit; one burst cuts once
+                if started >= self._last_decrease:
+                    self.limit = max(self.minimum, self.limit * DECREASE_FACTOR)
+                    self._last_decrease = time.monotonic()
+                    decreased = True
+            elif throttled is False:
+                self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+            self._cond.notify_all()
+        return decreased
+
+
+class ServiceLimiter:
+    """
+    Shared back-pressure for one service in one region: a token bucket for request rate, AIMD concurrency,
+    and jittered retries of throttled or transient failures. Usable from threads (call) and asyncio (call_async).
+    """
+
+    def __init__(self, name: str, rate: float, burst: int, max_concurrency: int,
+                 max_attempts: int = RATE_LIMIT_MAX_ATTEMPTS):
+        self.name = name
+        self.bucket = TokenBucket(rate, burst)
+        self.concurrency = AdaptiveConcurrency(max_concurrency)
+        self.max_attempts = max(1, max_attempts)
+        self.counts = {"calls": 0, "throttled": 0, "retries": 0, "failed": 0}
+        self._lock = threading.Lock()
+
+    def _count(self, key: str):
+        with self._lock:
+            self.counts[key] += 1
+
+    def _release(self, started: float, throttled: Optional[bool]):
+        if self.concurrency.exit(started, throttled):
+            # The rate backs off with the concurrency, and recovers additively as calls succeed
+            floor = self.bucket.max_rate * MIN_RATE_SHARE
+            self.bucket.adjust_rate(lambda rate: max(floor, rate * DECREASE_FACTOR))
+        elif throttled is False and self.bucket.rate < self.bucket.max_rate:
+            ceiling, step = self.bucket.max_rate, self.bucket.max_rate * RATE_INCREASE_SHARE
+            self.bucket.adjust_rate(lambda rate: min(ceiling, rate + step))
+
+    def _should_retry(self, error: Exception, attempt: int) -> Tuple[Optional[bool], bool]:
+        """(throttled flag for AIMD, whether to retry)."""
+        throttled = is_throttle(error)
+        if throttled:
+            self._count("throttled")
+        retry = (throttled or is_transient(error)) and attempt < self.max_attempts - 1
+        if not retry:
+            self._count("failed")
+        return (True if throttled else None), retry
+
+    def _delay(self, attempt: int, error: Exception) -> float:
+        self._count("retries")
+        return max(backoff_delay(attempt), retry_after(error))
+
+    def call(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Runs fn(*args, **kwargs) under the limits, retrying throttling and transient errors."""
+        self._count("calls")
+        for attempt in range(self.max_attempts):
+            started = self.concurrency.enter()
+            throttled = None
+            try:
+                self.bucket.acquire()
+                result = fn(*args, **kwargs)
+                throttled = False
+                return result
+            except Exception as e:
+                throttled, retry = self._should_retry(e, attempt)
+                if not retry:
+                    raise
+                delay = self._delay(attempt, e)
+            finally:
+                self._release(started, throttled)
+            time.sleep(delay)
+
+    async def call_async(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """The asyncio counterpart of call; fn may be a coroutine function or a plain (non-blocking) callable."""
+        self._count("calls")
+        for attempt in range(self.max_attempts):
+            started = await self.concurrency.enter_async()
+            throttled = None
+            try:
+                await self.bucket.acquire_async()
+                result = fn(*args, **kwargs)
+                if inspect.isawaitable(result):
+                    result = await result
+                throttled = False
+                return result
+            except Exception as e:
+                throttled, retry = self._should_retry(e, attempt)
+                if not retry:
+                    raise
+                delay = self._delay(attempt, e)
+            finally:
+                self._release(started, throttled)
+            await asyncio.sleep(delay)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = dict(self.counts)
+        return {
+            **counts,
+            "rate": round(self.bucket.rate, 2),
+            "concurrency_limit": round(self.concurrency.limit, 2),
+            "in_flight": self.concurrency.in_flight,
+        }
+
+
+_limiters: Dict[Tuple[str, Optional[str]], ServiceLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(service: str, region: Optional[str] = None) -> ServiceLimiter:
+    """Returns the process-wide limiter for a service (textract, s3, llm) in a region or deployment."""
+    with _limiters_lock:
+        key = (service, region)
+        if key not in _limiters:
+            rate, burst, concurrency = SERVICE_DEFAULTS.get(service, (0.0, 1, 16))
+            prefix = f"RATE_LIMIT_{service.upper()}"
+            _limiters[key] = ServiceLimiter(
+                f"{service}:{region}" if region else service,
+                float(os.getenv(f"{prefix}_RPS", str(rate))),
+                int(os.getenv(f"{prefix}_BURST", str(burst))),
+                int(os.getenv(f"{prefix}_CONCURRENCY", str(concurrency))),
+            )
+        return _limiters[key]
+
+
+def aws_client_config():
+    """botocore config for clients whose calls go through a limiter: the limiter does the retrying."""
+    from botocore.config import Config
+
+    return Config(retries={"max_attempts": 0, "mode": "standard"})
+
+
+def limiter_for(client: Any) -> ServiceLimiter:
+    """The limiter for a boto3 client's service and region."""
+    return get_limiter(client.meta.service_model.service_name, client.meta.region_name)
+
+
+def rate_limit_stats() -> Dict[str, Any]:
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return {limiter.name: limiter.stats() for limiter in limiters}
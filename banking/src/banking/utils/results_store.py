@@ -0,0 +1,208 @@
+import os
+import json
+import time
+import threading
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Union
+
+# Rebuild the columnar copy after this many new records; 0 compacts only when asked (and on close)
+RESULTS_COMPACT_EVERY = int(os.getenv("RESULTS_COMPACT_EVERY", "0"))
+RESULTS_COMPACT_FORMAT = os.getenv("RESULTS_COMPACT_FORMAT", "parquet")  # parquet | arrow
+RESULTS_BATCH_ROWS = 10000
+
+# Columns every record carries; extracted fields follow
+BASE_COLUMNS = ["file", "sha256", "extracted_at", "error"]
+
+Where = Union[None, Dict[str, Any], Callable[[Dict[str, Any]], bool]]
+
+
+def columnar_path(path: str, fmt: str = RESULTS_COMPACT_FORMAT) -> str:
+    return os.path.splitext(path)[0] + (".parquet" if fmt == "parquet" else ".arrow")
+
+
+def _matches(record: Dict[str, Any], where: Where) -> bool:
+    if where is None:
+        return True
+    if callable(where):
+        return bool(where(record))
+    return all(record.get(key) == value for key, value in where.items())
+
+
+class ResultsWriter:
+    """
+    Appends one JSON line per document as soon as it is extracted, so the cost of a write does not grow with
+    the dataset and a crash keeps everything written so far. Re-processed documents get a newer line; readers
+    and compaction keep the last one per file.
+    """
+
+    def __init__(self, path: str, compact_every: int = RESULTS_COMPACT_EVERY, compact_format: str = RESULTS_COMPACT_FORMAT):
+        self.path = path
+        self.compact_every = compact_every
+        self.compact_format = compact_format
+        self.written = 0
+        self._since_compaction = 0
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+
+    def write(self, file_name: str, result: Dict[str, Any], sha256: Optional[str] = None):
+        """Appends one document's result (extracted fields, or {"error": ...})."""
+        record = {"file": file_name, "sha256": sha256, "extracted_at": time.time(), **result}
+        line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            self.written += 1
+            self._since_compaction += 1
+            due = self.compact_every and self._since_compaction >= self.compact_every
+            if due:
+                self._since_compaction = 0
+        if due:
+            self.compact()
+
+    def compact(self) -> Optional[str]:
+        """Rebuilds the columnar copy from the JSON Lines file; returns its path, or None without pyarrow."""
+        with self._lock:
+            if not self._file.closed:
+                self._file.flush()
+        return compact_results(self.path, fmt=self.compact_format)
+
+    def close(self, compact: bool = False):
+        with self._lock:
+            self._file.close()
+        if compact:
+            self.compact()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def iter_jsonl(path: str) -> Iterator[Dict[str, Any]]:
+    """Every record in a JSON Lines file, one line in memory at a time; a torn last line is skipped."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+def _latest_lines(path: str) -> Dict[str, int]:
+    """Line number of the last record per file; only the keys are held in memory."""
+    latest = {}
+    for number, record in enumerate(iter_jsonl(path)):
+        latest[record.get("file")] = number
+    return latest
+
+
+def read_results(path: str, where: Where = None, columns: Optional[Iterable[str]] = None,
+                 latest: bool = True) -> Iterator[Dict[str, Any]]:
+    """
+    Streams result records from a .jsonl file or its .parquet/.arrow compaction, keeping only those matching
+    `where` (a {column: value} dict or a predicate) and, optionally, only `columns`. With `latest`, superseded
+    records of re-processed files are skipped.
+    """
+    columns = list(columns) if columns else None
+    if path.endswith((".parquet", ".arrow")):
+        records = _iter_columnar(path, where if isinstance(where, dict) else None, columns)
+        where = where if callable(where) else None
+    else:
+        keep = _latest_lines(path) if latest else None
+        records = (record for number, record in enumerate(iter_jsonl(path))
+                   if keep is None or keep.get(record.get("file")) == number)
+
+    for record in records:
+        if _matches(record, where):
+            yield {key: record.get(key) for key in columns} if columns else record
+
+
+def export_json(path: str, json_path: str) -> str:
+    """
+    Writes the latest result per file as one {file: extracted fields or {"error": ...}} JSON object, the format
+    process_folder produced before JSON Lines. Streamed record by record; returns `json_path`.
+    """
+    scratch = f"{json_path}.{os.getpid()}.tmp"
+    with open(scratch, "w", encoding="utf-8") as f:
+        f.write("{")
+        for number, record in enumerate(read_results(path)):
+            details = {key: value for key, value in record.items() if key not in ("file", "sha256", "extracted_at")}
+            f.write(f"{',' if number else ''}\n    {json.dumps(record.get('file'))}: {json.dumps(details, ensure_ascii=False, default=str)}")
+        f.write("\n}\n")
+    os.replace(scratch, json_path)
+    return json_path
+
+
+def _iter_columnar(path: str, where: Optional[Dict[str, Any]], columns: Optional[List[str]]) -> Iterator[Dict[str, Any]]:
+    import pyarrow.dataset as ds
+
+    dataset = ds.dataset(path, format="parquet" if path.endswith(".parquet") else "ipc")
+    present = set(dataset.schema.names)
+    expression = None
+    for key, value in (where or {}).items():
+        if key not in present:
+            # A field no document ever had is null everywhere
+            if value is None:
+                continue
+            return
+        condition = ds.field(key).is_null() if value is None else ds.field(key) == value
+        expression = condition if expression is None else expression & condition
+    # Filters and projections are pushed down, so only matching row groups and columns are read
+    scan_columns = [name for name in columns if name in present] if columns else None
+    for batch in dataset.to_batches(columns=scan_columns, filter=expression):
+        yield from batch.to_pylist()
+
+
+def compact_results(path: str, output_path: Optional[str] = None, fmt: str = RESULTS_COMPACT_FORMAT) -> Optional[str]:
+    """
+    Writes the latest record per file from a JSON Lines results file to Parquet or Arrow IPC, in batches so the
+    whole dataset is never in memory. Field columns are strings; nested values are stored as JSON text.
+    """
+    try:
+        import pyarrow as pa
+    except ImportError:
+        print("Results compaction skipped: pyarrow is not installed (pip install banking[analytics])")
+        return None
+
+    output_path = output_path or columnar_path(path, fmt)
+    # First pass: the last line per file and the union of extracted fields (document types ask different questions)
+    latest, fields = {}, list(BASE_COLUMNS)
+    for number, record in enumerate(iter_jsonl(path)):
+        latest[record.get("file")] = number
+        fields.extend(key for key in record if key not in fields)
+    schema = pa.schema([(name, pa.float64() if name == "extracted_at" else pa.string()) for name in fields])
+
+    def as_text(name, value):
+        if value is None or isinstance(value, str) or name == "extracted_at":
+            return value
+        return json.dumps(value, ensure_ascii=False, default=str)
+
+    scratch = f"{output_path}.{os.getpid()}.tmp"
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        writer = pq.ParquetWriter(scratch, schema)
+    else:
+        writer = pa.ipc.new_file(scratch, schema)
+
+    rows = 0
+    batch: List[Dict[str, Any]] = []
+    try:
+        for number, record in enumerate(iter_jsonl(path)):
+            if latest.get(record.get("file")) != number:
+                continue
+            batch.append({name: as_text(name, record.get(name)) for name in fields})
+            if len(batch) >= RESULTS_BATCH_ROWS:
+                writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+                rows += len(batch)
+                batch = []
+        if batch or not rows:
+            writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+            rows += len(batch)
+    finally:
+        writer.close()
+    os.replace(scratch, output_path)
+    print(f"Compacted {rows} results into {output_path}")
+    return output_path
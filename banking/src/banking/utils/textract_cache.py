@@ -0,0 +1,158 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+TEXTRACT_CACHE_DIR = os.getenv("TEXTRACT_CACHE_DIR", os.path.join(".cache", "textract"))
+TEXTRACT_CACHE_MAX_MB = float(os.getenv("TEXTRACT_CACHE_MAX_MB", "512"))
+TEXTRACT_CACHE_TTL_SECONDS = float(os.getenv("TEXTRACT_CACHE_TTL_SECONDS", "0"))  # 0 disables expiry
+
+
+def cache_key(image_bytes: bytes, query_list: List[Dict[str, Any]]) -> str:
+    """Content address of a Textract request: the image bytes plus the query set."""
+    digest = hashlib.sha256(image_bytes)
+    digest.update(json.dumps(query_list, sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class TextractCache:
+    """On-disk cache of Textract responses with size-based LRU eviction and an optional TTL."""
+
+    def __init__(self, directory: str = TEXTRACT_CACHE_DIR, max_bytes: Optional[int] = None,
+                 ttl_seconds: Optional[float] = None):
+        self.directory = directory
+        self.max_bytes = int(max_bytes if max_bytes is not None else TEXTRACT_CACHE_MAX_MB * 1024 * 1024)
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else TEXTRACT_CACHE_TTL_SECONDS
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self._size: Optional[int] = None
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def _entries(self):
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(".json"):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    yield path, stat
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Returns the cached response for `key`, or None if it is missing or expired."""
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                entry = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+        if self.ttl_seconds and time.time() - entry.get("created", 0) > self.ttl_seconds:
+            with self._lock:
+                removed = self._remove(path)
+                if self._size is not None:
+                    self._size -= removed
+            return None
+
+        # Touch the entry so eviction treats it as recently used
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        return entry["response"]
+
+    def put(self, key: str, response: Dict[str, Any]):
+        """Stores a response and evicts least recently used entries beyond the size limit."""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        payload = json.dumps({"created": time.time(), "response": response}, default=str).encode("utf-8")
+
+        scratch = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(scratch, "wb") as f:
+            f.write(payload)
+
+        with self._lock:
+            # An overwritten entry gives back its old size
+            try:
+                previous = os.stat(path).st_size
+            except FileNotFoundError:
+                previous = 0
+            os.replace(scratch, path)
+            if self._size is None:
+                self._size = sum(stat.st_size for _, stat in self._entries())
+            else:
+                self._size += len(payload) - previous
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """Deletes the least recently used entries until the cache is back under 90% of its limit."""
+        entries = sorted(self._entries(), key=lambda item: item[1].st_mtime)
+        total = sum(stat.st_size for _, stat in entries)
+        target = self.max_bytes * 0.9
+        for path, stat in entries:
+            if total <= target:
+                break
+            self._remove(path)
+            total -= stat.st_size
+        self._size = total
+
+    def _remove(self, path: str) -> int:
+        """Deletes an entry file and returns the bytes freed (0 if it was already gone)."""
+        try:
+            size = os.stat(path).st_size
+            os.remove(path)
+            return size
+        except FileNotFoundError:
+            return 0
+
+    def get_or_compute(self, image_bytes: bytes, query_list: List[Dict[str, Any]],
+                       compute: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """Returns the cached response for this document and query set, calling Textract at most once."""
+        key = cache_key(image_bytes, query_list)
+        response = self.get(key)
+        if response is not None:
+            with self._lock:
+                self.hits += 1
+            return response
+
+        # Concurrent requests for the same document wait for the first one instead of calling Textract again
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            response = self.get(key)
+            if response is not None:
+                with self._lock:
+                    self.hits += 1
+                return response
+
+            with self._lock:
+                self.misses += 1
+            response = compute()
+            response.pop("ResponseMetadata", None)
+            self.put(key, response)
+
+        with self._lock:
+            self._key_locks.pop(key, None)
+        return response
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "bytes": self._size,
+            "max_bytes": self.max_bytes,
+        }
+
+
+# Shared by every extraction path in the process
+textract_cache = TextractCache()
@@ -0,0 +1,119 @@
+import os
+import time
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional
+
+from banking.utils.rate_limit import limiter_for
+from banking.utils.textract_queries import combine_responses
+
+TEXTRACT_POLL_SECONDS = float(os.getenv("TEXTRACT_POLL_SECONDS", "1"))
+TEXTRACT_MAX_POLL_SECONDS = float(os.getenv("TEXTRACT_MAX_POLL_SECONDS", "5"))
+TEXTRACT_JOB_TIMEOUT_SECONDS = float(os.getenv("TEXTRACT_JOB_TIMEOUT_SECONDS", "300"))
+
+
+class TextractJobError(Exception):
+    """Raised when an asynchronous Textract job fails or does not finish in time."""
+
+
+class TextractJobScheduler:
+    """
+    Starts asynchronous StartDocumentAnalysis jobs and polls all of them from one background thread,
+    so any number of waiting requests costs a single poller instead of a sleeping thread each.
+    """
+
+    def __init__(self, client_factory: Callable[[], Any], poll_seconds: float = TEXTRACT_POLL_SECONDS,
+                 max_poll_seconds: float = TEXTRACT_MAX_POLL_SECONDS,
+                 timeout_seconds: float = TEXTRACT_JOB_TIMEOUT_SECONDS):
+        self.client_factory = client_factory
+        self.poll_seconds = poll_seconds
+        self.max_poll_seconds = max_poll_seconds
+        self.timeout_seconds = timeout_seconds
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._poller: Optional[threading.Thread] = None
+
+    def submit(self, bucket: str, key: str, query_list: List[Dict[str, Any]]) -> Future:
+        """Starts analysis of an S3 document and returns a Future resolving to the combined response."""
+        client = self.client_factory()
+        job_id = limiter_for(client).call(
+            client.start_document_analysis,
+            DocumentLocation={"S3Object": {"Bucket": bucket, "Name": key}},
+            FeatureTypes=["QUERIES"],
+            QueriesConfig={"Queries": query_list},
+        )["JobId"]
+
+        future = Future()
+        with self._lock:
+            self._jobs[job_id] = {"future": future, "started": time.monotonic()}
+            if self._poller is None or not self._poller.is_alive():
+                self._poller = threading.Thread(target=self._poll_loop, name="textract-poller", daemon=True)
+                self._poller.start()
+        self._wake.set()
+        return future
+
+    def analyze(self, bucket: str, key: str, query_list: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Blocking helper: submits a job and waits for its response."""
+        return self.submit(bucket, key, query_list).result(timeout=self.timeout_seconds + self.max_poll_seconds)
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._jobs)
+
+    def _poll_loop(self):
+        interval = self.poll_seconds
+        while True:
+            with self._lock:
+                job_ids = list(self._jobs)
+                if not job_ids:
+                    self._poller = None
+                    return
+
+            finished = 0
+            for job_id in job_ids:
+                finished += self._poll(job_id)
+
+            # Back off while jobs are still running; poll promptly again once something finishes or is submitted
+            interval = self.poll_seconds if finished else min(interval * 1.5, self.max_poll_seconds)
+            self._wake.wait(interval)
+            self._wake.clear()
+
+    def _poll(self, job_id: str) -> int:
+        job = self._jobs[job_id]
+        client = self.client_factory()
+        try:
+            # Throttled polls are retried by the limiter instead of failing the job
+            response = limiter_for(client).call(client.get_document_analysis, JobId=job_id, MaxResults=1000)
+            status = response.get("JobStatus")
+            if status == "IN_PROGRESS":
+                if time.monotonic() - job["started"] > self.timeout_seconds:
+                    raise TextractJobError(f"Textract job {job_id} timed out after {self.timeout_seconds:.0f}s")
+                return 0
+            if status not in ("SUCCEEDED", "PARTIAL_SUCCESS"):
+                raise TextractJobError(f"Textract job {job_id} {status}: {response.get('StatusMessage', '')}")
+
+            pages = [response]
+            while pages[-1].get("NextToken"):
+                pages.append(limiter_for(client).call(
+                    client.get_document_analysis, JobId=job_id, MaxResults=1000, NextToken=pages[-1]["NextToken"]))
+            job["future"].set_result(combine_responses(pages))
+        except Exception as e:
+            job["future"].set_exception(e)
+
+        with self._lock:
+            self._jobs.pop(job_id, None)
+        return 1
+
+
+_scheduler: Optional[TextractJobScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_job_scheduler(client_factory: Callable[[], Any]) -> TextractJobScheduler:
+    """Returns the process-wide scheduler, creating it on first use."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = TextractJobScheduler(client_factory)
+    return _scheduler
@@ -0,0 +1,63 @@
+from typing import Any, Dict, Iterable, List, Tuple
+
+# (answer text, confidence 0-100); unanswered queries are kept with an empty answer and no confidence
+Answer = Tuple[str, float]
+NO_ANSWER: Answer = ("", -1.0)
+
+
+def query_answers(response: Dict[str, Any], quest_dict: Dict[str, str]) -> Dict[str, Answer]:
+    """
+    Reads every QUERY block on every page of a Textract response and returns the most confident
+    answer per field, keyed by quest_dict (or by the question text when it has no mapping).
+    """
+    blocks = response.get("Blocks", [])
+    by_id = {block["Id"]: block for block in blocks if "Id" in block}
+
+    answers: Dict[str, Answer] = {}
+    for block in blocks:
+        if block.get("BlockType") != "QUERY":
+            continue
+        question = block.get("Query", {}).get("Text", "")
+        key = quest_dict.get(question, question)
+        best = answers.get(key, NO_ANSWER)
+
+        for relationship in block.get("Relationships", []):
+            if relationship.get("Type") != "ANSWER":
+                continue
+            for answer_id in relationship.get("Ids", []):
+                result = by_id.get(answer_id, {})
+                candidate = (result.get("Text", ""), float(result.get("Confidence", 0.0)))
+                if candidate[0] and candidate[1] > best[1]:
+                    best = candidate
+        answers[key] = best
+    return answers
+
+
+def merge_answers(per_page: Iterable[Dict[str, Answer]]) -> Dict[str, Answer]:
+    """Merges answers from several pages (or documents), keeping the most confident answer per field."""
+    merged: Dict[str, Answer] = {}
+    for answers in per_page:
+        for key, answer in answers.items():
+            if answer[1] > merged.get(key, NO_ANSWER)[1] or key not in merged:
+                merged[key] = answer
+    return merged
+
+
+def answer_values(answers: Dict[str, Answer]) -> Dict[str, str]:
+    """Drops the confidences, giving the plain {field: text} shape stored in Extracted_Details."""
+    return {key: text for key, (text, _) in answers.items()}
+
+
+def answer_confidences(answers: Dict[str, Answer]) -> Dict[str, float]:
+    """Returns {field: confidence} for answered fields only."""
+    return {key: confidence for key, (text, confidence) in answers.items() if text}
+
+
+def combine_responses(responses: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Concatenates the Blocks of paginated GetDocumentAnalysis responses into one response."""
+    combined = {"Blocks": []}
+    for response in responses:
+        combined["Blocks"].extend(response.get("Blocks", []))
+        if "DocumentMetadata" in response:
+            combined["DocumentMetadata"] = response["DocumentMetadata"]
+    return combined
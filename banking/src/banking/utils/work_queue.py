@@ -0,0 +1,308 @@
+import os
+import uuid
+import socket
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+from pymongo import ASCENDING, IndexModel, ReturnDocument
+
+from banking.utils.mongo import get_collection
+
+database_name = os.getenv("DB")
+collection_name = os.getenv("COLLECTION1")
+
+# A crew run takes minutes; the lease is renewed well before it lapses and reclaimed by others once it has
+WORK_QUEUE_LEASE_SECONDS = float(os.getenv("WORK_QUEUE_LEASE_SECONDS", "300"))
+WORK_QUEUE_HEARTBEAT_SECONDS = float(os.getenv("WORK_QUEUE_HEARTBEAT_SECONDS", str(WORK_QUEUE_LEASE_SECONDS / 3)))
+WORK_QUEUE_MAX_ATTEMPTS = int(os.getenv("WORK_QUEUE_MAX_ATTEMPTS", "3"))
+WORK_QUEUE_RETRY_DELAY_SECONDS = float(os.getenv("WORK_QUEUE_RETRY_DELAY_SECONDS", "60"))
+WORK_QUEUE_BACKEND = os.getenv("WORK_QUEUE", "mongo")  # mongo | memory
+
+# Queue state kept on the request document next to status_flag / account_id
+LEASE_OWNER = "lease_owner"
+LEASE_EXPIRES_AT = "lease_expires_at"
+ATTEMPTS = "attempts"
+QUEUE_STATUS = "queue_status"  # absent while pending; "done" once processed, "dead" after WORK_QUEUE_MAX_ATTEMPTS
+LAST_ERROR = "last_error"
+
+# Serves the claim filter without scanning processed requests
+CLAIM_INDEX = IndexModel(
+    [("status_flag", ASCENDING), ("account_id", ASCENDING), (QUEUE_STATUS, ASCENDING), (LEASE_EXPIRES_AT, ASCENDING)],
+    name="work_queue_claim",
+)
+
+
+def utcnow() -> datetime:
+    # Mongo stores naive UTC datetimes, so the queue compares naive UTC throughout
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class Lease:
+    """One claimed request. Renewed by the queue's heartbeat thread until it is completed or failed."""
+
+    def __init__(self, queue: "WorkQueue", request_id: str, owner: str, attempts: int):
+        self.queue = queue
+        self.request_id = request_id
+        self.owner = owner
+        self.attempts = attempts
+        self.lost = False
+        self.finished = False
+
+    def complete(self) -> bool:
+        """Marks the request processed. False if the lease had already been reclaimed by another worker."""
+        return self.queue.complete(self)
+
+    def fail(self, error: str) -> bool:
+        """Releases the request for a later retry, or parks it as dead after the last attempt."""
+        return self.queue.fail(self, error)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if not self.finished:
+            self.fail(str(exc) if exc else "worker exited without completing the request")
+
+
+class WorkQueue:
+    """
+    Lease-based queue of pending KYC requests. A claim atomically takes one pending request whose lease is
+    free or expired and counts the attempt; a single heartbeat thread renews every lease held by this process.
+    Backends implement _claim, _renew and _release.
+    """
+
+    def __init__(self, lease_seconds: float = WORK_QUEUE_LEASE_SECONDS,
+                 heartbeat_seconds: float = WORK_QUEUE_HEARTBEAT_SECONDS,
+                 max_attempts: int = WORK_QUEUE_MAX_ATTEMPTS, retry_delay_seconds: float = WORK_QUEUE_RETRY_DELAY_SECONDS):
+        self.lease_seconds = lease_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+        self.max_attempts = max_attempts
+        self.retry_delay_seconds = retry_delay_seconds
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._leases: Dict[str, Lease] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._heartbeat: Optional[threading.Thread] = None
+
+    # ---- backend -------------------------------------------------------------------------------
+
+    def _claim(self, owner: str, now: datetime, until: datetime) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def _renew(self, request_id: str, owner: str, until: datetime) -> bool:
+        raise NotImplementedError
+
+    def _release(self, request_id: str, owner: str, fields: Dict[str, Any]) -> bool:
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, int]:
+        raise NotImplementedError
+
+    # ---- leases --------------------------------------------------------------------------------
+
+    def claim(self) -> Optional[Lease]:
+        """Claims the next pending request, or returns None when there is nothing to do."""
+        while True:
+            owner = f"{self.worker_id}:{uuid.uuid4().hex[:8]}"
+            now = utcnow()
+            doc = self._claim(owner, now, now + timedelta(seconds=self.lease_seconds))
+            if doc is None:
+                return None
+            if doc.get(ATTEMPTS, 1) <= self.max_attempts:
+                break
+            # Its earlier workers died holding the lease every time; stop handing it out
+            self._release(doc["request_id"], owner, {QUEUE_STATUS: "dead", LAST_ERROR: "lease expired on every attempt"})
+            print(f"❌ {doc['request_id']} was reclaimed {self.max_attempts} times without finishing; parked as dead")
+
+        lease = Lease(self, doc["request_id"], owner, doc.get(ATTEMPTS, 1))
+        with self._lock:
+            self._leases[owner] = lease
+            if self._heartbeat is None or not self._heartbeat.is_alive():
+                self._stop.clear()
+                self._heartbeat = threading.Thread(target=self._heartbeat_loop, name="queue-heartbeat", daemon=True)
+                self._heartbeat.start()
+        return lease
+
+    def heartbeat(self) -> int:
+        """Renews every lease this process holds; returns how many were renewed."""
+        with self._lock:
+            leases = list(self._leases.values())
+        renewed = 0
+        until = utcnow() + timedelta(seconds=self.lease_seconds)
+        for lease in leases:
+            if self._renew(lease.request_id, lease.owner, until):
+                renewed += 1
+            else:
+                lease.lost = True
+                self._forget(lease)
+                print(f"⚠️ Lost the lease on {lease.request_id}; another worker may have reclaimed it")
+        return renewed
+
+    def _heartbeat_loop(self):
+        while not self._stop.wait(self.heartbeat_seconds):
+            with self._lock:
+                if not self._leases:
+                    self._heartbeat = None
+                    return
+            self.heartbeat()
+
+    def _forget(self, lease: Lease):
+        with self._lock:
+            self._leases.pop(lease.owner, None)
+
+    def complete(self, lease: Lease) -> bool:
+        lease.finished = True
+        self._forget(lease)
+        released = self._release(lease.request_id, lease.owner, {QUEUE_STATUS: "done", LAST_ERROR: None})
+        if not released:
+            print(f"⚠️ {lease.request_id} finished after its lease was reclaimed")
+        return released
+
+    def fail(self, lease: Lease, error: str) -> bool:
+        lease.finished = True
+        self._forget(lease)
+        if lease.attempts >= self.max_attempts:
+            fields = {QUEUE_STATUS: "dead", LAST_ERROR: error}
+            print(f"❌ {lease.request_id} failed {lease.attempts} times; parked as dead: {error}")
+        else:
+            # The expiry doubles as "not before": the request becomes claimable again after the retry delay
+            fields = {LAST_ERROR: error,
+                      LEASE_EXPIRES_AT: utcnow() + timedelta(seconds=self.retry_delay_seconds * lease.attempts)}
+        return self._release(lease.request_id, lease.owner, fields)
+
+    def shutdown(self):
+        self._stop.set()
+
+
+class MongoWorkQueue(WorkQueue):
+    """The queue on the requests collection itself: pending means status_flag false and no account_id."""
+
+    def __init__(self, collection=None, **kwargs):
+        super().__init__(**kwargs)
+        self.collection = collection if collection is not None else get_collection(collection_name, database_name)
+        self._indexed = False
+
+    @staticmethod
+    def pending_filter(now: datetime) -> Dict[str, Any]:
+        return {
+            "status_flag": False,
+            "account_id": None,
+            QUEUE_STATUS: None,
+            "$or": [{LEASE_EXPIRES_AT: None}, {LEASE_EXPIRES_AT: {"$lte": now}}],
+        }
+
+    def ensure_indexes(self):
+        if not self._indexed:
+            self.collection.create_indexes([CLAIM_INDEX])
+            self._indexed = True
+
+    def _claim(self, owner, now, until):
+        self.ensure_indexes()
+        # Atomic on the server: of any number of workers racing for a request, exactly one gets it
+        doc = self.collection.find_one_and_update(
+            self.pending_filter(now),
+            {"$set": {LEASE_OWNER: owner, LEASE_EXPIRES_AT: until}, "$inc": {ATTEMPTS: 1}},
+            projection={"_id": 0, "request_id": 1, ATTEMPTS: 1},
+            return_document=ReturnDocument.BEFORE,
+        )
+        if doc is not None:
+            doc[ATTEMPTS] = doc.get(ATTEMPTS, 0) + 1
+        return doc
+
+    def _renew(self, request_id, owner, until):
+        result = self.collection.update_one({"request_id": request_id, LEASE_OWNER: owner},
+                                            {"$set": {LEASE_EXPIRES_AT: until}})
+        return result.matched_count == 1
+
+    def _release(self, request_id, owner, fields):
+        fields = {LEASE_EXPIRES_AT: None, **fields}
+        result = self.collection.update_one({"request_id": request_id, LEASE_OWNER: owner},
+                                            {"$set": {**fields, LEASE_OWNER: None}})
+        return result.matched_count == 1
+
+    def requeue(self, request_id: str):
+        """Makes a processed or dead request pending again, with a fresh attempt count."""
+        self.collection.update_one({"request_id": request_id},
+                                   {"$set": {QUEUE_STATUS: None, ATTEMPTS: 0, LEASE_OWNER: None, LEASE_EXPIRES_AT: None}})
+
+    def stats(self):
+        now = utcnow()
+        base = {"status_flag": False, "account_id": None}
+        return {
+            "pending": self.collection.count_documents(self.pending_filter(now)),
+            "leased": self.collection.count_documents({**base, QUEUE_STATUS: None, LEASE_OWNER: {"$ne": None},
+                                                       LEASE_EXPIRES_AT: {"$gt": now}}),
+            # Onboarded requests have left the pending set (status_flag, account_id), so done is counted without it
+            "done": self.collection.count_documents({QUEUE_STATUS: "done"}),
+            "dead": self.collection.count_documents({**base, QUEUE_STATUS: "dead"}),
+        }
+
+
+class InMemoryWorkQueue(WorkQueue):
+    """Same semantics over a dict of request documents, for tests and single-node development without Mongo."""
+
+    def __init__(self, records: Iterable[Dict[str, Any]] = (), **kwargs):
+        super().__init__(**kwargs)
+        self.records: Dict[str, Dict[str, Any]] = {}
+        self._records_lock = threading.Lock()
+        for record in records:
+            self.add(record)
+
+    def add(self, record: Dict[str, Any]):
+        with self._records_lock:
+            self.records[record["request_id"]] = {"status_flag": False, "account_id": None, **record}
+
+    def _is_pending(self, record, now):
+        expires = record.get(LEASE_EXPIRES_AT)
+        return (record.get("status_flag") is False and record.get("account_id") is None
+                and record.get(QUEUE_STATUS) is None and (expires is None or expires <= now))
+
+    def _claim(self, owner, now, until):
+        with self._records_lock:
+            record = next((record for record in self.records.values() if self._is_pending(record, now)), None)
+            if record is None:
+                return None
+            record.update({LEASE_OWNER: owner, LEASE_EXPIRES_AT: until, ATTEMPTS: record.get(ATTEMPTS, 0) + 1})
+            return {"request_id": record["request_id"], ATTEMPTS: record[ATTEMPTS]}
+
+    def _renew(self, request_id, owner, until):
+        with self._records_lock:
+            record = self.records.get(request_id)
+            if not record or record.get(LEASE_OWNER) != owner:
+                return False
+            record[LEASE_EXPIRES_AT] = until
+            return True
+
+    def _release(self, request_id, owner, fields):
+        with self._records_lock:
+            record = self.records.get(request_id)
+            if not record or record.get(LEASE_OWNER) != owner:
+                return False
+            record.update({LEASE_EXPIRES_AT: None, **fields, LEASE_OWNER: None})
+            return True
+
+    def stats(self):
+        now = utcnow()
+        with self._records_lock:
+            records: List[Dict[str, Any]] = list(self.records.values())
+        return {
+            "pending": sum(1 for r in records if self._is_pending(r, now)),
+            "leased": sum(1 for r in records if r.get(LEASE_OWNER) and r.get(QUEUE_STATUS) is None
+                          and r.get(LEASE_EXPIRES_AT) and r[LEASE_EXPIRES_AT] > now),
+            "done": sum(1 for r in records if r.get(QUEUE_STATUS) == "done"),
+            "dead": sum(1 for r in records if r.get(QUEUE_STATUS) == "dead"),
+        }
+
+
+_queue: Optional[WorkQueue] = None
+_queue_lock = threading.Lock()
+
+
+def get_work_queue() -> WorkQueue:
+    """Returns the process-wide queue (WORK_QUEUE=mongo, or memory for an empty local stand-in)."""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = InMemoryWorkQueue() if WORK_QUEUE_BACKEND == "memory" else MongoWorkQueue()
+    return _queue
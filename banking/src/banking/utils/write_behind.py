@@ -0,0 +1,270 @@
+import os
+import time
+import atexit
+import threading
+from collections import deque
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from banking.utils.mongo import DEFAULT_DATABASE, get_collection
+from banking.utils.rate_limit import backoff_delay
+
+WRITE_BEHIND_ENABLED = os.getenv("WRITE_BEHIND", "true").lower() not in ("0", "false", "no")
+# A buffer is flushed once it holds this many documents, or once its oldest write has waited this long
+WRITE_BEHIND_MAX_OPS = int(os.getenv("WRITE_BEHIND_MAX_OPS", "500"))
+WRITE_BEHIND_MAX_SECONDS = float(os.getenv("WRITE_BEHIND_MAX_SECONDS", "1.0"))
+WRITE_BEHIND_MAX_ATTEMPTS = int(os.getenv("WRITE_BEHIND_MAX_ATTEMPTS", "5"))
+WRITE_BEHIND_FLUSH_TIMEOUT = float(os.getenv("WRITE_BEHIND_FLUSH_TIMEOUT", "60"))
+
+LATENCY_SAMPLES = 1000
+
+
+class WriteBehindBuffer:
+    """
+    Collects $set updates keyed on request_id and writes them to one collection as unordered bulk_writes.
+    Updates to the same request before a flush are merged, last value winning. A failed flush is retried
+    with jittered backoff and, failing that, put back for the next one; replaying a $set is harmless, so
+    writes are at-least-once and idempotent. Until written, pending fields are visible through overlay().
+    Updates the server rejects outright are not retried; their errors are kept until take_rejected() collects them.
+    """
+
+    def __init__(self, collection, max_ops: int = WRITE_BEHIND_MAX_OPS, max_seconds: float = WRITE_BEHIND_MAX_SECONDS,
+                 key_field: str = "request_id"):
+        self.collection = collection
+        self.max_ops = max(1, max_ops)
+        self.max_seconds = max_seconds
+        self.key_field = key_field
+        self.counts = {"updates": 0, "coalesced": 0, "written": 0, "flushes": 0, "retries": 0, "failed": 0}
+        self._pending: Dict[Any, Dict[str, Any]] = {}
+        self._in_flight: Dict[Any, Dict[str, Any]] = {}
+        self._rejected: Dict[Any, str] = {}
+        self._added = 0
+        self._written = 0
+        self._flush_requested = False
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+        # Seconds per bulk_write, and from the oldest update in a batch being buffered to it being written
+        self._flush_seconds = deque(maxlen=LATENCY_SAMPLES)
+        self._latency_seconds = deque(maxlen=LATENCY_SAMPLES)
+        self._cond = threading.Condition()
+
+    def set(self, key: Any, fields: Dict[str, Any], upsert: bool = False):
+        """Buffers {"$set": fields} on the document whose key_field is `key`."""
+        if not WRITE_BEHIND_ENABLED:
+            self.collection.update_one({self.key_field: key}, {"$set": fields}, upsert=upsert)
+            return
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("write-behind buffer is closed")
+            self._added += 1
+            self.counts["updates"] += 1
+            entry = self._pending.get(key)
+            if entry is None:
+                self._pending[key] = {"fields": dict(fields), "upsert": upsert, "since": time.monotonic()}
+            else:
+                entry["fields"].update(fields)
+                entry["upsert"] = entry["upsert"] or upsert
+                self.counts["coalesced"] += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=f"write-behind-{self.collection.name}", daemon=True)
+                self._thread.start()
+            # The flusher sleeps while nothing is pending; the first update starts its timer
+            if len(self._pending) == 1 or len(self._pending) >= self.max_ops:
+                self._cond.notify_all()
+
+    def overlay(self, key: Any, document: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """`document` as read from Mongo, with any fields still waiting to be written applied on top."""
+        with self._cond:
+            entries = [self._in_flight.get(key), self._pending.get(key)]
+        for entry in entries:
+            if entry is not None and (document is not None or entry["upsert"]):
+                document = {**(document or {}), **entry["fields"]}
+        return document
+
+    def is_pending(self, key: Any) -> bool:
+        """True while an update to `key` is buffered or being written."""
+        with self._cond:
+            return key in self._pending or key in self._in_flight
+
+    def take_rejected(self, key: Any) -> Optional[str]:
+        """Why the server rejected the last update to `key`, if it did; each rejection is reported once."""
+        with self._cond:
+            return self._rejected.pop(key, None)
+
+    def flush(self, timeout: Optional[float] = WRITE_BEHIND_FLUSH_TIMEOUT) -> bool:
+        """Writes everything buffered so far now; False if it was not all written within `timeout`."""
+        with self._cond:
+            target = self._added
+            if self._written >= target:
+                return True
+            self._flush_requested = True
+            self._cond.notify_all()
+            return self._cond.wait_for(lambda: self._written >= target, timeout)
+
+    def close(self, timeout: Optional[float] = WRITE_BEHIND_FLUSH_TIMEOUT):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _due(self) -> Optional[float]:
+        """0 when a flush is due, else seconds until the oldest pending update is; None when nothing is pending."""
+        if not self._pending:
+            return None
+        if self._flush_requested or self._closed or len(self._pending) >= self.max_ops:
+            return 0.0
+        oldest = min(entry["since"] for entry in self._pending.values())
+        return max(0.0, oldest + self.max_seconds - time.monotonic())
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    wait = self._due()
+                    if wait == 0.0:
+                        break
+                    if wait is None:
+                        # Everything added so far has been written (or permanently rejected)
+                        self._written = self._added
+                        self._flush_requested = False
+                        self._cond.notify_all()
+                        if self._closed:
+                            return
+                    self._cond.wait(wait)
+                batch, self._pending = self._pending, {}
+                self._in_flight = batch
+                target = self._added
+                self._flush_requested = False
+
+            written = self._write(batch)
+
+            with self._cond:
+                self._in_flight = {}
+                if written:
+                    self._written = max(self._written, target)
+                else:
+                    # Newer updates to the same request win over the ones put back
+                    for key, entry in batch.items():
+                        newer = self._pending.get(key)
+                        if newer is not None:
+                            entry["fields"].update(newer["fields"])
+                            entry["upsert"] = entry["upsert"] or newer["upsert"]
+                        self._pending[key] = entry
+                self._cond.notify_all()
+            if not written:
+                time.sleep(self.max_seconds)
+
+    def _write(self, batch: Dict[Any, Dict[str, Any]]) -> bool:
+        """One unordered bulk_write of the batch; True once it is written or its failures cannot be retried."""
+        keys = list(batch)
+        operations = [UpdateOne({self.key_field: key}, {"$set": batch[key]["fields"]}, upsert=batch[key]["upsert"])
+                      for key in keys]
+        oldest = min(entry["since"] for entry in batch.values())
+        for attempt in range(WRITE_BEHIND_MAX_ATTEMPTS):
+            started = time.monotonic()
+            try:
+                self.collection.bulk_write(operations, ordered=False)
+                failed = 0
+            except BulkWriteError as e:
+                if e.details.get("writeConcernErrors") and not e.details.get("writeErrors"):
+                    self._retry(attempt, e)
+                    continue
+                # Rejected documents (e.g. validation) would be rejected again; the rest of the batch was written
+                errors = e.details.get("writeErrors", [])
+                with self._cond:
+                    for error in errors:
+                        self._rejected[keys[error["index"]]] = error.get("errmsg") or "write rejected"
+                for error in errors:
+                    print(f"❌ Write-behind to {self.collection.name} rejected {keys[error['index']]}: {error.get('errmsg')}")
+                failed = len(errors)
+            except PyMongoError as e:
+                self._retry(attempt, e)
+                continue
+            now = time.monotonic()
+            with self._cond:
+                self.counts["flushes"] += 1
+                self.counts["written"] += len(operations) - failed
+                self.counts["failed"] += failed
+                self._flush_seconds.append(now - started)
+                self._latency_seconds.append(now - oldest)
+            return True
+        print(f"❌ Write-behind to {self.collection.name} failed {WRITE_BEHIND_MAX_ATTEMPTS} times; "
+              f"keeping {len(operations)} updates for the next flush")
+        return False
+
+    def _retry(self, attempt: int, error: Exception):
+        with self._cond:
+            self.counts["retries"] += 1
+        print(f"⚠️ Write-behind to {self.collection.name} failed ({error}); retrying")
+        time.sleep(backoff_delay(attempt))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            flush_seconds, latency = list(self._flush_seconds), list(self._latency_seconds)
+            stats = {**self.counts, "pending": len(self._pending) + len(self._in_flight)}
+        stats.update(
+            flush_seconds_avg=sum(flush_seconds) / len(flush_seconds) if flush_seconds else 0.0,
+            flush_seconds_max=max(flush_seconds, default=0.0),
+            latency_seconds_avg=sum(latency) / len(latency) if latency else 0.0,
+            latency_seconds_max=max(latency, default=0.0),
+        )
+        return stats
+
+
+_buffers: Dict[Tuple[str, str], WriteBehindBuffer] = {}
+_buffers_lock = threading.Lock()
+
+
+def get_write_buffer(name: str, database: Optional[str] = None) -> WriteBehindBuffer:
+    """Returns the process-wide write-behind buffer for a collection."""
+    key = (database or DEFAULT_DATABASE, name)
+    with _buffers_lock:
+        if key not in _buffers:
+            _buffers[key] = WriteBehindBuffer(get_collection(name, key[0]))
+        return _buffers[key]
+
+
+def flush_all(timeout: Optional[float] = WRITE_BEHIND_FLUSH_TIMEOUT) -> bool:
+    """Writes every buffered update in the process; False if some were not written within `timeout`."""
+    with _buffers_lock:
+        buffers = list(_buffers.values())
+    return all([buffer.flush(timeout) for buffer in buffers])
+
+
+def write_failures(keys: Iterable[Any], timeout: Optional[float] = WRITE_BEHIND_FLUSH_TIMEOUT) -> Dict[Any, str]:
+    """
+    Flushes every buffer, then reports the keys whose buffered updates are not in Mongo: rejected by the
+    server, or still waiting after `timeout`. An empty result means every update to `keys` was written.
+    """
+    flush_all(timeout)
+    with _buffers_lock:
+        buffers = list(_buffers.values())
+    failures = {}
+    for key in keys:
+        errors = []
+        for buffer in buffers:
+            rejected = buffer.take_rejected(key)
+            if rejected is not None:
+                errors.append(f"{buffer.collection.name} rejected the update: {rejected}")
+            elif buffer.is_pending(key):
+                errors.append(f"update to {buffer.collection.name} was not flushed within {timeout}s")
+        if errors:
+            failures[key] = "; ".join(errors)
+    return failures
+
+
+def write_behind_stats() -> Dict[str, Dict[str, Any]]:
+    with _buffers_lock:
+        buffers = dict(_buffers)
+    return {f"{database}.{name}": buffer.stats() for (database, name), buffer in buffers.items()}
+
+
+@atexit.register
+def _close_all():
+    with _buffers_lock:
+        buffers = list(_buffers.values())
+    for buffer in buffers:
+        buffer.close()
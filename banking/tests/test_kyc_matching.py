@@ -0,0 +1,50 @@
+import pytest
+
+from banking.utils.kyc_matching import match_kyc
+
+RECORD = {
+    "customer_first_name": "Asha",
+    "customer_last_name": "Kulkarni",
+    "customer_aadhar_number": "123456789012",
+    "customer_residence_street_address": "House 8, Baner Road, Pashan",
+    "customer_residence_city": "Pune",
+}
+
+
+def extracted(aadhaar="1234 5678 9012", address="House 8, Baner Road, Pashan, Pune, Maharashtra 411021"):
+    return {"NAME": "Asha Kulkarni", "AADHAAR NUMBER": aadhaar, "ADDRESS": address}
+
+
+def test_full_document_is_verified():
+    result = match_kyc(RECORD, extracted())
+
+    assert result["status"] == "verified"
+
+
+@pytest.mark.parametrize("aadhaar", ["9999 9999 012", "5555 9012"])
+def test_partial_number_without_mask_is_a_mismatch(aadhaar):
+    result = match_kyc(RECORD, extracted(aadhaar=aadhaar))
+
+    assert result["fields"]["aadhaar_number"]["status"] == "mismatch"
+    assert result["status"] == "failed"
+
+
+def test_masked_number_is_never_verified():
+    result = match_kyc(RECORD, extracted(aadhaar="XXXX XXXX 9012"))
+
+    assert result["fields"]["aadhaar_number"]["status"] == "ambiguous"
+    assert result["status"] == "ambiguous"
+
+
+def test_masked_number_with_other_visible_digits_is_a_mismatch():
+    result = match_kyc(RECORD, extracted(aadhaar="XXXX XXXX 9013"))
+
+    assert result["fields"]["aadhaar_number"]["status"] == "mismatch"
+
+
+@pytest.mark.parametrize("address", ["Pashan", "Road, Pashan", "House 8, Pashan"])
+def test_fragment_of_the_stored_address_does_not_match(address):
+    result = match_kyc(RECORD, extracted(address=address))
+
+    assert result["fields"]["address"]["status"] != "match"
+    assert result["status"] != "verified"
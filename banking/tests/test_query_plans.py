@@ -0,0 +1,32 @@
+import os
+
+import pytest
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+from banking.utils.indexes import check_query_plans, ensure_indexes
+
+# A throwaway local mongod; the indexes are created in the collections the tools use there
+MONGO_TEST_URL = os.getenv("MONGO_TEST_URL", "mongodb://localhost:27017")
+
+
+@pytest.fixture(scope="module")
+def mongo_url():
+    client = MongoClient(MONGO_TEST_URL, serverSelectionTimeoutMS=1000)
+    try:
+        client.admin.command("ping")
+    except PyMongoError as e:
+        pytest.skip(f"no mongod reachable at {MONGO_TEST_URL}: {e}")
+    finally:
+        client.close()
+    return MONGO_TEST_URL
+
+
+def test_every_tool_query_uses_an_index(mongo_url):
+    report = ensure_indexes(mongo_url)
+    assert [entry for entry in report if entry["status"] == "failed"] == []
+
+    plans = check_query_plans(mongo_url)
+
+    assert plans
+    assert [plan for plan in plans if not plan["ok"]] == []
@@ -0,0 +1,156 @@
+import threading
+from datetime import timedelta
+
+from banking.utils.work_queue import (
+    ATTEMPTS, LAST_ERROR, LEASE_EXPIRES_AT, LEASE_OWNER, QUEUE_STATUS, InMemoryWorkQueue, utcnow,
+)
+
+
+def make_queue(*request_ids, **kwargs):
+    # Heartbeats are driven by hand; the background thread never fires during a test
+    kwargs = {"lease_seconds": 60, "heartbeat_seconds": 3600, "max_attempts": 3, "retry_delay_seconds": 30, **kwargs}
+    return InMemoryWorkQueue([{"request_id": request_id} for request_id in request_ids], **kwargs)
+
+
+def expire(queue, request_id):
+    """Moves a lease (or a retry delay) into the past, as if its time had run out."""
+    queue.records[request_id][LEASE_EXPIRES_AT] = utcnow() - timedelta(seconds=1)
+
+
+def test_claims_each_pending_request_once():
+    queue = make_queue("R1", "R2")
+    queue.add({"request_id": "R3", "status_flag": True})
+    queue.add({"request_id": "R4", "account_id": "ACCT-1"})
+
+    first, second = queue.claim(), queue.claim()
+
+    assert {first.request_id, second.request_id} == {"R1", "R2"}
+    assert first.attempts == second.attempts == 1
+    assert queue.claim() is None
+    assert queue.stats() == {"pending": 0, "leased": 2, "done": 0, "dead": 0}
+
+
+def test_concurrent_claims_never_share_a_request():
+    queue = make_queue(*(f"R{n}" for n in range(50)))
+    claimed, lock = [], threading.Lock()
+
+    def worker():
+        while (lease := queue.claim()) is not None:
+            with lock:
+                claimed.append(lease.request_id)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(claimed) == sorted(f"R{n}" for n in range(50))
+
+
+def test_complete_marks_request_done():
+    queue = make_queue("R1")
+    lease = queue.claim()
+
+    assert lease.complete()
+    assert queue.records["R1"][QUEUE_STATUS] == "done"
+    assert queue.records["R1"][LEASE_OWNER] is None
+    assert queue.claim() is None
+    assert queue.stats()["done"] == 1
+
+
+def test_heartbeat_renews_held_leases():
+    queue = make_queue("R1", lease_seconds=5)
+    lease = queue.claim()
+    queue.records["R1"][LEASE_EXPIRES_AT] = utcnow() + timedelta(seconds=1)
+
+    assert queue.heartbeat() == 1
+    assert queue.records["R1"][LEASE_EXPIRES_AT] > utcnow() + timedelta(seconds=4)
+    assert not lease.lost
+
+
+def test_expired_lease_is_reclaimed():
+    queue = make_queue("R1")
+    stale = queue.claim()
+    assert queue.claim() is None
+
+    expire(queue, "R1")
+    fresh = queue.claim()
+
+    assert fresh.request_id == "R1"
+    assert fresh.attempts == 2
+    # The first worker no longer owns the request: its heartbeat and its completion are both refused
+    assert queue.heartbeat() == 1
+    assert stale.lost
+    assert not stale.complete()
+    assert fresh.complete()
+    assert queue.records["R1"][QUEUE_STATUS] == "done"
+
+
+def test_failed_request_waits_for_retry_delay():
+    queue = make_queue("R1", retry_delay_seconds=30)
+    lease = queue.claim()
+
+    assert lease.fail("textract timed out")
+    record = queue.records["R1"]
+    assert record[LAST_ERROR] == "textract timed out"
+    assert record.get(QUEUE_STATUS) is None
+    assert record[LEASE_EXPIRES_AT] > utcnow() + timedelta(seconds=25)
+    assert queue.claim() is None
+
+    expire(queue, "R1")
+    retry = queue.claim()
+    assert retry.request_id == "R1"
+    assert retry.attempts == 2
+
+
+def test_retry_delay_grows_with_attempts():
+    queue = make_queue("R1", retry_delay_seconds=30)
+    queue.claim().fail("first")
+    expire(queue, "R1")
+
+    queue.claim().fail("second")
+
+    assert queue.records["R1"][LEASE_EXPIRES_AT] > utcnow() + timedelta(seconds=55)
+
+
+def test_request_is_dead_lettered_after_max_attempts():
+    queue = make_queue("R1", max_attempts=2)
+    queue.claim().fail("first")
+    expire(queue, "R1")
+
+    last = queue.claim()
+    assert last.attempts == 2
+    last.fail("second")
+
+    assert queue.records["R1"][QUEUE_STATUS] == "dead"
+    assert queue.records["R1"][LAST_ERROR] == "second"
+    expire(queue, "R1")
+    assert queue.claim() is None
+    assert queue.stats() == {"pending": 0, "leased": 0, "done": 0, "dead": 1}
+
+
+def test_request_whose_leases_always_expire_is_dead_lettered():
+    queue = make_queue("R1", "R2", max_attempts=2)
+    queue.records["R1"][ATTEMPTS] = 2
+    expire(queue, "R1")
+
+    # R1 has used up its attempts without ever finishing, so the claim moves on to R2
+    lease = queue.claim()
+
+    assert lease.request_id == "R2"
+    assert queue.records["R1"][QUEUE_STATUS] == "dead"
+    assert queue.records["R1"][LAST_ERROR] == "lease expired on every attempt"
+
+
+def test_unfinished_lease_fails_on_exit():
+    queue = make_queue("R1")
+
+    try:
+        with queue.claim():
+            raise RuntimeError("crew crashed")
+    except RuntimeError:
+        pass
+
+    assert queue.records["R1"][LAST_ERROR] == "crew crashed"
+    assert queue.records["R1"][LEASE_OWNER] is None